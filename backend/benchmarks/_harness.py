@@ -0,0 +1,92 @@
+"""Shared setup for benchmarks that exercise the FastAPI app."""
+
+import sys
+import tempfile
+from contextlib import contextmanager
+from datetime import date, timedelta
+from pathlib import Path
+
+# Add src to path so safe_route can be imported
+src_path = Path(__file__).resolve().parent.parent / "src"
+sys.path.insert(0, str(src_path))
+
+from fastapi.testclient import TestClient  # noqa: E402
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm import sessionmaker  # noqa: E402
+
+from safe_route.database import Base, get_db  # noqa: E402
+from safe_route.main import app  # noqa: E402
+from safe_route.models.user import User, UserRole  # noqa: E402
+from safe_route.services.auth import get_password_hash  # noqa: E402
+
+
+@contextmanager
+def bench_client():
+    """
+    Yield a TestClient bound to a throwaway file-backed SQLite database.
+
+    A file database (rather than :memory:) keeps commit costs realistic.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_engine(
+            f"sqlite:///{tmp}/bench.db",
+            connect_args={"check_same_thread": False},
+        )
+        Session = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+        Base.metadata.create_all(bind=engine)
+
+        def override_get_db():
+            db = Session()
+            try:
+                yield db
+            finally:
+                db.close()
+
+        app.dependency_overrides[get_db] = override_get_db
+        try:
+            with TestClient(app) as client:
+                yield client, Session
+        finally:
+            app.dependency_overrides.clear()
+            engine.dispose()
+
+
+def login(client, username: str, password: str) -> dict:
+    """Return auth headers for the given credentials."""
+    response = client.post("/auth/login", json={"username": username, "password": password})
+    return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+
+def create_admin(client, Session) -> dict:
+    """Create an admin user and return its auth headers."""
+    db = Session()
+    db.add(User(
+        username="benchadmin",
+        email="benchadmin@bench.local",
+        password_hash=get_password_hash("benchpass"),
+        first_name="Bench",
+        last_name="Admin",
+        role=UserRole.ADMIN,
+    ))
+    db.commit()
+    db.close()
+    return login(client, "benchadmin", "benchpass")
+
+
+def create_driver(client, admin_headers: dict, index: int = 0) -> dict:
+    """Create a driver via the API and return its auth headers."""
+    username = f"benchdriver{index}"
+    client.post(
+        "/drivers/",
+        json={
+            "username": username,
+            "email": f"{username}@bench.local",
+            "password": "benchpass",
+            "first_name": "Bench",
+            "last_name": f"Driver{index}",
+            "license_number": f"BENCH{index:06d}",
+            "license_expiry": str(date.today() + timedelta(days=365)),
+        },
+        headers=admin_headers,
+    )
+    return login(client, username, "benchpass")
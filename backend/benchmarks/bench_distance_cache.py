@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Measure what the distance-matrix cache saves when routes are re-optimized.
+
+For each stop count, optimizes the same route repeatedly, as an admin
+re-running the optimizer does, once with every call building its matrix
+and once reading it from the cache. The first cached call is a miss;
+later calls hit even though each run stores the stops in a new order.
+Local search is skipped (time budget 0) so the timings isolate the
+matrix work and the greedy tour; the matrix lookup is also timed alone.
+
+Usage:
+    python benchmarks/bench_distance_cache.py [--sizes 20 100 400] [--repeats 50] [--seed 1]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.services.distance_cache import distance_cache  # noqa: E402
+from safe_route.services.route_optimizer import optimize_stop_order  # noqa: E402
+from safe_route.utils.geo import haversine_matrix  # noqa: E402
+
+DEPOT = (12.97, 77.59)
+
+
+def reoptimize(lats, lngs, employee_ids, repeats, cached):
+    """Seconds per call over `repeats` re-optimizations, applying each new order."""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        order = optimize_stop_order(
+            lats, lngs, depot=DEPOT, time_budget=0,
+            employee_ids=employee_ids if cached else None,
+        )["order"]
+        lats, lngs, employee_ids = lats[order], lngs[order], employee_ids[order]
+    return (time.perf_counter() - start) / repeats
+
+
+def matrix_only(lats, lngs, employee_ids, repeats, cached):
+    """Seconds per matrix lookup alone, the stops shuffled between calls."""
+    rng = np.random.default_rng(0)
+    orders = [rng.permutation(len(lats)) for _ in range(repeats)]
+    start = time.perf_counter()
+    for order in orders:
+        if cached:
+            distance_cache.matrix(list(zip(employee_ids[order], lats[order], lngs[order])))
+        else:
+            haversine_matrix(lats[order], lngs[order])
+    return (time.perf_counter() - start) / repeats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[20, 100, 400])
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'':>6} {'-- optimize call --':>31}  {'-- matrix only --':>31}")
+    print(f"{'stops':>6} {'uncached ms':>12} {'cached ms':>10} {'speedup':>8}  "
+          f"{'uncached ms':>12} {'cached ms':>10} {'speedup':>8} {'hit ratio':>10}")
+    for size in args.sizes:
+        lats = rng.uniform(12.85, 13.10, size)
+        lngs = rng.uniform(77.45, 77.75, size)
+        employee_ids = np.arange(size)
+        distance_cache.clear()
+        uncached = reoptimize(lats, lngs, employee_ids, args.repeats, cached=False)
+        cached = reoptimize(lats, lngs, employee_ids, args.repeats, cached=True)
+        hit_ratio = distance_cache.stats()["hit_ratio"]
+        matrix_uncached = matrix_only(lats, lngs, employee_ids, args.repeats, cached=False)
+        matrix_cached = matrix_only(lats, lngs, employee_ids, args.repeats, cached=True)
+        print(f"{size:>6} {uncached * 1000:>12.3f} {cached * 1000:>10.3f} {uncached / cached:>7.1f}x  "
+              f"{matrix_uncached * 1000:>12.3f} {matrix_cached * 1000:>10.3f} "
+              f"{matrix_uncached / matrix_cached:>7.1f}x {hit_ratio:>10.2%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Compare ETAs from the flat default speed with ETAs from the speed profile.
+
+Simulates weeks of recorded trips through a city whose traffic is slow in
+the centre and at rush hours, builds the speed profile from them (then
+refreshes it incrementally with one more week), and predicts the arrival
+at every stop of a further week of trips from each trip's starting fix.
+Reports the error of both predictions against the simulated arrivals.
+
+Usage:
+    python benchmarks/bench_eta_accuracy.py [--train-trips 400] [--test-trips 100] [--seed 3]
+"""
+
+import argparse
+import math
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from _harness import bench_client
+from safe_route.models.location import DriverLocation
+from safe_route.schemas.location import LocationResponse
+from safe_route.services.geofence import TripFences, _fence
+from safe_route.services.speed_profile import SpeedProfile
+from safe_route.services.trip_eta import TripEtaService
+
+CENTER_LAT, CENTER_LNG = 12.97, 77.59
+M_PER_DEG_LAT = 111_320
+M_PER_DEG_LNG = M_PER_DEG_LAT * math.cos(math.radians(CENTER_LAT))
+FIX_SECONDS = 10
+EPOCH = datetime(2024, 1, 1)  # A Monday
+
+
+def true_speed_kmh(x: float, y: float, at: datetime) -> float:
+    """Ground truth: slow downtown, slower at weekday rush hours, fast at night."""
+    radius_km = math.hypot(x, y) / 1000
+    speed = 15.0 if radius_km < 2 else 25.0 if radius_km < 5 else 40.0
+    if at.weekday() < 5 and at.hour in (8, 9, 17, 18):
+        speed *= 0.5
+    elif at.hour >= 22 or at.hour < 5:
+        speed *= 1.3
+    return speed
+
+
+def to_latlng(x: float, y: float):
+    return CENTER_LAT + y / M_PER_DEG_LAT, CENTER_LNG + x / M_PER_DEG_LNG
+
+
+def drive(rng, trip_id: int, waypoints, start: datetime):
+    """Drive straight between waypoints; returns (fixes, arrival time per stop)."""
+    x, y = waypoints[0]
+    now = start
+    fixes, arrivals = [], []
+    for target_x, target_y in waypoints[1:]:
+        while True:
+            speed = true_speed_kmh(x, y, now) * rng.lognormal(0, 0.15)
+            lat, lng = to_latlng(x, y)
+            fixes.append({
+                "driver_id": 1, "trip_id": trip_id, "lat": lat, "lng": lng,
+                "heading": None, "speed": speed / 3.6, "timestamp": now,
+            })
+            remaining = math.hypot(target_x - x, target_y - y)
+            step = speed / 3.6 * FIX_SECONDS
+            if step >= remaining:
+                now += timedelta(seconds=remaining / (speed / 3.6))
+                x, y = target_x, target_y
+                arrivals.append(now)
+                break
+            x += (target_x - x) * step / remaining
+            y += (target_y - y) * step / remaining
+            now += timedelta(seconds=FIX_SECONDS)
+    return fixes, arrivals
+
+
+def random_trip(rng, trip_id: int, week: int):
+    """A pickup route: a start anywhere in town and stops 0.8-2.5 km apart."""
+    waypoints = [tuple(rng.uniform(-8000, 8000, 2))]
+    for _ in range(6):
+        x, y = waypoints[-1]
+        angle, length = rng.uniform(0, 2 * math.pi), rng.uniform(800, 2500)
+        waypoints.append((x + length * math.cos(angle), y + length * math.sin(angle)))
+    start = EPOCH + timedelta(weeks=week, seconds=int(rng.integers(0, 7 * 86400)))
+    return waypoints, *drive(rng, trip_id, waypoints, start)
+
+
+def record(Session, rows) -> None:
+    db = Session()
+    try:
+        db.execute(insert(DriverLocation), rows)
+        db.commit()
+    finally:
+        db.close()
+
+
+def errors(service: TripEtaService, trips) -> np.ndarray:
+    """Predicted minus actual minutes to every stop, predicted at the first fix."""
+    diffs = []
+    for trip_id, (waypoints, fixes, arrivals) in enumerate(trips):
+        stops = [_fence(i, i, i, *to_latlng(*point)) for i, point in enumerate(waypoints[1:])]
+        first = fixes[0]
+        location = LocationResponse(id=None, **first)
+        eta = service.compute(TripFences(trip_id, 1, None, stops), location)
+        for stop, arrival in zip(eta.stops, arrivals):
+            diffs.append(stop.eta_minutes - (arrival - first["timestamp"]).total_seconds() / 60)
+    return np.array(diffs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--train-trips", type=int, default=400)
+    parser.add_argument("--test-trips", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    with bench_client() as (_, Session):
+        weeks = 4
+        train = [random_trip(rng, i + 1, i % weeks) for i in range(args.train_trips)]
+        record(Session, [fix for _, fixes, _ in train for fix in fixes])
+
+        profile = SpeedProfile()
+        db = Session()
+        try:
+            start = time.perf_counter()
+            full = profile.refresh(db)
+            full_elapsed = time.perf_counter() - start
+
+            extra = [
+                random_trip(rng, args.train_trips + i + 1, weeks)
+                for i in range(args.train_trips // weeks)
+            ]
+            record(Session, [fix for _, fixes, _ in extra for fix in fixes])
+            start = time.perf_counter()
+            incremental = profile.refresh(db)
+            incremental_elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+
+        test = [random_trip(rng, 10**6 + i, weeks + 1) for i in range(args.test_trips)]
+        flat = errors(TripEtaService(SpeedProfile(default_kmh=30)), test)
+        start = time.perf_counter()
+        profiled = errors(TripEtaService(profile), test)
+        predict_elapsed = time.perf_counter() - start
+
+    print(f"history: {full['rows']} fixes -> {full['cells']} cells in {full_elapsed:.2f}s")
+    print(f"incremental refresh: {incremental['rows']} new fixes in {incremental_elapsed:.2f}s")
+    print(f"test stops: {len(flat)}  "
+          f"(prediction {predict_elapsed / len(profiled) * 1e6:.0f} us per stop incl. setup)")
+    for name, diffs in (("flat 30 km/h", flat), ("speed profile", profiled)):
+        print(f"{name:14} mean abs error {np.abs(diffs).mean():6.1f} min   "
+              f"bias {diffs.mean():+6.1f} min   p90 {np.percentile(np.abs(diffs), 90):6.1f} min")
+
+
+if __name__ == "__main__":
+    main()
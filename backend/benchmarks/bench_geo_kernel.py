@@ -0,0 +1,104 @@
+#!/usr/bin/env python3
+"""
+Compare the scalar haversine loop with the vectorized NumPy kernel.
+
+For each point count, times one-to-many distances, the full pairwise
+matrix and nearest-neighbour stop ordering, scalar against vectorized.
+Scalar pairwise timings that would take minutes are extrapolated from a
+sample of rows and marked with "~".
+
+Usage:
+    python benchmarks/bench_geo_kernel.py [--sizes 100 1000 10000] [--seed 1]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.utils.geo import (  # noqa: E402
+    haversine_distance, haversine_matrix, haversine_one_to_many, nearest_neighbor_order,
+)
+
+SCALAR_SAMPLE_ROWS = 200  # Rows timed before extrapolating a scalar pairwise run
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - start
+
+
+def scalar_one_to_many(lat, lng, lats, lngs):
+    return [haversine_distance(lat, lng, a, b) for a, b in zip(lats, lngs)]
+
+
+def scalar_rows(lats, lngs, rows):
+    return [scalar_one_to_many(lats[i], lngs[i], lats, lngs) for i in range(rows)]
+
+
+def scalar_nearest_neighbor(lats, lngs):
+    """The previous optimize_route_sequence loop: min() over the pool with a lambda."""
+    pool = list(range(1, len(lats)))
+    current, order = 0, []
+    while pool:
+        nearest = min(pool, key=lambda i: haversine_distance(lats[current], lngs[current], lats[i], lngs[i]))
+        order.append(nearest)
+        current = nearest
+        pool.remove(nearest)
+    return order
+
+
+def fmt(seconds: float, estimated: bool = False) -> str:
+    text = f"{seconds * 1000:10.2f}ms"
+    return ("~" if estimated else " ") + text
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100, 1000, 10000])
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'points':>7} {'kernel':>14} {'scalar':>13} {'vectorized':>13} {'speedup':>8}")
+    for n in args.sizes:
+        lats = 12.8 + rng.uniform(0, 0.4, n)
+        lngs = 77.4 + rng.uniform(0, 0.4, n)
+        lat_list, lng_list = lats.tolist(), lngs.tolist()
+
+        scalar, scalar_s = timed(scalar_one_to_many, lat_list[0], lng_list[0], lat_list, lng_list)
+        vector, vector_s = timed(haversine_one_to_many, lats[0], lngs[0], lats, lngs)
+        assert np.allclose(scalar, vector, atol=1e-9)
+        print(f"{n:>7} {'one-to-many':>14} {fmt(scalar_s)} {fmt(vector_s)} {scalar_s / vector_s:7.0f}x")
+
+        rows = min(n, SCALAR_SAMPLE_ROWS)
+        sample, scalar_s = timed(scalar_rows, lat_list, lng_list, rows)
+        scalar_s *= n / rows
+        matrix, vector_s = timed(haversine_matrix, lats, lngs)
+        assert np.allclose(sample, matrix[:rows], atol=1e-9)
+        print(f"{n:>7} {'matrix':>14} {fmt(scalar_s, rows < n)} {fmt(vector_s)} {scalar_s / vector_s:7.0f}x")
+
+        if n <= 1000:
+            expected, scalar_s = timed(scalar_nearest_neighbor, lat_list, lng_list)
+            estimated = False
+        else:
+            # The scalar loop does n^2/2 distance calls; scale the 1000-point cost
+            _, scalar_s = timed(scalar_nearest_neighbor, lat_list[:1000], lng_list[:1000])
+            scalar_s *= (n / 1000) ** 2
+            expected, estimated = None, True
+        start = time.perf_counter()
+        order = nearest_neighbor_order(haversine_matrix(lats, lngs))
+        vector_s = time.perf_counter() - start
+        if expected is not None:
+            assert order == expected
+        print(f"{n:>7} {'nearest-first':>14} {fmt(scalar_s, estimated)} {fmt(vector_s)} {scalar_s / vector_s:7.0f}x")
+
+
+if __name__ == "__main__":
+    main()
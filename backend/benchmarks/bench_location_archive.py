@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Compare a day-long analytics scan through the ORM with the columnar archive.
+
+Fills a file-backed SQLite database with one day of fleet history, then
+computes each driver's mean speed twice: once from ORM rows and once from
+the memory-mapped archive of the same day.
+
+Usage:
+    python benchmarks/bench_location_archive.py [--drivers 200] [--fixes 1000]
+"""
+
+import argparse
+import tempfile
+import time
+from datetime import date, datetime, timedelta
+
+import numpy as np
+from sqlalchemy import insert
+
+from _harness import bench_client
+from safe_route.models.location import DriverLocation
+from safe_route.services.location_archive import LocationArchive
+
+DAY = date(2024, 1, 1)
+
+
+def fill_day(Session, drivers: int, fixes: int) -> None:
+    rng = np.random.default_rng(1)
+    start = datetime.combine(DAY, datetime.min.time())
+    db = Session()
+    try:
+        for driver_id in range(1, drivers + 1):
+            speeds = rng.uniform(0, 60, fixes)
+            db.execute(insert(DriverLocation), [
+                {
+                    "driver_id": driver_id, "trip_id": None,
+                    "lat": 12.9 + i * 1e-4, "lng": 77.5, "heading": 90.0, "speed": float(speeds[i]),
+                    "timestamp": start + timedelta(seconds=i * 60),
+                }
+                for i in range(fixes)
+            ])
+        db.commit()
+    finally:
+        db.close()
+
+
+def orm_mean_speeds(Session) -> dict:
+    db = Session()
+    try:
+        totals: dict = {}
+        for row in db.query(DriverLocation).filter(
+            DriverLocation.timestamp >= datetime.combine(DAY, datetime.min.time()),
+            DriverLocation.timestamp < datetime.combine(DAY + timedelta(days=1), datetime.min.time()),
+        ):
+            total, count = totals.get(row.driver_id, (0.0, 0))
+            totals[row.driver_id] = (total + row.speed, count + 1)
+        return {driver_id: total / count for driver_id, (total, count) in totals.items()}
+    finally:
+        db.close()
+
+
+def archive_mean_speeds(archive: LocationArchive) -> dict:
+    day = archive.open(DAY)
+    drivers = day.column("driver_id")
+    speeds = day.column("speed")
+    ids, starts = np.unique(drivers, return_index=True)
+    sums = np.add.reduceat(speeds.astype(np.float64), starts)
+    counts = np.diff(np.append(starts, len(drivers)))
+    return dict(zip(ids.tolist(), (sums / counts).tolist()))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--drivers", type=int, default=200)
+    parser.add_argument("--fixes", type=int, default=1000)
+    args = parser.parse_args()
+
+    with bench_client() as (_, Session), tempfile.TemporaryDirectory() as archive_dir:
+        fill_day(Session, args.drivers, args.fixes)
+
+        start = time.perf_counter()
+        expected = orm_mean_speeds(Session)
+        orm_elapsed = time.perf_counter() - start
+
+        archive = LocationArchive(archive_dir)
+        db = Session()
+        try:
+            start = time.perf_counter()
+            rows = archive.export_day(db, DAY)
+            export_elapsed = time.perf_counter() - start
+        finally:
+            db.close()
+
+        start = time.perf_counter()
+        actual = archive_mean_speeds(archive)
+        archive_elapsed = time.perf_counter() - start
+
+        assert expected.keys() == actual.keys()
+        assert all(abs(expected[k] - actual[k]) < 1e-3 for k in expected)
+
+    print(f"rows={rows} drivers={args.drivers}")
+    print(f"orm scan:     {orm_elapsed:8.3f}s")
+    print(f"archive scan: {archive_elapsed:8.3f}s  ({orm_elapsed / archive_elapsed:.0f}x faster)")
+    print(f"export:       {export_elapsed:8.3f}s  (one-off per day)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Compare frame size and encode/decode round-trip speed of JSON and binary frames.
+
+Usage:
+    python benchmarks/bench_location_codec.py [--fixes 100000]
+"""
+
+import argparse
+import json
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.schemas.location import LocationResponse  # noqa: E402
+from safe_route.utils.location_codec import FrameDecoder, FrameEncoder  # noqa: E402
+
+
+def make_fixes(count: int) -> list[LocationResponse]:
+    """A driver moving steadily, reporting every 2 seconds."""
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    return [
+        LocationResponse(
+            id=i, driver_id=42, trip_id=7,
+            lat=12.971599 + i * 3e-5, lng=77.594566 + i * 2e-5,
+            heading=33.7, speed=28.4, timestamp=start + timedelta(seconds=2 * i),
+        )
+        for i in range(count)
+    ]
+
+
+def bench_json(fixes):
+    start = time.perf_counter()
+    frames = [fix.model_dump_json() for fix in fixes]
+    decoded = [json.loads(frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+    assert len(decoded) == len(fixes)
+    return sum(len(frame.encode()) for frame in frames), elapsed
+
+
+def bench_binary(fixes, delta: bool):
+    start = time.perf_counter()
+    encoder = FrameEncoder(delta=delta)
+    frames = [
+        encoder.encode(f.driver_id, f.timestamp, f.lat, f.lng, f.heading, f.speed, f.trip_id)
+        for f in fixes
+    ]
+    decoder = FrameDecoder()
+    decoded = [decoder.decode(frame) for frame in frames]
+    elapsed = time.perf_counter() - start
+    assert len(decoded) == len(fixes)
+    return sum(len(frame) for frame in frames), elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--fixes", type=int, default=100_000)
+    args = parser.parse_args()
+
+    fixes = make_fixes(args.fixes)
+    results = {
+        "json": bench_json(fixes),
+        "binary": bench_binary(fixes, delta=False),
+        "binary-delta": bench_binary(fixes, delta=True),
+    }
+
+    json_bytes = results["json"][0]
+    print(f"fixes={args.fixes}")
+    for name, (size, elapsed) in results.items():
+        print(
+            f"{name:13s} {size / args.fixes:6.1f} B/frame  "
+            f"{json_bytes / size:4.1f}x smaller  "
+            f"{args.fixes / elapsed:10.0f} round-trips/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
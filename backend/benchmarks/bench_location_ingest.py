@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Compare GPS ingestion throughput of POST /location/ and POST /location/batch.
+
+Usage:
+    python benchmarks/bench_location_ingest.py [--points 2000] [--batch-size 100]
+"""
+
+import argparse
+import time
+
+from _harness import bench_client, create_admin, create_driver
+
+
+def make_points(count: int) -> list[dict]:
+    """Generate a synthetic drive heading north-east."""
+    return [
+        {"lat": 12.9 + i * 2e-4, "lng": 77.5 + i * 2e-4, "heading": 45.0, "speed": 30.0}
+        for i in range(count)
+    ]
+
+
+def bench_single(client, headers: dict, points: list[dict]) -> float:
+    start = time.perf_counter()
+    for point in points:
+        client.post("/location/", json=point, headers=headers)
+    return time.perf_counter() - start
+
+
+def bench_batch(client, headers: dict, points: list[dict], batch_size: int) -> float:
+    start = time.perf_counter()
+    for i in range(0, len(points), batch_size):
+        client.post("/location/batch", json={"points": points[i:i + batch_size]}, headers=headers)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--points", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=100)
+    args = parser.parse_args()
+
+    points = make_points(args.points)
+    with bench_client() as (client, Session):
+        headers = create_driver(client, create_admin(client, Session))
+        single = bench_single(client, headers, points)
+        batch = bench_batch(client, headers, points, args.batch_size)
+
+    print(f"points={args.points} batch_size={args.batch_size}")
+    print(f"single: {args.points / single:10.0f} rows/s  ({single:.2f}s)")
+    print(f"batch:  {args.points / batch:10.0f} rows/s  ({batch:.2f}s)")
+    print(f"speedup: {single / batch:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Measure how much history adaptive sampling saves and how much path it loses.
+
+A synthetic shift is driven at 1 Hz with GPS jitter: city driving with
+turns, red lights and a long park at the depot. Reports the share of fixes
+stored and the worst distance between a raw fix and the stored path.
+
+Usage:
+    python benchmarks/bench_location_sampling.py [--minutes 60] [--seed 7]
+"""
+
+import argparse
+import math
+import sys
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.config import get_settings  # noqa: E402
+from safe_route.services.location_sampler import LocationSampler  # noqa: E402
+from safe_route.utils.track import project_to_meters  # noqa: E402
+
+settings = get_settings()
+
+
+def simulate_shift(minutes: int, seed: int) -> list[dict]:
+    """One fix per second; parked for the first tenth, then driving with stops."""
+    rng = np.random.default_rng(seed)
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    lat, lng, heading = 12.9716, 77.5946, 45.0
+    rows = []
+    for second in range(minutes * 60):
+        parked = second < minutes * 6
+        red_light = second % 300 >= 260
+        speed = 0.0 if parked or red_light else 8.3  # m/s, ~30 km/h
+        if second % 120 == 0 and not parked:
+            heading = (heading + rng.choice([-90, 0, 90])) % 360
+        lat += speed * math.cos(math.radians(heading)) / 111_320
+        lng += speed * math.sin(math.radians(heading)) / (111_320 * math.cos(math.radians(lat)))
+        rows.append({
+            "driver_id": 1, "trip_id": None,
+            "lat": lat + rng.normal(0, 3) / 111_320,
+            "lng": lng + rng.normal(0, 3) / 111_320,
+            "heading": (heading + rng.normal(0, 5)) % 360,
+            "speed": speed * 3.6,
+            "timestamp": start + timedelta(seconds=second),
+        })
+    return rows
+
+
+def max_deviation_m(rows: list[dict], stored: list[dict]) -> float:
+    """Worst distance from a raw fix to the stored path between its neighbours."""
+    xy = project_to_meters(
+        np.array([row["lat"] for row in rows]), np.array([row["lng"] for row in rows])
+    )
+    stored_keys = {id(row) for row in stored}
+    anchors = np.flatnonzero([id(row) in stored_keys for row in rows])
+    worst = 0.0
+    for a, b in zip(anchors[:-1], anchors[1:]):
+        start, end = xy[a], xy[b]
+        segment = end - start
+        length_sq = float(segment @ segment)
+        points = xy[a:b + 1]
+        if length_sq == 0:
+            distances = np.linalg.norm(points - start, axis=1)
+        else:
+            t = np.clip((points - start) @ segment / length_sq, 0, 1)
+            distances = np.linalg.norm(points - (start + t[:, None] * segment), axis=1)
+        worst = max(worst, float(distances.max()))
+    return worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--minutes", type=int, default=60)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    rows = simulate_shift(args.minutes, args.seed)
+    sampler = LocationSampler(
+        min_distance_m=settings.LOCATION_SAMPLING_MIN_DISTANCE_M,
+        max_distance_m=settings.LOCATION_SAMPLING_MAX_DISTANCE_M,
+        max_interval=settings.LOCATION_SAMPLING_MAX_INTERVAL_SECONDS,
+        min_heading_change=settings.LOCATION_SAMPLING_MIN_HEADING_CHANGE_DEG,
+    )
+    start = time.perf_counter()
+    stored = sampler.select(rows)
+    elapsed = time.perf_counter() - start
+
+    print(
+        f"fixes={len(rows)} stored={len(stored)} "
+        f"reduction={len(rows) / len(stored):.1f}x "
+        f"max_deviation={max_deviation_m(rows, stored):.1f}m "
+        f"sampling={len(rows) / elapsed:,.0f} fixes/s"
+    )
+
+
+if __name__ == "__main__":
+    main()
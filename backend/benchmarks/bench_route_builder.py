@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Time fleet-wide route building and compare it with a sweep baseline.
+
+For each employee count, plans routes for a mixed fleet of 4-, 6- and
+12-seat vehicles around a depot and reports the wall time, route count and
+total length against angular sweep plus per-route optimization. The plan
+runs in the worker pool while a ticker measures how long the event loop
+was ever blocked.
+
+Usage:
+    python benchmarks/bench_route_builder.py [--sizes 1000 3000 5000] [--budget 20] [--seed 1]
+"""
+
+import argparse
+import asyncio
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.services import route_builder  # noqa: E402
+from safe_route.services.job_runner import shutdown_workers  # noqa: E402
+from safe_route.services.route_optimizer import optimize_stop_order  # noqa: E402
+
+DEPOT = (12.97, 77.59)
+TICK_SECONDS = 0.01
+
+
+def fleet(count):
+    """Seats for about 1.3x the employees: half in 12-seaters, the rest smaller."""
+    return [12] * (count // 20) + [6] * (count // 20) + [4] * (count // 10)
+
+
+def sweep_km(lats, lngs, capacities):
+    order = np.argsort(np.arctan2(lats - DEPOT[0], lngs - DEPOT[1]))
+    total, start = 0.0, 0
+    for capacity in sorted(capacities, reverse=True):
+        chunk = order[start:start + capacity]
+        start += capacity
+        if len(chunk):
+            total += optimize_stop_order(lats[chunk], lngs[chunk], depot=DEPOT, time_budget=0.02)["length_after_km"]
+    return total
+
+
+async def plan_with_ticker(lats, lngs, capacities, budget):
+    worst = 0.0
+    done = False
+
+    async def ticker():
+        nonlocal worst
+        while not done:
+            start = time.perf_counter()
+            await asyncio.sleep(TICK_SECONDS)
+            worst = max(worst, time.perf_counter() - start - TICK_SECONDS)
+
+    task = asyncio.create_task(ticker())
+    start = time.perf_counter()
+    plan = await route_builder.plan_routes_in_pool(lats, lngs, DEPOT, capacities, time_budget=budget)
+    elapsed = time.perf_counter() - start
+    done = True
+    await task
+    return plan, elapsed, worst
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 3000, 5000])
+    parser.add_argument("--budget", type=float, default=20.0, help="local search seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = np.random.default_rng(args.seed)
+
+    print(f"{'employees':>9} {'routes':>7} {'wall s':>7} {'loop lag ms':>12} {'km':>9} {'sweep km':>9} {'saved':>7}")
+    try:
+        for size in args.sizes:
+            lats = rng.uniform(12.85, 13.10, size)
+            lngs = rng.uniform(77.45, 77.75, size)
+            capacities = fleet(size)
+            plan, elapsed, lag = asyncio.run(plan_with_ticker(lats, lngs, capacities, args.budget))
+            baseline = sweep_km(lats, lngs, capacities)
+            print(f"{size:>9} {len(plan['routes']):>7} {elapsed:>7.2f} {lag * 1000:>12.1f} "
+                  f"{plan['total_length_km']:>9.1f} {baseline:>9.1f} {1 - plan['total_length_km'] / baseline:>7.1%}")
+    finally:
+        shutdown_workers()
+
+
+if __name__ == "__main__":
+    main()
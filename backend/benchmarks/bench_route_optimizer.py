@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Measure how much local search shortens greedy routes within a time budget.
+
+For each stop count and budget, optimizes random routes around a depot
+and reports the greedy and final lengths and the wall time, which must
+stay within the budget.
+
+Usage:
+    python benchmarks/bench_route_optimizer.py [--sizes 50 200 400] [--budgets 0.05 0.2 1.0] [--routes 5]
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.services.route_optimizer import optimize_stop_order  # noqa: E402
+
+DEPOT = (12.97, 77.59)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 400])
+    parser.add_argument("--budgets", type=float, nargs="+", default=[0.05, 0.2, 1.0])
+    parser.add_argument("--routes", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'stops':>6} {'budget s':>9} {'greedy km':>10} {'final km':>9} {'saved':>7} {'moves':>6} {'max wall s':>11}")
+    for size in args.sizes:
+        for budget in args.budgets:
+            rng = np.random.default_rng(args.seed)
+            greedy, final, moves, wall = [], [], [], []
+            for _ in range(args.routes):
+                lats = rng.uniform(12.85, 13.10, size)
+                lngs = rng.uniform(77.45, 77.75, size)
+                start = time.perf_counter()
+                result = optimize_stop_order(lats, lngs, depot=DEPOT, time_budget=budget)
+                wall.append(time.perf_counter() - start)
+                greedy.append(result["greedy_length_km"])
+                final.append(result["length_after_km"])
+                moves.append(result["moves"])
+            saved = 1 - np.sum(final) / np.sum(greedy)
+            print(f"{size:>6} {budget:>9.2f} {np.mean(greedy):>10.1f} {np.mean(final):>9.1f} "
+                  f"{saved:>7.1%} {np.mean(moves):>6.0f} {max(wall):>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,225 @@
+#!/usr/bin/env python3
+"""
+Run the geo and routing benchmarks on synthetic cities and record JSON.
+
+Employee coordinates are generated city-like: most employees live in a
+few residential clusters of different sizes and spreads around the
+office (the depot), the rest are scattered over the whole area. Each
+size draws its own points from the seed, so a case sees the same
+coordinates whichever other sizes are run. For every case and size the
+suite records the best wall time over the repeats (more of them for
+cases that take milliseconds), the peak memory traced by tracemalloc in
+a separate, untimed run and, for orderings, the tour length.
+
+Cases: the pairwise `haversine_matrix`, the blockwise k-nearest
+`nearest_neighbours`, `optimize_route_sequence` (greedy), the
+time-budgeted `optimize_stop_order` and fleet `plan_routes`, and
+`cluster_stops` as k-means with n / 10 clusters and as groups capped at
+12 stops. Budgeted cases run for about their budget, so for them the
+tour length is the figure to watch; it also depends on how much search
+the machine fits in the budget. Cases that would need an n x n matrix
+are capped in size.
+
+With --output the results are written as JSON; with --baseline they are
+compared against a stored run and the exit status is 1 if any time or
+memory figure grew by more than --tolerance (times also by more than
+5 ms), or any length by more than --length-tolerance. Timings only
+compare on the same machine, so record a baseline there first:
+
+    python benchmarks/bench_suite.py --output benchmarks/baseline.json
+    python benchmarks/bench_suite.py --baseline benchmarks/baseline.json
+
+Usage:
+    python benchmarks/bench_suite.py [--sizes 50 200 1000 5000 10000] [--cases ...] [--repeats 3]
+        [--budget 0.5] [--build-budget 5] [--seed 1] [--output FILE] [--baseline FILE]
+"""
+
+import argparse
+import json
+import math
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+import numpy as np
+
+# Add src to path so safe_route can be imported
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "src"))
+
+from safe_route.services.clustering import cluster_stops  # noqa: E402
+from safe_route.services.route_builder import nearest_neighbours, plan_routes  # noqa: E402
+from safe_route.services.route_optimizer import optimize_stop_order  # noqa: E402
+from safe_route.utils.geo import haversine_matrix, optimize_route_sequence  # noqa: E402
+from safe_route.utils.tour import path_length  # noqa: E402
+
+DEPOT = (12.97, 77.59)
+KM_PER_DEG_LAT = 111.32
+KM_PER_DEG_LNG = KM_PER_DEG_LAT * math.cos(math.radians(DEPOT[0]))
+CITY_RADIUS_KM = 15.0
+BACKGROUND_SHARE = 0.15  # Employees scattered outside any cluster
+NEIGHBOURS = 30
+MIN_TIMED_SECONDS = 0.5
+MAX_RUNS = 1000
+TIME_NOISE_SECONDS = 0.005  # Smaller time differences are not reported as regressions
+
+
+def city(size: int, seed: int):
+    """`size` employee (lats, lngs) around the depot: clusters plus scattered background."""
+    rng = np.random.default_rng([seed, size])
+    clusters = max(3, int(round(math.sqrt(size) / 4)))
+    centres = rng.uniform(-0.8, 0.8, (clusters, 2)) * CITY_RADIUS_KM
+    spreads = rng.uniform(0.4, 2.5, clusters)
+    # Skewed cluster sizes, as a few neighbourhoods house most employees
+    weights = rng.pareto(1.5, clusters) + 0.2
+    background = rng.binomial(size, BACKGROUND_SHARE)
+    members = rng.choice(clusters, size - background, p=weights / weights.sum())
+    points = np.concatenate([
+        centres[members] + rng.normal(size=(len(members), 2)) * spreads[members, None],
+        rng.uniform(-1, 1, (background, 2)) * CITY_RADIUS_KM,
+    ])
+    rng.shuffle(points)
+    return DEPOT[0] + points[:, 1] / KM_PER_DEG_LAT, DEPOT[1] + points[:, 0] / KM_PER_DEG_LNG
+
+
+def fleet(size: int):
+    """Mixed 4-, 6- and 12-seat vehicles with about 1.3x the seats needed."""
+    return [12] * max(1, size // 20) + [6] * max(1, size // 20) + [4] * max(1, size // 10)
+
+
+def run_greedy(lats, lngs, args):
+    stops = [{"index": i, "lat": lat, "lng": lng} for i, (lat, lng) in enumerate(zip(lats, lngs))]
+    return [stop["index"] for stop in optimize_route_sequence(DEPOT, stops)]
+
+
+def greedy_length(lats, lngs, order) -> float:
+    distances = haversine_matrix(np.append(DEPOT[0], lats), np.append(DEPOT[1], lngs))
+    return path_length(distances, [0] + [index + 1 for index in order])
+
+
+# name: (timed function, tour length of its result, largest size it runs at)
+CASES = {
+    "haversine_matrix": (lambda lats, lngs, args: haversine_matrix(lats, lngs), None, 5000),
+    "nearest_neighbours": (
+        lambda lats, lngs, args: nearest_neighbours(lats, lngs, min(NEIGHBOURS, len(lats) - 1)), None, None,
+    ),
+    "optimize_route_sequence": (run_greedy, greedy_length, 5000),
+    "optimize_stop_order": (
+        lambda lats, lngs, args: optimize_stop_order(lats, lngs, depot=DEPOT, time_budget=args.budget),
+        lambda lats, lngs, result: result["length_after_km"],
+        2000,
+    ),
+    "plan_routes": (
+        lambda lats, lngs, args: plan_routes(lats, lngs, DEPOT, fleet(len(lats)), time_budget=args.build_budget),
+        lambda lats, lngs, result: result["total_length_km"],
+        None,
+    ),
+    "cluster_stops_kmeans": (lambda lats, lngs, args: cluster_stops(lats, lngs, clusters=len(lats) // 10), None, None),
+    "cluster_stops_capacity": (lambda lats, lngs, args: cluster_stops(lats, lngs, capacity=12), None, None),
+}
+
+
+def measure(fn, length_of, lats, lngs, args) -> dict:
+    tracemalloc.start()
+    result = fn(lats, lngs, args)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    length = None if length_of is None else length_of(lats, lngs, result)
+    del result
+    # Fast cases repeat until they have run for a while, to steady the best time
+    best, runs, began = math.inf, 0, time.perf_counter()
+    while runs < args.repeats or (time.perf_counter() - began < MIN_TIMED_SECONDS and runs < MAX_RUNS):
+        start = time.perf_counter()
+        fn(lats, lngs, args)
+        best = min(best, time.perf_counter() - start)
+        runs += 1
+    return {
+        "seconds": round(best, 6),
+        "peak_mb": round(peak / 2**20, 3),
+        "length_km": None if length is None else round(float(length), 3),
+    }
+
+
+def compare(results, baseline, tolerance, length_tolerance):
+    """Print each result against the baseline and return the regressions."""
+    stored = {(entry["case"], entry["size"]): entry for entry in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':>24} {'size':>6} {'time':>8} {'memory':>8} {'length':>8}")
+    for entry in results:
+        old = stored.get((entry["case"], entry["size"]))
+        if old is None:
+            continue
+        cells = []
+        for field, limit in (("seconds", tolerance), ("peak_mb", tolerance), ("length_km", length_tolerance)):
+            if not old.get(field) or entry[field] is None:
+                cells.append(f"{'-':>8}")
+                continue
+            change = entry[field] / old[field] - 1
+            cells.append(f"{change:>+8.1%}")
+            if change > limit and (field != "seconds" or entry[field] - old[field] > TIME_NOISE_SECONDS):
+                regressions.append(f"{entry['case']} at {entry['size']}: {field} {old[field]} -> {entry[field]}")
+        print(f"{entry['case']:>24} {entry['size']:>6} {' '.join(cells)}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[50, 200, 1000, 5000, 10000])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES), default=list(CASES))
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--budget", type=float, default=0.5, help="optimize_stop_order seconds")
+    parser.add_argument("--build-budget", type=float, default=5.0, help="plan_routes seconds")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", type=Path, help="write the results to this JSON file")
+    parser.add_argument("--baseline", type=Path, help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed time and memory growth")
+    parser.add_argument("--length-tolerance", type=float, default=0.02, help="allowed tour length growth")
+    args = parser.parse_args()
+
+    results = []
+    print(f"{'case':>24} {'size':>6} {'best s':>9} {'peak MB':>9} {'length km':>10}")
+    for size in args.sizes:
+        lats, lngs = city(size, args.seed)
+        for case in args.cases:
+            fn, length_of, max_size = CASES[case]
+            if max_size is not None and size > max_size:
+                continue
+            entry = {"case": case, "size": size, **measure(fn, length_of, lats, lngs, args)}
+            results.append(entry)
+            length = "-" if entry["length_km"] is None else f"{entry['length_km']:.1f}"
+            print(f"{case:>24} {size:>6} {entry['seconds']:>9.4f} {entry['peak_mb']:>9.2f} {length:>10}")
+
+    report = {
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "machine": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+        },
+        "settings": {
+            "seed": args.seed,
+            "repeats": args.repeats,
+            "budget": args.budget,
+            "build_budget": args.build_budget,
+        },
+        "results": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2) + "\n")
+
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text())
+        if baseline["settings"] != report["settings"]:
+            print(f"\nwarning: baseline settings differ: {baseline['settings']}")
+        regressions = compare(results, baseline, args.tolerance, args.length_tolerance)
+        if regressions:
+            print("\nRegressions:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
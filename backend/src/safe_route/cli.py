@@ -0,0 +1,92 @@
+"""Maintenance commands for Safe Route.
+
+Usage: python -m safe_route.cli <command>
+"""
+
+import argparse
+import time
+from datetime import datetime, timedelta
+
+from safe_route import models  # noqa: F401  (registers tables on Base.metadata)
+from safe_route.config import get_settings
+from safe_route.database import SessionLocal, create_schema, engine
+from safe_route.services.location_archive import location_archive
+from safe_route.services.location_writer import rebuild_latest_locations
+from safe_route.services.speed_profile import speed_profile
+
+settings = get_settings()
+
+
+def backfill_latest_locations(args: argparse.Namespace) -> None:
+    """Rebuild driver_latest_locations from the location history."""
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        drivers = rebuild_latest_locations(db)
+        elapsed = time.perf_counter() - started
+        print(f"Rebuilt latest locations for {drivers} drivers in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+def archive_locations(args: argparse.Namespace) -> None:
+    """Move closed days of location history into the columnar archive."""
+    if not location_archive.enabled:
+        raise SystemExit("LOCATION_ARCHIVE_DIR is not set")
+    before = (datetime.utcnow() - timedelta(days=args.older_than_days)).date()
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        rows, days = location_archive.export_before(db, before)
+        elapsed = time.perf_counter() - started
+        print(f"Archived {rows} locations from {days} days before {before} in {elapsed:.2f}s")
+    finally:
+        db.close()
+
+
+def build_speed_profile(args: argparse.Namespace) -> None:
+    """Fold location history not yet aggregated into the ETA speed profile."""
+    db = SessionLocal()
+    try:
+        report = speed_profile.refresh(db)
+        print(
+            f"Aggregated {report['rows']} locations into {report['cells']} speed profile cells "
+            f"in {report['elapsed_ms'] / 1000:.2f}s"
+        )
+    finally:
+        db.close()
+
+
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(prog="safe-route", description="Safe Route maintenance commands")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    backfill = commands.add_parser(
+        "backfill-latest-locations",
+        help="Rebuild the latest-location table from location history",
+    )
+    backfill.set_defaults(handler=backfill_latest_locations)
+
+    archive = commands.add_parser(
+        "archive-locations",
+        help="Move closed days of location history into the columnar archive",
+    )
+    archive.add_argument(
+        "--older-than-days", type=int, default=settings.LOCATION_ARCHIVE_AFTER_DAYS,
+        help="Archive days that ended at least this many days ago",
+    )
+    archive.set_defaults(handler=archive_locations)
+
+    profile = commands.add_parser(
+        "build-speed-profile",
+        help="Aggregate new location history into the ETA speed profile",
+    )
+    profile.set_defaults(handler=build_speed_profile)
+
+    args = parser.parse_args(argv)
+    create_schema(engine)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -19,6 +19,85 @@ class Settings(BaseSettings):
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 30
 
+    # Location tracking
+    LOCATION_BATCH_MAX_POINTS: int = 500
+    LOCATION_MAX_CLOCK_SKEW_SECONDS: float = 300.0  # Device fix times further ahead are rejected
+    LOCATION_STREAM_MIN_INTERVAL_SECONDS: float = 1.0  # Per-driver SSE rate cap
+    LOCATION_STREAM_KEEPALIVE_SECONDS: float = 15.0
+    SPATIAL_GRID_CELL_KM: float = 1.0  # Cell size of the live driver grid
+    # Live WebSocket connections: subscribers get a bounded per-connection
+    # outbox and are disconnected once their oldest queued frame is this stale
+    LOCATION_WS_OUTBOX_MAX_DRIVERS: int = 1000
+    LOCATION_WS_LAG_DEADLINE_SECONDS: float = 10.0
+    LOCATION_WS_HEARTBEAT_SECONDS: float = 20.0
+    LOCATION_WS_IDLE_TIMEOUT_SECONDS: float = 90.0  # Close sockets silent for this long
+
+    # Sampling keeps near-duplicate fixes out of history: jitter inside the
+    # min distance is dropped, straight runs keep a fix per max distance and
+    # turns keep their corner (min distance 0 disables sampling)
+    LOCATION_SAMPLING_MIN_DISTANCE_M: float = 10.0
+    LOCATION_SAMPLING_MAX_DISTANCE_M: float = 100.0
+    LOCATION_SAMPLING_MAX_INTERVAL_SECONDS: float = 60.0
+    LOCATION_SAMPLING_MIN_HEADING_CHANGE_DEG: float = 20.0
+
+    # Write-behind buffering trades durability of the last second of fixes
+    # for ingestion latency, so it is opt-in
+    LOCATION_WRITE_BEHIND: bool = False
+    LOCATION_BUFFER_MAX_ROWS: int = 10000
+    LOCATION_BUFFER_FLUSH_ROWS: int = 500
+    LOCATION_BUFFER_FLUSH_INTERVAL_SECONDS: float = 1.0
+    LOCATION_BUFFER_PUT_TIMEOUT_SECONDS: float = 2.0
+
+    # History retention as [max_age_days, bucket_seconds] tiers, youngest
+    # first. Bucket 0 keeps full resolution; older rows are dropped.
+    LOCATION_RETENTION_TIERS: list[list[int]] = [[7, 0], [90, 30]]
+    LOCATION_RETENTION_CHUNK_ROWS: int = 2000
+    LOCATION_RETENTION_INTERVAL_HOURS: float = 0  # 0 disables the periodic job
+    # Closed days older than this move from the database into per-day columnar
+    # files under LOCATION_ARCHIVE_DIR during retention (empty dir disables)
+    LOCATION_ARCHIVE_DIR: str = ""
+    LOCATION_ARCHIVE_AFTER_DAYS: int = 7
+
+    # Trips
+    TRIP_TRACK_CACHE_SIZE: int = 256  # Simplified tracks of completed trips
+    TRIP_START_RADIUS_KM: float = 1.0  # Max distance from the first stop to start a trip
+    TRIP_REPLAY_PAGE_SIZE: int = 500  # Fixes fetched per keyset page when replaying
+    TRIP_REPLAY_MAX_GAP_SECONDS: float = 5.0  # Longest pause between fixes in timed playback
+    # Stop arrival fires inside the arrival radius, departure outside the wider one
+    GEOFENCE_ARRIVAL_RADIUS_M: float = 100.0
+    GEOFENCE_DEPARTURE_RADIUS_M: float = 150.0
+    ETA_AVERAGE_SPEED_KMH: float = 30.0  # Fallback where the speed profile has no data
+    # Speed profile: mean reported speed of trip fixes (fixes sent with a
+    # trip_id) per grid cell and hour of week, folded in incrementally from
+    # new history rows
+    SPEED_PROFILE_CELL_DEG: float = 0.01  # ~1.1 km cells
+    SPEED_PROFILE_MIN_SAMPLES: int = 20  # Sparser cells use the hour's fleet-wide mean
+    SPEED_PROFILE_MIN_KMH: float = 5.0  # Floor so a cell of parked fixes cannot stall an ETA
+    SPEED_PROFILE_CHUNK_ROWS: int = 10000
+    # 0 disables the periodic refresh; off by default as the driver app does not
+    # tag its fixes with trip_id yet, so there is nothing to learn from
+    SPEED_PROFILE_INTERVAL_HOURS: float = 0.0
+
+    # Route optimization: pickup routes end at the depot (office) and drop
+    # routes leave it; without one, a route may start and end at any stop
+    ROUTE_DEPOT_LAT: float | None = None
+    ROUTE_DEPOT_LNG: float | None = None
+    ROUTE_OPTIMIZE_TIME_BUDGET_MS: int = 200  # Local search time after the greedy tour
+    ROUTE_OPTIMIZE_MAX_TIME_BUDGET_MS: int = 10000
+    ROUTE_OPTIMIZE_SYNC_MAX_STOPS: int = 50  # Larger routes are optimized as background jobs
+    ROUTE_OPTIMIZE_SYNC_MAX_TIME_BUDGET_MS: int = 200  # Inline runs block the event loop; longer ones go to jobs
+    ROUTE_DISTANCE_CACHE_SIZE: int = 512  # Stop distance matrices kept, one per set of stops
+    ROUTE_DISTANCE_CACHE_MAX_MB: int = 256  # Total size cap; a 2,000-stop matrix alone is 32 MB
+    ROUTE_BUILD_TIME_BUDGET_SECONDS: float = 30.0  # Local search time after construction
+    ROUTE_BUILD_NEIGHBOURS: int = 30  # Nearest stops considered for merges and moves
+    CLUSTER_MAX_ITERATIONS: int = 25  # k-means rounds when clustering employees for routes
+
+    # Background jobs: CPU-bound work runs in worker processes, polled by id
+    JOB_WORKERS: int = 2
+    JOB_TIME_LIMIT_SECONDS: float = 120.0
+    JOB_MAX_TIME_LIMIT_SECONDS: float = 600.0
+    JOB_HISTORY_SIZE: int = 1000  # Finished jobs kept for status queries
+
     # CORS
     CORS_ORIGINS: list[str] | str = ["http://localhost:3000"]
 
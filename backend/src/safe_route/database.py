@@ -20,6 +20,19 @@ class Base(DeclarativeBase):
     pass
 
 
+def create_schema(bind=engine) -> None:
+    """
+    Create missing tables, then any indexes missing from existing tables.
+
+    `create_all` skips a table that already exists, so an index added to
+    its model later would otherwise never reach an existing database.
+    """
+    Base.metadata.create_all(bind=bind)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+
+
 def get_db():
     """Dependency that provides a database session."""
     db = SessionLocal()
@@ -1,14 +1,19 @@
 """FastAPI application entry point."""
 
+import asyncio
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from safe_route.config import get_settings
-from safe_route.database import Base, engine
-from safe_route.routers import auth, drivers, employees, vehicles, routes, trips, location, messages, sos, audit
+from safe_route.database import create_schema, engine
+from safe_route.routers import auth, drivers, employees, vehicles, routes, trips, location, messages, sos, audit, jobs
 from safe_route.models import User, Driver, Employee, Vehicle, Route, RouteStop, Trip, DriverLocation, Message, SOSAlert  # noqa: F401
+from safe_route.services.job_runner import job_runner, shutdown_workers
+from safe_route.services.location_buffer import location_buffer
+from safe_route.services.location_retention import location_retention
+from safe_route.services.speed_profile import speed_profile
 
 
 settings = get_settings()
@@ -28,8 +33,8 @@ print(f"DEBUG: CORS Origins: {origins}")
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler for startup/shutdown events."""
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: Create database tables and any indexes they are missing
+    create_schema(engine)
     
     # Seed admin user if not exists
     from sqlalchemy.orm import Session
@@ -54,9 +59,27 @@ async def lifespan(app: FastAPI):
             print("✓ Admin user created (admin / admin123)")
     finally:
         db.close()
+
+    if settings.LOCATION_WRITE_BEHIND:
+        await location_buffer.start()
+
+    background_tasks = []
+    if settings.LOCATION_RETENTION_INTERVAL_HOURS > 0:
+        background_tasks.append(asyncio.create_task(location_retention.run_periodically(
+            SessionLocal, settings.LOCATION_RETENTION_INTERVAL_HOURS
+        )))
+    if settings.SPEED_PROFILE_INTERVAL_HOURS > 0:
+        background_tasks.append(asyncio.create_task(speed_profile.run_periodically(
+            SessionLocal, settings.SPEED_PROFILE_INTERVAL_HOURS
+        )))
     
     yield
-    # Shutdown: Nothing to do
+    # Shutdown: Stop background jobs and workers, write out any buffered location fixes
+    for task in background_tasks:
+        task.cancel()
+    job_runner.clear()
+    shutdown_workers()
+    await location_buffer.stop()
 
 
 app = FastAPI(
@@ -87,6 +110,7 @@ app.include_router(location.router)
 app.include_router(messages.router)
 app.include_router(sos.router)
 app.include_router(audit.router)
+app.include_router(jobs.router)
 
 
 @app.get("/")
@@ -6,7 +6,8 @@ from safe_route.models.employee import Employee
 from safe_route.models.vehicle import Vehicle, CarType
 from safe_route.models.route import Route, RouteStop, RouteType
 from safe_route.models.trip import Trip, TripStatus
-from safe_route.models.location import DriverLocation
+from safe_route.models.location import DriverLocation, DriverLatestLocation, LocationRetentionWatermark
+from safe_route.models.speed_profile import SpeedProfileCell, SpeedProfileWatermark
 from safe_route.models.message import Message
 from safe_route.models.sos import SOSAlert, SOSStatus
 from safe_route.models.audit import AuditLog
@@ -18,7 +19,8 @@ __all__ = [
     "Vehicle", "CarType",
     "Route", "RouteStop", "RouteType",
     "Trip", "TripStatus",
-    "DriverLocation",
+    "DriverLocation", "DriverLatestLocation", "LocationRetentionWatermark",
+    "SpeedProfileCell", "SpeedProfileWatermark",
     "Message",
     "SOSAlert", "SOSStatus",
     "AuditLog",
@@ -2,7 +2,7 @@
 
 from datetime import datetime
 
-from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey
+from sqlalchemy import Column, Integer, Float, DateTime, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from safe_route.database import Base
@@ -12,6 +12,12 @@ class DriverLocation(Base):
     """Real-time driver GPS location."""
 
     __tablename__ = "driver_locations"
+    __table_args__ = (
+        # Serves "latest fix for driver X" without sorting the driver's history
+        Index("ix_driver_locations_driver_ts", "driver_id", "timestamp"),
+        # Serves a trip's path in time order
+        Index("ix_driver_locations_trip_ts", "trip_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     driver_id = Column(Integer, ForeignKey("drivers.id"), nullable=False, index=True)
@@ -19,9 +25,35 @@ class DriverLocation(Base):
     lat = Column(Float, nullable=False)
     lng = Column(Float, nullable=False)
     heading = Column(Float, nullable=True)  # Direction in degrees
-    speed = Column(Float, nullable=True)  # Speed in km/h
+    speed = Column(Float, nullable=True)  # Speed in m/s, as reported by the device
     timestamp = Column(DateTime, default=datetime.utcnow, index=True)
 
     # Relationships
     driver = relationship("Driver", backref="locations")
     trip = relationship("Trip", backref="locations")
+
+
+class DriverLatestLocation(Base):
+    """Latest known GPS fix per driver, maintained on every location write."""
+
+    __tablename__ = "driver_latest_locations"
+
+    driver_id = Column(Integer, ForeignKey("drivers.id"), primary_key=True)
+    location_id = Column(Integer, nullable=True)  # driver_locations.id of the fix
+    trip_id = Column(Integer, ForeignKey("trips.id"), nullable=True)
+    lat = Column(Float, nullable=False)
+    lng = Column(Float, nullable=False)
+    heading = Column(Float, nullable=True)
+    speed = Column(Float, nullable=True)
+    timestamp = Column(DateTime, nullable=False)
+
+
+class LocationRetentionWatermark(Base):
+    """How far one retention tier has compacted driver_locations."""
+
+    __tablename__ = "location_retention_watermarks"
+
+    # A tier is identified by its definition, so a changed tier starts over
+    max_age_days = Column(Integer, primary_key=True)
+    bucket_seconds = Column(Integer, primary_key=True)
+    compacted_until = Column(DateTime, nullable=False)  # Rows before this are already thinned
@@ -0,0 +1,29 @@
+"""Historical speed profile aggregated from driver location history."""
+
+from datetime import datetime
+
+from sqlalchemy import Column, Integer, Float, DateTime
+
+from safe_route.database import Base
+
+
+class SpeedProfileCell(Base):
+    """Reported speeds of trip fixes summed per grid cell and hour of week."""
+
+    __tablename__ = "speed_profile_cells"
+
+    cell_lat = Column(Integer, primary_key=True)  # floor(lat / SPEED_PROFILE_CELL_DEG)
+    cell_lng = Column(Integer, primary_key=True)  # floor(lng / SPEED_PROFILE_CELL_DEG)
+    hour_of_week = Column(Integer, primary_key=True)  # 0 = Monday 00:00-01:00 UTC
+    samples = Column(Integer, nullable=False, default=0)
+    speed_sum = Column(Float, nullable=False, default=0.0)  # km/h, summed over samples
+
+
+class SpeedProfileWatermark(Base):
+    """Highest driver_locations.id already folded into the speed profile."""
+
+    __tablename__ = "speed_profile_watermark"
+
+    id = Column(Integer, primary_key=True)  # Always 1
+    last_location_id = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
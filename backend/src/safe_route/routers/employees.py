@@ -10,9 +10,13 @@ from safe_route.models.employee import Employee
 from safe_route.models.user import User, UserRole
 from safe_route.schemas.employee import EmployeeCreate, EmployeeUpdate, EmployeeResponse
 from safe_route.services.auth import get_current_admin_user, get_current_user, get_password_hash
+from safe_route.services.distance_cache import distance_cache
+from safe_route.services.geofence import geofence_engine
 
 router = APIRouter(prefix="/employees", tags=["Employees"])
 
+COORDINATE_FIELDS = {"pickup_lat", "pickup_lng", "drop_lat", "drop_lng"}
+
 
 @router.get("/me", response_model=EmployeeResponse)
 async def get_me_profile(
@@ -106,6 +110,9 @@ async def update_employee(
 
     db.commit()
     db.refresh(employee)
+    geofence_engine.invalidate_employee(employee_id)
+    if COORDINATE_FIELDS & update_data.keys():
+        distance_cache.invalidate_employee(employee_id)
     return employee
 
 
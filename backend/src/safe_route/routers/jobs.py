@@ -0,0 +1,34 @@
+"""Background job status router."""
+
+from fastapi import APIRouter, Depends, HTTPException
+
+from safe_route.models.user import User
+from safe_route.schemas.job import JobResponse
+from safe_route.services.auth import get_current_admin_user
+from safe_route.services.job_runner import job_runner
+
+router = APIRouter(prefix="/jobs", tags=["Jobs"])
+
+
+@router.get("/{job_id}", response_model=JobResponse)
+async def get_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get a job's status, with its result once it succeeded (Admin only)."""
+    job = job_runner.get(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
+
+
+@router.post("/{job_id}/cancel", response_model=JobResponse)
+async def cancel_job(
+    job_id: str,
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Cancel a job; its result is never applied (Admin only)."""
+    job = job_runner.cancel(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.snapshot()
@@ -1,21 +1,53 @@
 """Location tracking router with WebSocket support."""
 
-from typing import List
-from datetime import datetime
+import asyncio
+import time
+from typing import List, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, WebSocket, WebSocketDisconnect
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, WebSocket, WebSocketDisconnect, status
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import StreamingResponse
+from pydantic import ValidationError
 from sqlalchemy.orm import Session
 
+from safe_route.config import get_settings
 from safe_route.database import get_db
-from safe_route.models.location import DriverLocation
-from safe_route.models.user import User
-from safe_route.schemas.location import LocationUpdate, LocationResponse
-from safe_route.services.auth import get_current_user
+from safe_route.models.driver import Driver, AvailabilityStatus
+from safe_route.models.route import RouteStop
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.models.user import User, UserRole
+from safe_route.schemas.location import (
+    LocationUpdate, LocationBatch, LocationBatchAck, LocationResponse, LocationBufferStats,
+    DriverSamplingStats, LatestLocationRebuild, NearbyDriverResponse, RetentionReport, SpeedProfileReport,
+    SubscriberStats,
+)
+from safe_route.services.auth import get_current_admin_user, get_current_user, get_user_from_token
+from safe_route.services.fleet_stream import FleetStreamSubscriber, fleet_event_stream
+from safe_route.services.location import ingest_locations
+from safe_route.services.location_buffer import LocationBufferFull, location_buffer
+from safe_route.services.location_hub import (
+    BinaryWebSocketSubscriber, LocationFrame, SlowSubscriber, WebSocketSubscriber, location_hub,
+)
+from safe_route.services.location_retention import location_retention
+from safe_route.services.location_sampler import location_sampler
+from safe_route.services.location_store import location_store
+from safe_route.services.location_writer import rebuild_latest_locations
+from safe_route.services.spatial_index import driver_grid
+from safe_route.services.speed_profile import speed_profile
+from safe_route.utils.location_codec import (
+    BINARY_CONTENT_TYPE, SUBPROTOCOL_BINARY, SUBPROTOCOL_BINARY_DELTA, DecodedFix, FrameDecoder,
+)
+
+settings = get_settings()
 
 router = APIRouter(prefix="/location", tags=["Location"])
 
-# Store active WebSocket connections
-active_connections: dict[int, WebSocket] = {}
+ACTIVE_TRIP_STATUSES = [TripStatus.SCHEDULED, TripStatus.STARTED, TripStatus.IN_PROGRESS]
+
+
+def _buffer_full(error: LocationBufferFull) -> HTTPException:
+    """Tell the client to back off and retry while the buffer drains."""
+    return HTTPException(status_code=503, detail=str(error), headers={"Retry-After": "1"})
 
 
 @router.post("/", response_model=LocationResponse)
@@ -28,18 +60,77 @@ async def update_location(
     if not current_user.driver_profile:
         raise HTTPException(status_code=400, detail="User is not a driver")
 
-    location = DriverLocation(
-        driver_id=current_user.driver_profile.id,
-        trip_id=location_data.trip_id,
-        lat=location_data.lat,
-        lng=location_data.lng,
-        heading=location_data.heading,
-        speed=location_data.speed,
+    try:
+        return await ingest_locations(db, current_user.driver_profile.id, [location_data])
+    except LocationBufferFull as e:
+        raise _buffer_full(e)
+
+
+def _fix_to_update(fix: DecodedFix) -> LocationUpdate:
+    """Validate a decoded binary fix like any JSON location update."""
+    return LocationUpdate(
+        lat=fix.lat, lng=fix.lng, heading=fix.heading, speed=fix.speed,
+        trip_id=fix.trip_id, timestamp=fix.timestamp,
     )
-    db.add(location)
-    db.commit()
-    db.refresh(location)
-    return location
+
+
+async def _read_location_batch(request: Request) -> List[LocationUpdate]:
+    """Parse a batch body sent as JSON or as binary location frames."""
+    body = await request.body()
+    content_type = request.headers.get("content-type", "").split(";")[0].strip()
+    try:
+        if content_type == BINARY_CONTENT_TYPE:
+            try:
+                fixes = FrameDecoder().decode(body)
+            except ValueError as e:
+                raise HTTPException(status_code=400, detail=str(e))
+            return LocationBatch(points=[_fix_to_update(fix) for fix in fixes]).points
+        return LocationBatch.model_validate_json(body).points
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+
+_BATCH_OPENAPI = {
+    "requestBody": {
+        "required": True,
+        "content": {
+            "application/json": {"schema": {
+                "type": "object",
+                "required": ["points"],
+                "properties": {"points": {
+                    "type": "array",
+                    "items": {"$ref": "#/components/schemas/LocationUpdate"},
+                }},
+            }},
+            BINARY_CONTENT_TYPE: {"schema": {"type": "string", "format": "binary"}},
+        },
+    },
+}
+
+
+@router.post("/batch", response_model=LocationBatchAck, openapi_extra=_BATCH_OPENAPI)
+async def update_location_batch(
+    points: List[LocationUpdate] = Depends(_read_location_batch),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """
+    Record a batch of buffered GPS fixes in a single transaction.
+
+    Accepts a JSON `LocationBatch` or concatenated binary location frames
+    (`application/x-saferoute-location`); driver ids inside binary frames
+    are ignored in favour of the authenticated driver.
+    """
+    if not current_user.driver_profile:
+        raise HTTPException(status_code=400, detail="User is not a driver")
+
+    try:
+        latest = await ingest_locations(db, current_user.driver_profile.id, points)
+    except LocationBufferFull as e:
+        raise _buffer_full(e)
+    return LocationBatchAck(accepted=len(points), last_timestamp=latest.timestamp)
 
 
 @router.get("/driver/{driver_id}", response_model=LocationResponse)
@@ -49,13 +140,7 @@ async def get_driver_location(
     current_user: User = Depends(get_current_user),
 ):
     """Get latest location for a driver."""
-    location = db.query(DriverLocation).filter(
-        DriverLocation.driver_id == driver_id
-    ).order_by(DriverLocation.timestamp.desc()).first()
-
-    if not location:
-        return None
-    return location
+    return location_store.get(db, driver_id)
 
 
 @router.get("/all", response_model=List[LocationResponse])
@@ -64,40 +149,346 @@ async def get_all_driver_locations(
     current_user: User = Depends(get_current_user),
 ):
     """Get latest location for all drivers (Admin only)."""
-    from sqlalchemy import func
-    
-    # Subquery to get latest timestamp per driver
-    subq = db.query(
-        DriverLocation.driver_id,
-        func.max(DriverLocation.timestamp).label('max_ts')
-    ).group_by(DriverLocation.driver_id).subquery()
+    return location_store.all(db)
+
+
+def _filter_by_status(db: Session, driver_ids: List[int], status: Optional[AvailabilityStatus]) -> List[int]:
+    """Keep only drivers with the given availability, preserving order."""
+    if status is None or not driver_ids:
+        return driver_ids
+    matching = {
+        row.id for row in db.query(Driver.id).filter(
+            Driver.id.in_(driver_ids), Driver.availability_status == status
+        )
+    }
+    return [driver_id for driver_id in driver_ids if driver_id in matching]
+
+
+@router.get("/nearby", response_model=List[NearbyDriverResponse])
+async def get_nearby_drivers(
+    lat: float = Query(..., ge=-90, le=90),
+    lng: float = Query(..., ge=-180, le=180),
+    radius_km: float = Query(5.0, gt=0, le=500),
+    status: Optional[AvailabilityStatus] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get drivers within `radius_km` of a point, nearest first (Admin only)."""
+    location_store.ensure_warm(db)
+    hits = driver_grid.within_radius(lat, lng, radius_km)
+    distances = dict(hits)
+    driver_ids = _filter_by_status(db, [driver_id for driver_id, _ in hits], status)
+    return [
+        NearbyDriverResponse(**location.model_dump(), distance_km=round(distances[location.driver_id], 3))
+        for location in location_store.get_many(driver_ids)
+    ]
+
+
+@router.get("/within", response_model=List[LocationResponse])
+async def get_drivers_within_bbox(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lng: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lng: float = Query(..., ge=-180, le=180),
+    status: Optional[AvailabilityStatus] = None,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get drivers inside a bounding box (Admin only)."""
+    if min_lat > max_lat or min_lng > max_lng:
+        raise HTTPException(status_code=400, detail="Bounding box minimum exceeds maximum")
+    location_store.ensure_warm(db)
+    driver_ids = _filter_by_status(db, driver_grid.within_bbox(min_lat, min_lng, max_lat, max_lng), status)
+    return location_store.get_many(driver_ids)
+
+
+@router.get("/buffer", response_model=LocationBufferStats)
+async def get_location_buffer_stats(
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get write-behind buffer depth and flush latency (Admin only)."""
+    return location_buffer.stats()
+
+
+@router.get("/sampling", response_model=List[DriverSamplingStats])
+async def get_location_sampling_stats(
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get per-driver counts of fixes received and stored in history (Admin only)."""
+    return location_sampler.stats()
+
+
+@router.get("/connections", response_model=List[SubscriberStats])
+async def get_live_connections(
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get outbox counters for every live WebSocket subscriber (Admin only)."""
+    return [
+        subscriber.stats() for subscriber in location_hub.subscribers()
+        if isinstance(subscriber, WebSocketSubscriber)
+    ]
+
+
+@router.post("/retention/run", response_model=RetentionReport)
+async def run_location_retention(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Downsample and prune location history now (Admin only)."""
+    # A full pass scans the whole history; run it off the event loop
+    return await asyncio.to_thread(location_retention.run, db)
 
-    locations = db.query(DriverLocation).join(
-        subq,
-        (DriverLocation.driver_id == subq.c.driver_id) &
-        (DriverLocation.timestamp == subq.c.max_ts)
-    ).all()
 
-    return locations
+@router.post("/speed-profile/refresh", response_model=SpeedProfileReport)
+async def refresh_speed_profile(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Fold new location history into the ETA speed profile now (Admin only)."""
+    return await asyncio.to_thread(speed_profile.refresh, db)
+
+
+@router.post("/latest/rebuild", response_model=LatestLocationRebuild)
+async def rebuild_latest_location_table(
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Rebuild the latest-location table from location history (Admin only)."""
+    started = time.perf_counter()
+    drivers = await asyncio.to_thread(rebuild_latest_locations, db)
+    await asyncio.to_thread(location_store.warm, db)
+    return LatestLocationRebuild(drivers=drivers, elapsed_ms=(time.perf_counter() - started) * 1000)
+
+
+@router.get("/stream")
+async def stream_fleet_locations(
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    Stream fleet positions as Server-Sent Events (Admin only).
+
+    Sends one `snapshot` event with every driver's latest position, then
+    `delta` events carrying only the drivers that moved. The token is taken
+    from the query string because EventSource cannot set headers.
+    """
+    user = get_user_from_token(db, token)
+    if user is None:
+        db.close()
+        raise HTTPException(status_code=401, detail="Could not validate credentials")
+    if user.role != UserRole.ADMIN:
+        db.close()
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    subscriber = FleetStreamSubscriber(settings.LOCATION_STREAM_MIN_INTERVAL_SECONDS)
+    # Subscribe before reading the snapshot so no update falls in between
+    location_hub.subscribe(subscriber, location_hub.FLEET_CHANNEL)
+    snapshot = location_store.all(db)
+    # Release the pooled connection; the stream may stay open for hours
+    db.close()
+
+    return StreamingResponse(
+        fleet_event_stream(subscriber, snapshot, settings.LOCATION_STREAM_KEEPALIVE_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+def _employee_on_trip(db: Session, user: User, trip_query) -> bool:
+    """Check whether the user has a stop on one of the trips in the query."""
+    if user.employee_profile is None:
+        return False
+    return trip_query.join(RouteStop, RouteStop.route_id == Trip.route_id).filter(
+        RouteStop.employee_id == user.employee_profile.id
+    ).first() is not None
+
+
+def _can_watch_driver(db: Session, user: User, driver_id: int) -> bool:
+    """Admins, the driver themself and employees on the driver's active trip."""
+    if user.role == UserRole.ADMIN:
+        return True
+    if user.driver_profile is not None and user.driver_profile.id == driver_id:
+        return True
+    trips = db.query(Trip).filter(Trip.driver_id == driver_id, Trip.status.in_(ACTIVE_TRIP_STATUSES))
+    return _employee_on_trip(db, user, trips)
+
+
+def _can_watch_trip(db: Session, user: User, trip_id: int) -> bool:
+    """Admins, the trip's driver and employees with a stop on the trip."""
+    if user.role == UserRole.ADMIN:
+        return True
+    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    if trip is None:
+        return False
+    if user.driver_profile is not None and user.driver_profile.id == trip.driver_id:
+        return True
+    return _employee_on_trip(db, user, db.query(Trip).filter(Trip.id == trip_id))
+
+
+def _negotiate_subprotocol(websocket: WebSocket) -> Optional[str]:
+    """Pick the binary subprotocol if the client offered one."""
+    for offered in websocket.scope.get("subprotocols", []):
+        if offered in (SUBPROTOCOL_BINARY, SUBPROTOCOL_BINARY_DELTA):
+            return offered
+    return None
+
+
+async def _receive_until_idle(websocket: WebSocket, idle_timeout: float) -> bool:
+    """Read client messages until disconnect; returns True if the client went silent."""
+    while True:
+        try:
+            message = await asyncio.wait_for(websocket.receive(), idle_timeout)
+        except asyncio.TimeoutError:
+            return True
+        if message["type"] == "websocket.disconnect":
+            return False
+
+
+async def _serve_subscriber(
+    websocket: WebSocket,
+    channel: str,
+    initial: Optional[LocationResponse],
+    user_id: Optional[int] = None,
+):
+    """
+    Hold a subscriber connection open until it disconnects, idles or lags.
+
+    Frames go out from the subscriber's own sender task. This coroutine only
+    reads client messages; any message, such as an echoed heartbeat, counts
+    as activity for the idle timeout.
+    """
+    subprotocol = _negotiate_subprotocol(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    if subprotocol is None:
+        subscriber = WebSocketSubscriber(websocket, channel=channel, user_id=user_id)
+    else:
+        subscriber = BinaryWebSocketSubscriber(
+            websocket, delta=subprotocol == SUBPROTOCOL_BINARY_DELTA, channel=channel, user_id=user_id,
+        )
+    location_hub.subscribe(subscriber, channel)
+    if initial is not None:
+        await subscriber.deliver(LocationFrame(initial))
+
+    sender = asyncio.create_task(subscriber.run())
+    receiver = asyncio.create_task(
+        _receive_until_idle(websocket, settings.LOCATION_WS_IDLE_TIMEOUT_SECONDS)
+    )
+    close_code = None
+    try:
+        done, _ = await asyncio.wait({sender, receiver}, return_when=asyncio.FIRST_COMPLETED)
+        if receiver in done:
+            if receiver.result():
+                close_code = status.WS_1001_GOING_AWAY
+        elif isinstance(sender.exception(), SlowSubscriber):
+            close_code = status.WS_1013_TRY_AGAIN_LATER
+    finally:
+        location_hub.unsubscribe(subscriber)
+        for task in (sender, receiver):
+            task.cancel()
+        await asyncio.gather(sender, receiver, return_exceptions=True)
+
+    if close_code is not None:
+        try:
+            await websocket.close(code=close_code)
+        except RuntimeError:
+            pass  # The client closed first
+
+
+@router.websocket("/ws/trip/{trip_id}")
+async def websocket_trip_tracking(
+    websocket: WebSocket,
+    trip_id: int,
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """Subscribe to live positions reported for a trip."""
+    user = get_user_from_token(db, token)
+    allowed = user is not None and _can_watch_trip(db, user, trip_id)
+    # Release the pooled connection; subscribers may stay open for hours
+    db.close()
+    if not allowed:
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await _serve_subscriber(websocket, location_hub.trip_channel(trip_id), None, user.id)
 
 
 @router.websocket("/ws/{driver_id}")
-async def websocket_tracking(websocket: WebSocket, driver_id: int):
-    """WebSocket endpoint for real-time location updates."""
-    await websocket.accept()
-    active_connections[driver_id] = websocket
-    
+async def websocket_tracking(
+    websocket: WebSocket,
+    driver_id: int,
+    token: Optional[str] = Query(None),
+    db: Session = Depends(get_db),
+):
+    """
+    WebSocket endpoint for real-time location updates.
+
+    The driver identified by `driver_id` connects as the publisher and sends
+    location fixes; everyone else allowed to watch that driver connects as
+    a subscriber and receives each published position. Offering the
+    `saferoute.location.bin` (or `-delta`) subprotocol switches the
+    connection to binary location frames in both directions.
+
+    Quiet subscriber connections receive heartbeats (`{"type": "heartbeat"}`
+    or a single 0x00 byte). Any connection that sends nothing for
+    `LOCATION_WS_IDLE_TIMEOUT_SECONDS` is closed; subscribers stay alive by
+    echoing heartbeats. Subscribers that fall behind the live feed are
+    closed with code 1013, and a binary publisher that sends a text frame
+    with code 1003.
+    """
+    user = get_user_from_token(db, token)
+    if user is None:
+        db.close()
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    if user.driver_profile is None or user.driver_profile.id != driver_id:
+        allowed = _can_watch_driver(db, user, driver_id)
+        initial = location_store.get(db, driver_id) if allowed else None
+        # Release the pooled connection; subscribers may stay open for hours
+        db.close()
+        if not allowed:
+            await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+            return
+        await _serve_subscriber(websocket, location_hub.driver_channel(driver_id), initial, user.id)
+        return
+
+    db.close()
+    subprotocol = _negotiate_subprotocol(websocket)
+    await websocket.accept(subprotocol=subprotocol)
+    decoder = FrameDecoder() if subprotocol else None
+    idle_timeout = settings.LOCATION_WS_IDLE_TIMEOUT_SECONDS
     try:
         while True:
-            data = await websocket.receive_json()
-            # Broadcast location to all connected clients tracking this driver
-            # In production, you'd store this and broadcast to subscribers
-            await websocket.send_json({
-                "driver_id": driver_id,
-                "lat": data.get("lat"),
-                "lng": data.get("lng"),
-                "timestamp": datetime.utcnow().isoformat()
-            })
+            try:
+                if decoder is not None:
+                    message = await asyncio.wait_for(websocket.receive(), idle_timeout)
+                    if message["type"] == "websocket.disconnect":
+                        raise WebSocketDisconnect(message.get("code", status.WS_1000_NORMAL_CLOSURE))
+                    if message.get("bytes") is None:
+                        await websocket.close(code=status.WS_1003_UNSUPPORTED_DATA)
+                        break
+                    points = [_fix_to_update(fix) for fix in decoder.decode(message["bytes"])]
+                else:
+                    message = await asyncio.wait_for(websocket.receive_json(), idle_timeout)
+                    if isinstance(message, dict) and message.get("type") == "heartbeat":
+                        continue
+                    points = [LocationUpdate.model_validate(message)]
+            except asyncio.TimeoutError:
+                await websocket.close(code=status.WS_1001_GOING_AWAY)
+                break
+            except ValidationError as e:
+                await websocket.send_json({"error": e.errors(include_url=False, include_context=False)})
+                continue
+            except ValueError as e:
+                await websocket.send_json({"error": str(e)})
+                continue
+            if not points:
+                continue
+
+            try:
+                await ingest_locations(db, driver_id, points)
+            except LocationBufferFull as e:
+                await websocket.send_json({"error": str(e)})
     except WebSocketDisconnect:
-        if driver_id in active_connections:
-            del active_connections[driver_id]
+        pass
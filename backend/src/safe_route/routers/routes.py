@@ -1,18 +1,31 @@
 """Route management router with CRUD and stop operations."""
 
-from typing import List
+import asyncio
+import time
+from typing import Dict, List, Optional, Tuple, Union
 
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, Depends, HTTPException, Query, Response, status
+from sqlalchemy import func, insert, select, update
+from sqlalchemy.orm import Session, sessionmaker
 
+from safe_route.config import get_settings
 from safe_route.database import get_db
-from safe_route.models.route import Route, RouteStop
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.models.trip import Trip, TripStatus
 from safe_route.models.user import User
+from safe_route.schemas.job import JobResponse
 from safe_route.schemas.route import (
     RouteCreate, RouteUpdate, RouteResponse,
-    RouteStopCreate, RouteStopResponse, RouteStopUpdate,
+    RouteStopCreate, RouteStopResponse, RouteStopUpdate, RouteOptimizationResponse,
+    RouteBuildRequest, RouteBuildResponse, DistanceCacheStats,
+    RouteOptimizationSummary, SkippedRoute, BulkOptimizationResponse,
+    RouteClusterRequest, RouteClusterResponse, EmployeeCluster,
 )
 from safe_route.services.auth import get_current_admin_user
+from safe_route.services.distance_cache import distance_cache
+from safe_route.services.job_runner import job_runner
+
+settings = get_settings()
 
 router = APIRouter(prefix="/routes", tags=["Routes"])
 
@@ -26,6 +39,14 @@ async def list_routes(
     return db.query(Route).all()
 
 
+@router.get("/distance-cache", response_model=DistanceCacheStats)
+async def get_distance_cache_stats(
+    current_user: User = Depends(get_current_admin_user),
+):
+    """Get hit/miss counters of the stop distance-matrix cache (Admin only)."""
+    return distance_cache.stats()
+
+
 @router.get("/{route_id}", response_model=RouteResponse)
 async def get_route(
     route_id: int,
@@ -69,12 +90,246 @@ async def create_route(
     return route
 
 
+def routable_employees(
+    db: Session, route_type: RouteType, employee_ids: Optional[List[int]] = None,
+) -> List[Tuple[int, float, float]]:
+    """
+    (id, lat, lng) of the employees to put on new routes of a type.
+
+    Given ids must all exist and have coordinates for the route type (404
+    and 400 otherwise). By default, every employee with coordinates who is
+    not yet on an active route of the type, by id.
+    """
+    from safe_route.models.employee import Employee
+
+    is_drop = route_type == RouteType.DROP
+    lat_column = Employee.drop_lat if is_drop else Employee.pickup_lat
+    lng_column = Employee.drop_lng if is_drop else Employee.pickup_lng
+    if employee_ids is not None:
+        rows = (
+            db.query(Employee.id, lat_column, lng_column, User.first_name, User.last_name)
+            .outerjoin(User, User.id == Employee.user_id)
+            .filter(Employee.id.in_(employee_ids))
+            .all()
+        )
+        if len(rows) != len(set(employee_ids)):
+            raise HTTPException(status_code=404, detail="Employee not found")
+        missing = [f"{first} {last}" for _, lat, lng, first, last in rows if lat is None or lng is None]
+        if missing:
+            location_type = "Drop" if is_drop else "Pickup"
+            raise HTTPException(
+                status_code=400,
+                detail=f"Missing {location_type} coordinates for: " + ", ".join(missing),
+            )
+        return [(employee_id, lat, lng) for employee_id, lat, lng, _, _ in rows]
+
+    routed = (
+        db.query(RouteStop.employee_id)
+        .join(Route, Route.id == RouteStop.route_id)
+        .filter(Route.is_active == True, Route.route_type == route_type)  # noqa: E712
+    )
+    return [
+        tuple(row) for row in
+        db.query(Employee.id, lat_column, lng_column)
+        .filter(lat_column.is_not(None), lng_column.is_not(None))
+        .filter(~Employee.id.in_(routed))
+        .order_by(Employee.id)
+    ]
+
+
+@router.post("/build", response_model=RouteBuildResponse, status_code=status.HTTP_201_CREATED)
+async def build_routes(
+    build: RouteBuildRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Build a full set of routes for many employees at once.
+
+    Employees are split over the vehicles within each vehicle's capacity
+    and every route is ordered from or to the depot. Planning runs in a
+    worker process; the new routes and their stops are stored together.
+    """
+    from safe_route.models.driver import AvailabilityStatus, Driver
+    from safe_route.models.vehicle import Vehicle
+    from safe_route.services.route_builder import plan_routes_in_pool
+    from safe_route.services.route_optimizer import configured_depot
+
+    if (build.depot_lat is None) != (build.depot_lng is None):
+        raise HTTPException(status_code=400, detail="Provide both depot_lat and depot_lng, or neither")
+    depot = (build.depot_lat, build.depot_lng) if build.depot_lat is not None else configured_depot()
+    if depot is None:
+        raise HTTPException(status_code=400, detail="No depot location given or configured")
+
+    is_drop = build.route_type == RouteType.DROP
+    routed = (
+        db.query(Route.id)
+        .filter(Route.is_active == True, Route.route_type == build.route_type)  # noqa: E712
+    )
+    employees = routable_employees(db, build.route_type, build.employee_ids)
+    if not employees:
+        raise HTTPException(status_code=400, detail="No employees to route")
+
+    if build.vehicle_ids is not None:
+        vehicles = (
+            db.query(Vehicle)
+            .filter(Vehicle.id.in_(build.vehicle_ids), Vehicle.is_active == True)  # noqa: E712
+            .all()
+        )
+        if len(vehicles) != len(set(build.vehicle_ids)):
+            raise HTTPException(status_code=404, detail="Vehicle not found or inactive")
+    else:
+        vehicles = (
+            db.query(Vehicle)
+            .join(Driver, Driver.id == Vehicle.assigned_driver_id)
+            .filter(
+                Vehicle.is_active == True,  # noqa: E712
+                Driver.availability_status != AvailabilityStatus.ON_LEAVE,
+                ~Vehicle.id.in_(routed.filter(Route.vehicle_id.is_not(None)).with_entities(Route.vehicle_id)),
+            )
+            .order_by(Vehicle.id)
+            .all()
+        )
+    vehicles = [vehicle for vehicle in vehicles if (vehicle.capacity or 0) > 0]
+    if not vehicles:
+        raise HTTPException(status_code=400, detail="No vehicles available")
+
+    plan = await plan_routes_in_pool(
+        [lat for _, lat, _ in employees],
+        [lng for _, _, lng in employees],
+        depot,
+        [vehicle.capacity for vehicle in vehicles],
+        ends_at_depot=not is_drop,
+        time_budget=build.time_budget_seconds,
+    )
+
+    routes = []
+    for number, planned in enumerate(plan["routes"], start=1):
+        vehicle = vehicles[planned["vehicle"]]
+        route = Route(
+            name=f"{build.name_prefix} {build.route_type.value.title()} {number}",
+            driver_id=vehicle.assigned_driver_id,
+            vehicle_id=vehicle.id,
+            route_type=build.route_type,
+        )
+        route.stops = [
+            RouteStop(employee_id=employees[index][0], sequence_order=order)
+            for order, index in enumerate(planned["stops"], start=1)
+        ]
+        routes.append(route)
+    db.add_all(routes)
+    db.commit()
+    for route in routes:
+        db.refresh(route)
+
+    return RouteBuildResponse(
+        routes=routes,
+        unassigned_employee_ids=[employees[index][0] for index in plan["unassigned"]],
+        total_length_km=plan["total_length_km"],
+        elapsed_ms=plan["elapsed_ms"],
+    )
+
+
+@router.post("/cluster", response_model=RouteClusterResponse)
+async def cluster_employees(
+    request: RouteClusterRequest,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Group employees by pickup or drop location to seed new routes.
+
+    Splits the employees into `clusters` k-means clusters, or into groups
+    of at most `capacity` (a vehicle's seats). With `create_routes`, each
+    group becomes an inactive draft route, its stops ordered nearest-first
+    from the depot if one is configured; activate a draft once it has a
+    driver and vehicle.
+    """
+    from safe_route.services.clustering import cluster_stops
+    from safe_route.services.job_runner import run_in_pool
+    from safe_route.services.route_optimizer import configured_depot, optimize_stop_orders
+
+    if (request.clusters is None) == (request.capacity is None):
+        raise HTTPException(status_code=400, detail="Provide either clusters or capacity")
+    employees = routable_employees(db, request.route_type, request.employee_ids)
+    if not employees:
+        raise HTTPException(status_code=400, detail="No employees to cluster")
+
+    start = time.perf_counter()
+    lats = [lat for _, lat, _ in employees]
+    lngs = [lng for _, _, lng in employees]
+    result = await run_in_pool(
+        cluster_stops, lats, lngs, clusters=request.clusters, capacity=request.capacity,
+    )
+    groups = result["groups"]
+    clusters = [
+        EmployeeCluster(
+            employee_ids=[employees[index][0] for index in group["stops"]],
+            centroid_lat=group["centroid_lat"],
+            centroid_lng=group["centroid_lng"],
+            radius_km=group["radius_km"],
+        )
+        for group in groups
+    ]
+
+    if request.create_routes:
+        depot = configured_depot()
+        is_drop = request.route_type == RouteType.DROP
+        # Greedy order only: a draft is for review, optimize it once finalized
+        orders = await run_in_pool(optimize_stop_orders, [
+            dict(
+                lats=[lats[index] for index in group["stops"]],
+                lngs=[lngs[index] for index in group["stops"]],
+                depot=depot, ends_at_depot=not is_drop, time_budget=0,
+            )
+            for group in groups
+        ])
+        routes = [
+            Route(
+                name=f"{request.name_prefix} {request.route_type.value.title()} {number}",
+                route_type=request.route_type,
+                is_active=False,
+            )
+            for number in range(1, len(groups) + 1)
+        ]
+        db.add_all(routes)
+        db.flush()
+        db.execute(insert(RouteStop), [
+            {"route_id": route.id, "employee_id": cluster.employee_ids[index], "sequence_order": position}
+            for route, cluster, order in zip(routes, clusters, orders)
+            for position, index in enumerate(order["order"], start=1)
+        ])
+        db.commit()
+        for route, cluster, order in zip(routes, clusters, orders):
+            cluster.route_id = route.id
+            cluster.employee_ids = [cluster.employee_ids[index] for index in order["order"]]
+
+    return RouteClusterResponse(
+        clusters=clusters,
+        iterations=result["iterations"],
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
+
+
+LOCKING_TRIP_STATUSES = [TripStatus.SCHEDULED, TripStatus.STARTED, TripStatus.IN_PROGRESS]
+
+
+def locked_route_trips(db: Session, route_ids: List[int]) -> Dict[int, int]:
+    """Map each of the routes that has an active trip to one such trip id."""
+    if not route_ids:
+        return {}
+    rows = db.query(Trip.route_id, func.min(Trip.id)).filter(
+        Trip.route_id.in_(route_ids),
+        Trip.status.in_(LOCKING_TRIP_STATUSES),
+    ).group_by(Trip.route_id).all()
+    return dict(rows)
+
+
 def check_route_locked(db: Session, route_id: int):
     """Raise 400 if route has active trips."""
-    from safe_route.models.trip import Trip, TripStatus
     active_trips = db.query(Trip).filter(
         Trip.route_id == route_id,
-        Trip.status.in_([TripStatus.SCHEDULED, TripStatus.STARTED, TripStatus.IN_PROGRESS])
+        Trip.status.in_(LOCKING_TRIP_STATUSES)
     ).first()
     if active_trips:
          raise HTTPException(
@@ -206,72 +461,261 @@ async def update_route_stop(
     return stop
 
 
-@router.post("/{route_id}/optimize", response_model=List[RouteStopResponse])
+def apply_stop_order(
+    db: Session, route_id: int, stop_ids: List[int], result: dict, depot: Optional[Tuple[float, float]],
+) -> RouteOptimizationResponse:
+    """Store an optimized sequence, unless the route changed since it was read."""
+    check_route_locked(db, route_id)
+    stops = {stop.id: stop for stop in db.query(RouteStop).filter(RouteStop.route_id == route_id)}
+    if set(stops) != set(stop_ids):
+        raise HTTPException(status_code=409, detail="Route stops changed while optimizing")
+
+    for position, index in enumerate(result["order"]):
+        stops[stop_ids[index]].sequence_order = position + 1
+    db.commit()
+
+    return RouteOptimizationResponse(
+        stops=db.query(RouteStop).filter(RouteStop.route_id == route_id).order_by(RouteStop.sequence_order).all(),
+        depot_lat=depot[0] if depot else None,
+        depot_lng=depot[1] if depot else None,
+        **{key: value for key, value in result.items() if key != "order"},
+    )
+
+
+@router.post("/{route_id}/optimize", response_model=Union[RouteOptimizationResponse, JobResponse])
 async def optimize_route(
     route_id: int,
+    response: Response,
+    time_budget_ms: Optional[int] = Query(None, ge=0, le=settings.ROUTE_OPTIMIZE_MAX_TIME_BUDGET_MS),
+    depot_lat: Optional[float] = Query(None, ge=-90, le=90),
+    depot_lng: Optional[float] = Query(None, ge=-180, le=180),
+    background: Optional[bool] = Query(None),
+    time_limit_seconds: Optional[float] = Query(None, gt=0, le=settings.JOB_MAX_TIME_LIMIT_SECONDS),
     db: Session = Depends(get_db),
     current_user: User = Depends(get_current_admin_user),
 ):
-    """Optimize route stop sequence based on nearest-neighbor distance."""
+    """
+    Re-sequence route stops to shorten the drive.
+
+    A nearest-neighbour tour is improved with 2-opt and Or-opt moves for up
+    to `time_budget_ms`. Pickup routes end at the depot and drop routes
+    leave it; the depot defaults to the configured office location.
+
+    Routes of up to ROUTE_OPTIMIZE_SYNC_MAX_STOPS stops with a budget of up
+    to ROUTE_OPTIMIZE_SYNC_MAX_TIME_BUDGET_MS are optimized inline. Others
+    (or any, with `background=true`) are submitted as a job in a worker
+    process: the response is 202 with the job, whose result GET /jobs/{id}
+    returns once the new order is stored. Inline runs never search longer
+    than the sync budget cap, since they hold up the event loop.
+    """
     from safe_route.models.employee import Employee
-    from safe_route.utils.geo import optimize_route_sequence
+    from safe_route.services.route_optimizer import configured_depot, optimize_stop_order
 
     route = db.query(Route).filter(Route.id == route_id).first()
     if not route:
         raise HTTPException(status_code=404, detail="Route not found")
     
     check_route_locked(db, route_id)
-    
-    stops = db.query(RouteStop).filter(RouteStop.route_id == route_id).all()
-    if not stops:
-        raise HTTPException(status_code=400, detail="Route has no stops")
 
-    # mapped_stops = [{stop_obj, lat, lng}]
-    mapped_stops = []
-    employees_map = {}
+    if (depot_lat is None) != (depot_lng is None):
+        raise HTTPException(status_code=400, detail="Provide both depot_lat and depot_lng, or neither")
+    depot = (depot_lat, depot_lng) if depot_lat is not None else configured_depot()
+
+    rows = (
+        db.query(RouteStop, Employee)
+        .join(Employee, Employee.id == RouteStop.employee_id)
+        .filter(RouteStop.route_id == route_id)
+        .order_by(RouteStop.sequence_order, RouteStop.id)
+        .all()
+    )
+    if not rows:
+        raise HTTPException(status_code=400, detail="Route has no stops")
 
+    is_drop = route.route_type == RouteType.DROP
+    stop_ids, employee_ids, lats, lngs = [], [], [], []
     validation_errors = []
-    
-    for stop in stops:
-        emp = db.query(Employee).filter(Employee.id == stop.employee_id).first()
-        if not emp: continue
-        
+    for stop, emp in rows:
         # Determine target coordinates based on route type (PICKUP vs DROP)
-        lat = emp.pickup_lat if route.route_type != "DROP" else emp.drop_lat
-        lng = emp.pickup_lng if route.route_type != "DROP" else emp.drop_lng
-        
+        lat = emp.drop_lat if is_drop else emp.pickup_lat
+        lng = emp.drop_lng if is_drop else emp.pickup_lng
+
         if lat is None or lng is None:
-            location_type = "Pickup" if route.route_type != "DROP" else "Drop"
+            location_type = "Drop" if is_drop else "Pickup"
             validation_errors.append(f"{emp.user.first_name} {emp.user.last_name} (Missing {location_type} Coords)")
             continue
 
-        employees_map[stop.id] = stop
-        mapped_stops.append({
-            "id": stop.id,
-            "lat": lat,
-            "lng": lng,
-            "original_obj": stop
-        })
+        stop_ids.append(stop.id)
+        employee_ids.append(stop.employee_id)
+        lats.append(lat)
+        lngs.append(lng)
 
     if validation_errors:
          error_msg = "Current route cannot be optimized. Missing/Invalid coordinates for: " + ", ".join(validation_errors)
          raise HTTPException(status_code=400, detail=error_msg)
 
-    if not mapped_stops:
-        raise HTTPException(status_code=400, detail="No valid coordinates found for employees on this route")
-
-    # Start from the first stop in current sequence as the anchor
-    # In a real app, this would be the Office Location or Driver Home
-    start_point = (mapped_stops[0]['lat'], mapped_stops[0]['lng'])
+    time_budget = time_budget_ms / 1000 if time_budget_ms is not None else settings.ROUTE_OPTIMIZE_TIME_BUDGET_MS / 1000
+    sync_budget = settings.ROUTE_OPTIMIZE_SYNC_MAX_TIME_BUDGET_MS / 1000
+    if background is None:
+        background = len(stop_ids) > settings.ROUTE_OPTIMIZE_SYNC_MAX_STOPS or time_budget > sync_budget
+    if not background:
+        result = optimize_stop_order(
+            lats, lngs, depot=depot, ends_at_depot=not is_drop, time_budget=min(time_budget, sync_budget),
+            employee_ids=employee_ids,
+        )
+        return apply_stop_order(db, route_id, stop_ids, result, depot)
+
+    running = job_runner.active("route_optimize", route_id)
+    if running:
+        raise HTTPException(status_code=409, detail=f"Route is already being optimized by job {running.id}")
+    time_limit = time_limit_seconds or settings.JOB_TIME_LIMIT_SECONDS
+    session_factory = sessionmaker(bind=db.get_bind())
+
+    def store(result: dict) -> dict:
+        session = session_factory()
+        try:
+            return apply_stop_order(session, route_id, stop_ids, result, depot).model_dump(mode="json")
+        finally:
+            session.close()
+
+    job = job_runner.submit(
+        "route_optimize", optimize_stop_order, lats, lngs,
+        depot=depot, ends_at_depot=not is_drop, time_budget=min(time_budget, time_limit),
+        stop_distances=distance_cache.matrix(list(zip(employee_ids, lats, lngs))),
+        on_result=store, subject_id=route_id, time_limit=time_limit,
+    )
+    response.status_code = status.HTTP_202_ACCEPTED
+    return job.snapshot()
 
-    optimized_data = optimize_route_sequence(start_point, mapped_stops)
 
-    # Apply new order to DB objects
-    for item in optimized_data:
-        stop_obj = employees_map[item['id']]
-        stop_obj.sequence_order = item['sequence_order']
-    
+@router.post("/optimize-all", response_model=BulkOptimizationResponse)
+async def optimize_all_routes(
+    route_type: Optional[RouteType] = Query(None),
+    time_budget_ms: Optional[int] = Query(None, ge=0, le=settings.ROUTE_OPTIMIZE_MAX_TIME_BUDGET_MS),
+    depot_lat: Optional[float] = Query(None, ge=-90, le=90),
+    depot_lng: Optional[float] = Query(None, ge=-180, le=180),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Re-sequence the stops of every active route at once.
+
+    Stops and coordinates of all active routes come from one query. Routes
+    with an active trip, or with stops missing coordinates, are skipped.
+    The rest are optimized in parallel in the worker processes, each with
+    `time_budget_ms`, and all new sequences are written in one transaction.
+    """
+    from safe_route.models.employee import Employee
+    from safe_route.services.job_runner import run_in_pool
+    from safe_route.services.route_optimizer import configured_depot, optimize_stop_orders
+
+    start = time.perf_counter()
+    if (depot_lat is None) != (depot_lng is None):
+        raise HTTPException(status_code=400, detail="Provide both depot_lat and depot_lng, or neither")
+    depot = (depot_lat, depot_lng) if depot_lat is not None else configured_depot()
+    time_budget = (time_budget_ms if time_budget_ms is not None else settings.ROUTE_OPTIMIZE_TIME_BUDGET_MS) / 1000
+
+    query = (
+        db.query(
+            Route.id, Route.name, Route.route_type, RouteStop.id, RouteStop.employee_id,
+            Employee.pickup_lat, Employee.pickup_lng, Employee.drop_lat, Employee.drop_lng,
+        )
+        .join(RouteStop, RouteStop.route_id == Route.id)
+        .join(Employee, Employee.id == RouteStop.employee_id)
+        .filter(Route.is_active == True)  # noqa: E712
+        .filter(~Route.id.in_(
+            select(Trip.route_id).where(Trip.status.in_(LOCKING_TRIP_STATUSES))
+        ))
+        .order_by(Route.id, RouteStop.sequence_order, RouteStop.id)
+    )
+    if route_type is not None:
+        query = query.filter(Route.route_type == route_type)
+
+    routes: Dict[int, dict] = {}
+    for route_id, name, type_, stop_id, employee_id, pickup_lat, pickup_lng, drop_lat, drop_lng in query:
+        route = routes.setdefault(route_id, {
+            "name": name, "is_drop": type_ == RouteType.DROP, "stop_ids": [], "employee_ids": [],
+            "lats": [], "lngs": [], "missing": 0,
+        })
+        lat, lng = (drop_lat, drop_lng) if route["is_drop"] else (pickup_lat, pickup_lng)
+        if lat is None or lng is None:
+            route["missing"] += 1
+            continue
+        route["stop_ids"].append(stop_id)
+        route["employee_ids"].append(employee_id)
+        route["lats"].append(lat)
+        route["lngs"].append(lng)
+
+    skipped = [
+        SkippedRoute(route_id=route_id, name=route["name"], reason=f"Stops without coordinates: {route['missing']}")
+        for route_id, route in routes.items() if route["missing"]
+    ]
+    locked_query = db.query(Route.id, Route.name).filter(Route.is_active == True)  # noqa: E712
+    if route_type is not None:
+        locked_query = locked_query.filter(Route.route_type == route_type)
+    locked = locked_route_trips(db, [route_id for route_id, _ in locked_query])
+    names = dict(locked_query.filter(Route.id.in_(locked)).all()) if locked else {}
+    skipped += [
+        SkippedRoute(route_id=route_id, name=names[route_id], reason=f"Locked by active trip #{trip_id}")
+        for route_id, trip_id in locked.items()
+    ]
+    ready = [route_id for route_id, route in routes.items() if not route["missing"]]
+
+    # Matrices come from this process's cache, as each worker's own starts empty
+    problems = []
+    for route_id in ready:
+        route = routes[route_id]
+        problems.append(dict(
+            lats=route["lats"], lngs=route["lngs"], depot=depot,
+            ends_at_depot=not route["is_drop"], time_budget=time_budget,
+            stop_distances=distance_cache.matrix(list(zip(route["employee_ids"], route["lats"], route["lngs"]))),
+        ))
+    # Spread routes over the workers, in as many batches as there are workers
+    batches = [problems[i::settings.JOB_WORKERS] for i in range(settings.JOB_WORKERS)]
+    outcomes = await asyncio.gather(*(run_in_pool(optimize_stop_orders, batch) for batch in batches if batch))
+    results = {}
+    for i, outcome in enumerate(outcomes):
+        for j, result in enumerate(outcome):
+            results[ready[i + j * settings.JOB_WORKERS]] = result
+
+    # A trip may have been scheduled, or stops edited, while the workers ran
+    locked_now = locked_route_trips(db, ready)
+    current: Dict[int, set] = {}
+    for route_id, stop_id in db.query(RouteStop.route_id, RouteStop.id).filter(RouteStop.route_id.in_(ready)):
+        current.setdefault(route_id, set()).add(stop_id)
+    updates, summaries = [], []
+    for route_id in ready:
+        route, result = routes[route_id], results[route_id]
+        if route_id in locked_now:
+            skipped.append(SkippedRoute(
+                route_id=route_id, name=route["name"], reason=f"Locked by active trip #{locked_now[route_id]}",
+            ))
+            continue
+        if current.get(route_id) != set(route["stop_ids"]):
+            skipped.append(SkippedRoute(route_id=route_id, name=route["name"], reason="Stops changed while optimizing"))
+            continue
+        updates.extend(
+            {"id": route["stop_ids"][index], "sequence_order": position + 1}
+            for position, index in enumerate(result["order"])
+        )
+        before = result["length_before_km"]
+        summaries.append(RouteOptimizationSummary(
+            route_id=route_id,
+            name=route["name"],
+            stop_count=len(route["stop_ids"]),
+            length_before_km=before,
+            greedy_length_km=result["greedy_length_km"],
+            length_after_km=result["length_after_km"],
+            improvement_pct=round((1 - result["length_after_km"] / before) * 100, 2) if before else 0.0,
+            moves=result["moves"],
+        ))
+    if updates:
+        db.execute(update(RouteStop), updates)
     db.commit()
-    
-    # Return re-queried stops
-    return db.query(RouteStop).filter(RouteStop.route_id == route_id).order_by(RouteStop.sequence_order).all()
+
+    return BulkOptimizationResponse(
+        routes=summaries,
+        skipped=sorted(skipped, key=lambda route: route.route_id),
+        total_length_before_km=round(sum(summary.length_before_km for summary in summaries), 3),
+        total_length_after_km=round(sum(summary.length_after_km for summary in summaries), 3),
+        elapsed_ms=round((time.perf_counter() - start) * 1000, 3),
+    )
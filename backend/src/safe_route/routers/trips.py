@@ -1,16 +1,27 @@
 """Trip management router with lifecycle operations."""
 
 from datetime import datetime
-from typing import List
+from typing import List, Literal, Optional
 
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
+from safe_route.config import get_settings
 from safe_route.database import get_db
 from safe_route.models.trip import Trip, TripStatus
 from safe_route.models.user import User
-from safe_route.schemas.trip import TripCreate, TripStatusUpdate, TripResponse
+from safe_route.schemas.trip import (
+    GeofenceEvent, TripCreate, TripEta, TripStatusUpdate, TripResponse, TripTrackResponse,
+)
 from safe_route.services.auth import get_current_admin_user, get_current_user
+from safe_route.services.geofence import geofence_engine
+from safe_route.services.location_archive import location_archive
+from safe_route.services.trip_eta import trip_eta
+from safe_route.services.trip_replay import iter_trip_points, ndjson_lines, playback_events
+from safe_route.services.trip_track import get_trip_track, track_cache
+
+settings = get_settings()
 
 router = APIRouter(prefix="/trips", tags=["Trips"])
 
@@ -77,6 +88,79 @@ async def get_trip(
     return trip
 
 
+@router.get("/{trip_id}/track", response_model=TripTrackResponse, response_model_exclude_none=True)
+async def get_trip_track_endpoint(
+    trip_id: int,
+    tolerance_m: float = Query(10.0, ge=0, le=10000),
+    format: Literal["json", "polyline"] = "json",
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get the path a trip took, simplified to `tolerance_m` meters."""
+    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return get_trip_track(db, trip, tolerance_m, format)
+
+
+@router.get("/{trip_id}/replay")
+async def replay_trip(
+    trip_id: int,
+    after: Optional[datetime] = None,
+    speed: Optional[float] = Query(None, gt=0, le=1000),
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_admin_user),
+):
+    """
+    Stream a trip's recorded fixes in time order (Admin only).
+
+    Without `speed` the fixes are sent as fast as possible as NDJSON. With
+    `speed` they are played back as Server-Sent Events at that multiple of
+    real time. `after` resumes a stream after the last timestamp received.
+    """
+    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+
+    points = iter_trip_points(db, location_archive, trip_id, settings.TRIP_REPLAY_PAGE_SIZE, after)
+    if speed is None:
+        return StreamingResponse(ndjson_lines(points), media_type="application/x-ndjson")
+    return StreamingResponse(
+        playback_events(points, speed, settings.TRIP_REPLAY_MAX_GAP_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/{trip_id}/eta", response_model=TripEta)
+async def get_trip_eta(
+    trip_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get ETAs to the remaining stops of an in-progress trip."""
+    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    eta = trip_eta.get(db, trip)
+    if eta is None:
+        raise HTTPException(status_code=404, detail="No live ETA for this trip")
+    return eta
+
+
+@router.get("/{trip_id}/geofence-events", response_model=List[GeofenceEvent])
+async def get_trip_geofence_events(
+    trip_id: int,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(get_current_user),
+):
+    """Get recent stop arrivals and departures of an active trip."""
+    trip = db.query(Trip).filter(Trip.id == trip_id).first()
+    if not trip:
+        raise HTTPException(status_code=404, detail="Trip not found")
+    return geofence_engine.events(trip_id)
+
+
 @router.post("/", response_model=TripResponse, status_code=status.HTTP_201_CREATED)
 async def create_trip(
     trip_data: TripCreate,
@@ -99,10 +183,6 @@ async def update_trip_status(
     current_user: User = Depends(get_current_user),
 ):
     """Update trip status (Driver can start/complete their trips)."""
-    from safe_route.models.route import RouteStop
-    from safe_route.models.employee import Employee
-    from safe_route.utils.geo import haversine_distance
-
     trip = db.query(Trip).filter(Trip.id == trip_id).first()
     if not trip:
         raise HTTPException(status_code=404, detail="Trip not found")
@@ -125,24 +205,15 @@ async def update_trip_status(
     # Geo-fencing check for START
     if status_data.status == TripStatus.STARTED:
         if status_data.lat is None or status_data.lng is None:
-             raise HTTPException(status_code=400, detail="Location required to start trip")
-        
-        # Get first stop
-        first_stop = db.query(RouteStop).filter(RouteStop.route_id == trip.route_id).order_by(RouteStop.sequence_order).first()
-        if first_stop:
-             emp = db.query(Employee).filter(Employee.id == first_stop.employee_id).first()
-             # Use pickup coords (assuming pickup route for simplicity, or check route type)
-             # Ideally we check route type but let's assume first stop coordinate is the target.
-             target_lat = emp.pickup_lat if emp else None
-             target_lng = emp.pickup_lng if emp else None
-             
-             if target_lat and target_lng:
-                 dist = haversine_distance(status_data.lat, status_data.lng, target_lat, target_lng)
-                 # 2.0 km radius for testing looseness (0.5km might be too tight for simulation)
-                 # Spec says "geo-start radius". I'll set 2km to be safe for manual testing, 
-                 # or 0.5km if strict. Let's do 1.0km.
-                 if dist > 1.0: 
-                     raise HTTPException(status_code=400, detail=f"Too far from start point ({dist:.2f}km). Must be within 1km.")
+            raise HTTPException(status_code=400, detail="Location required to start trip")
+
+        dist = geofence_engine.start_distance_km(db, trip, status_data.lat, status_data.lng)
+        radius = settings.TRIP_START_RADIUS_KM
+        if dist is not None and dist > radius:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Too far from start point ({dist:.2f}km). Must be within {radius:g}km.",
+            )
 
     trip.status = status_data.status
 
@@ -154,6 +225,12 @@ async def update_trip_status(
 
     db.commit()
     db.refresh(trip)
+
+    if trip.status == TripStatus.STARTED:
+        geofence_engine.activate(db, trip)
+    elif trip.status in (TripStatus.COMPLETED, TripStatus.CANCELLED):
+        geofence_engine.deactivate(trip.id)
+        trip_eta.discard(trip.id)
     return trip
 
 
@@ -170,4 +247,7 @@ async def delete_trip(
 
     db.delete(trip)
     db.commit()
+    track_cache.invalidate(trip_id)
+    geofence_engine.deactivate(trip_id)
+    trip_eta.discard(trip_id)
     return None
@@ -0,0 +1,21 @@
+"""Background job Pydantic schemas."""
+
+from datetime import datetime
+from typing import Any, Literal, Optional
+
+from pydantic import BaseModel
+
+JobStatus = Literal["pending", "running", "succeeded", "failed", "cancelled", "timed_out"]
+
+
+class JobResponse(BaseModel):
+    """Schema for a background job's status and, once done, its result."""
+    id: str
+    kind: str
+    subject_id: Optional[int] = None
+    status: JobStatus
+    submitted_at: datetime
+    finished_at: Optional[datetime] = None
+    time_limit_seconds: float
+    result: Optional[Any] = None
+    error: Optional[str] = None
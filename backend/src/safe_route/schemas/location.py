@@ -1,23 +1,59 @@
 """Location-related Pydantic schemas."""
 
-from datetime import datetime
-from typing import Optional
+from datetime import datetime, timedelta, timezone
+from typing import Optional, List
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, field_validator
+
+from safe_route.config import get_settings
+
+settings = get_settings()
 
 
 class LocationUpdate(BaseModel):
     """Schema for updating driver location."""
-    lat: float
-    lng: float
+    lat: float = Field(..., ge=-90, le=90)
+    lng: float = Field(..., ge=-180, le=180)
     heading: Optional[float] = None
-    speed: Optional[float] = None
-    trip_id: Optional[int] = None
+    speed: Optional[float] = Field(None, ge=0)  # m/s, as device GPS reports it
+    trip_id: Optional[int] = None  # Set while driving a trip; only such fixes feed the speed profile
+    timestamp: Optional[datetime] = None  # Device fix time, defaults to server time
+
+    @field_validator("timestamp")
+    @classmethod
+    def naive_utc(cls, value: Optional[datetime]) -> Optional[datetime]:
+        """
+        Aware times, such as ISO strings ending in "Z", become naive UTC like server times.
+
+        Times ahead of the server clock by more than the allowed skew are
+        rejected: the latest position keeps only the newest fix, so a single
+        fix dated in the future would hide every real one after it.
+        """
+        if value is None:
+            return value
+        if value.tzinfo is not None:
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        if value > datetime.utcnow() + timedelta(seconds=settings.LOCATION_MAX_CLOCK_SKEW_SECONDS):
+            raise ValueError("Timestamp is too far in the future")
+        return value
+
+
+class LocationBatch(BaseModel):
+    """Schema for a batch of GPS fixes reported by one driver."""
+    points: List[LocationUpdate] = Field(
+        ..., min_length=1, max_length=settings.LOCATION_BATCH_MAX_POINTS
+    )
+
+
+class LocationBatchAck(BaseModel):
+    """Compact acknowledgement for a location batch."""
+    accepted: int
+    last_timestamp: datetime
 
 
 class LocationResponse(BaseModel):
     """Schema for location response."""
-    id: int
+    id: Optional[int]  # None while buffered, or if sampling kept the fix out of history
     driver_id: int
     trip_id: Optional[int]
     lat: float
@@ -28,3 +64,66 @@ class LocationResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class NearbyDriverResponse(LocationResponse):
+    """Latest driver position with its distance from the query point."""
+    distance_km: float
+
+
+class LocationBufferStats(BaseModel):
+    """Write-behind buffer counters for tuning."""
+    enabled: bool
+    depth: int
+    capacity: int
+    flushed_rows: int
+    flush_count: int
+    failed_flushes: int
+    rejected_rows: int
+    last_flush_ms: float
+    max_flush_ms: float
+
+
+class DriverSamplingStats(BaseModel):
+    """How many of a driver's fixes sampling kept out of history."""
+    driver_id: int
+    received: int
+    stored: int
+    suppression_ratio: float
+
+
+class SubscriberStats(BaseModel):
+    """Outbox counters of one live WebSocket subscriber."""
+    channel: str
+    user_id: Optional[int] = None
+    format: str
+    connected_seconds: float
+    pending: int
+    sent: int
+    coalesced: int
+    dropped: int
+    heartbeats: int
+    lag_ms: float
+    max_lag_ms: float
+
+
+class LatestLocationRebuild(BaseModel):
+    """Outcome of rebuilding the latest-location table from history."""
+    drivers: int
+    elapsed_ms: float
+
+
+class RetentionReport(BaseModel):
+    """Outcome of one location history compaction run."""
+    archived: int = 0
+    dropped: int
+    downsampled: int
+    chunks: int
+    elapsed_ms: float
+
+
+class SpeedProfileReport(BaseModel):
+    """Outcome of one incremental speed profile refresh."""
+    rows: int
+    cells: int
+    elapsed_ms: float
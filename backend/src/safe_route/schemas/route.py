@@ -68,3 +68,105 @@ class RouteResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class RouteOptimizationResponse(BaseModel):
+    """Schema for an optimized stop sequence and what it saved."""
+    stops: List[RouteStopResponse]
+    depot_lat: Optional[float] = None
+    depot_lng: Optional[float] = None
+    length_before_km: float
+    greedy_length_km: float
+    length_after_km: float
+    moves: int
+    elapsed_ms: float
+
+
+class RouteBuildRequest(BaseModel):
+    """Schema for building routes for many employees at once."""
+    route_type: RouteType = RouteType.PICKUP
+    # Defaults: employees with coordinates not yet on an active route of this
+    # type, and active vehicles with a driver not yet on one
+    employee_ids: Optional[List[int]] = None
+    vehicle_ids: Optional[List[int]] = None
+    depot_lat: Optional[float] = Field(None, ge=-90, le=90)
+    depot_lng: Optional[float] = Field(None, ge=-180, le=180)
+    name_prefix: str = Field("Auto", min_length=1, max_length=60)
+    time_budget_seconds: Optional[float] = Field(None, ge=0, le=300)
+
+
+class RouteBuildResponse(BaseModel):
+    """Schema for the routes a build created."""
+    routes: List[RouteResponse]
+    unassigned_employee_ids: List[int]
+    total_length_km: float
+    elapsed_ms: float
+
+
+class DistanceCacheStats(BaseModel):
+    """Schema for distance-matrix cache counters."""
+    entries: int
+    max_entries: int
+    bytes: int
+    max_bytes: int
+    hits: int
+    misses: int
+    hit_ratio: float
+    evictions: int
+    invalidations: int
+
+
+class RouteOptimizationSummary(BaseModel):
+    """Schema for one route's outcome in a bulk optimization."""
+    route_id: int
+    name: str
+    stop_count: int
+    length_before_km: float
+    greedy_length_km: float
+    length_after_km: float
+    improvement_pct: float
+    moves: int
+
+
+class SkippedRoute(BaseModel):
+    """Schema for a route a bulk optimization left alone."""
+    route_id: int
+    name: str
+    reason: str
+
+
+class BulkOptimizationResponse(BaseModel):
+    """Schema for the outcome of optimizing every active route."""
+    routes: List[RouteOptimizationSummary]
+    skipped: List[SkippedRoute]
+    total_length_before_km: float
+    total_length_after_km: float
+    elapsed_ms: float
+
+
+class RouteClusterRequest(BaseModel):
+    """Schema for grouping employees by location to seed routes."""
+    route_type: RouteType = RouteType.PICKUP
+    # Default: as for RouteBuildRequest
+    employee_ids: Optional[List[int]] = None
+    # Exactly one: a number of k-means clusters, or a cap on each group's size
+    clusters: Optional[int] = Field(None, ge=1)
+    capacity: Optional[int] = Field(None, ge=1)
+    create_routes: bool = False
+    name_prefix: str = Field("Cluster", min_length=1, max_length=60)
+
+
+class EmployeeCluster(BaseModel):
+    """Schema for one group of nearby employees."""
+    employee_ids: List[int]
+    centroid_lat: float
+    centroid_lng: float
+    radius_km: float
+    route_id: Optional[int] = None
+
+
+class RouteClusterResponse(BaseModel):
+    """Schema for suggested employee groups and any draft routes made from them."""
+    clusters: List[EmployeeCluster]
+    iterations: int
+    elapsed_ms: float
@@ -1,7 +1,7 @@
 """Trip-related Pydantic schemas."""
 
 from datetime import datetime
-from typing import Optional
+from typing import Literal, Optional, List
 
 from pydantic import BaseModel
 
@@ -42,3 +42,59 @@ class TripResponse(BaseModel):
 
     class Config:
         from_attributes = True
+
+
+class TrackPoint(BaseModel):
+    """A single point of a trip's recorded path."""
+    lat: float
+    lng: float
+    timestamp: datetime
+
+
+class ReplayPoint(TrackPoint):
+    """A recorded fix of a trip as streamed by replay."""
+    speed: Optional[float] = None
+    heading: Optional[float] = None
+
+
+class TripTrackResponse(BaseModel):
+    """Simplified path a trip actually took."""
+    trip_id: int
+    tolerance_m: float
+    original_points: int
+    simplified_points: int
+    points: Optional[List[TrackPoint]] = None
+    polyline: Optional[str] = None
+
+
+class GeofenceEvent(BaseModel):
+    """A vehicle arriving at or departing from a trip stop."""
+    trip_id: int
+    driver_id: int
+    stop_id: int
+    employee_id: int
+    sequence_order: int
+    event: Literal["arrival", "departure"]
+    timestamp: datetime
+    distance_m: float
+
+
+class StopEta(BaseModel):
+    """Estimated arrival at one remaining stop of a trip."""
+    stop_id: int
+    employee_id: int
+    sequence_order: int
+    distance_km: float
+    eta_minutes: int
+    eta: datetime
+
+
+class TripEta(BaseModel):
+    """Per-stop ETAs of an in-progress trip from the driver's latest fix."""
+    type: Literal["eta"] = "eta"
+    trip_id: int
+    driver_id: int
+    lat: float
+    lng: float
+    timestamp: datetime
+    stops: List[StopEta]
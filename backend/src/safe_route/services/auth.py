@@ -50,29 +50,38 @@ def authenticate_user(db: Session, username: str, password: str) -> Optional[Use
     return user
 
 
-async def get_current_user(
-    token: str = Depends(oauth2_scheme),
-    db: Session = Depends(get_db),
-) -> User:
-    """Get the current authenticated user from JWT token."""
-    credentials_exception = HTTPException(
-        status_code=status.HTTP_401_UNAUTHORIZED,
-        detail="Could not validate credentials",
-        headers={"WWW-Authenticate": "Bearer"},
-    )
+def get_user_from_token(db: Session, token: Optional[str]) -> Optional[User]:
+    """Resolve an active user from a JWT token, or None if it is invalid."""
+    if not token:
+        return None
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
         username: str = payload.get("sub")
         user_id: int = payload.get("user_id")
         if username is None:
-            raise credentials_exception
+            return None
         token_data = TokenData(username=username, user_id=user_id)
     except JWTError:
-        raise credentials_exception
+        return None
 
     user = db.query(User).filter(User.id == token_data.user_id).first()
     if user is None or not user.is_active:
-        raise credentials_exception
+        return None
+    return user
+
+
+async def get_current_user(
+    token: str = Depends(oauth2_scheme),
+    db: Session = Depends(get_db),
+) -> User:
+    """Get the current authenticated user from JWT token."""
+    user = get_user_from_token(db, token)
+    if user is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Could not validate credentials",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
     return user
 
 
@@ -0,0 +1,236 @@
+"""Spatial clustering of stops: k-means and capacity-capped grouping."""
+
+import math
+import time
+from typing import Optional, Sequence, Tuple
+
+import numpy as np
+
+from safe_route.config import get_settings
+from safe_route.utils.geo import EARTH_RADIUS_KM, haversine_pairs
+
+settings = get_settings()
+
+ASSIGN_BLOCK_CELLS = 1 << 22  # Distances to centroids held at once
+DENSE_ASSIGN_MAX_CENTROIDS = 64  # Up to this many, points are compared with every centroid
+PLUS_PLUS_MAX_CLUSTERS = 256  # Up to this many, k-means starts from k-means++ centres
+PLUS_PLUS_SAMPLE = 5000  # Points k-means++ picks its centres from
+CANDIDATE_CENTROIDS = 16  # Centroids near its own that a point may move to in one round
+
+
+def project(lats: Sequence[float], lngs: Sequence[float]) -> Tuple[np.ndarray, Tuple[float, float]]:
+    """
+    Points as (n, 2) planar km coordinates, and the origin used.
+
+    An equirectangular projection around the mean latitude: across a city
+    its distances are within a fraction of a percent of great-circle ones,
+    and squared Euclidean distances are what k-means needs.
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    origin = (float(lats.mean()), float(lngs.mean()))
+    km_per_degree = math.radians(1) * EARTH_RADIUS_KM
+    points = np.empty((len(lats), 2))
+    points[:, 0] = (lngs - origin[1]) * km_per_degree * math.cos(math.radians(origin[0]))
+    points[:, 1] = (lats - origin[0]) * km_per_degree
+    return points, origin
+
+
+def unproject(points: np.ndarray, origin: Tuple[float, float]) -> Tuple[np.ndarray, np.ndarray]:
+    km_per_degree = math.radians(1) * EARTH_RADIUS_KM
+    lats = origin[0] + points[:, 1] / km_per_degree
+    lngs = origin[1] + points[:, 0] / (km_per_degree * math.cos(math.radians(origin[0])))
+    return lats, lngs
+
+
+def bisect(points: np.ndarray, groups: int) -> np.ndarray:
+    """
+    Labels splitting the points into `groups` compact groups of near-equal size.
+
+    Recursive coordinate bisection: each set is cut across its wider side,
+    at the point that divides its groups between the halves in proportion
+    to their count. Every group gets floor or ceil of n / groups points, so
+    with groups = ceil(n / capacity) none exceeds the capacity. It is an
+    adaptive grid: cells are small where employees are dense.
+    """
+    count = len(points)
+    groups = max(1, min(groups, count))
+    labels = np.empty(count, dtype=np.intp)
+    pending = [(np.arange(count), groups)]
+    label = 0
+    while pending:
+        members, parts = pending.pop()
+        if parts == 1:
+            labels[members] = label
+            label += 1
+            continue
+        left_parts = parts // 2
+        left_count = -(-len(members) * left_parts // parts)  # Ceil keeps both halves within their share
+        coordinates = points[members]
+        axis = int(np.argmax(np.ptp(coordinates, axis=0)))
+        split = np.argpartition(coordinates[:, axis], left_count - 1)
+        # Right half is pushed first so groups are labelled in spatial order
+        pending.append((members[split[left_count:]], parts - left_parts))
+        pending.append((members[split[:left_count]], left_parts))
+    return labels
+
+
+def _centroids(points: np.ndarray, labels: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    counts = np.bincount(labels, minlength=k)
+    centroids = np.empty((k, 2))
+    for axis in range(2):
+        centroids[:, axis] = np.bincount(labels, weights=points[:, axis], minlength=k) / np.maximum(counts, 1)
+    return centroids, counts
+
+
+def _nearest_centroids(centroids: np.ndarray, count: int) -> np.ndarray:
+    """For every centroid, the `count` closest centroids (itself included)."""
+    nearest = np.empty((len(centroids), count), dtype=np.intp)
+    squared = (centroids ** 2).sum(axis=1)
+    block_rows = max(1, ASSIGN_BLOCK_CELLS // len(centroids))
+    for start in range(0, len(centroids), block_rows):
+        block = centroids[start:start + block_rows]
+        distances = squared - 2 * block @ centroids.T
+        nearest[start:start + block_rows] = np.argpartition(distances, count - 1, axis=1)[:, :count]
+    return nearest
+
+
+def _assign_all(points: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid of every point, in blocks of rows to bound memory."""
+    labels = np.empty(len(points), dtype=np.intp)
+    squared = (centroids ** 2).sum(axis=1)
+    block_rows = max(1, ASSIGN_BLOCK_CELLS // len(centroids))
+    for start in range(0, len(points), block_rows):
+        block = points[start:start + block_rows]
+        # |p - c|^2 without the |p|^2 term, which is the same for every centroid
+        labels[start:start + block_rows] = np.argmin(squared - 2 * block @ centroids.T, axis=1)
+    return labels
+
+
+def _assign(points: np.ndarray, centroids: np.ndarray, labels: np.ndarray) -> np.ndarray:
+    """
+    Nearest centroid of every point among those close to its current one.
+
+    Centroids only move locally between rounds, so a point's nearest
+    centroid is among the few nearest its current centroid; checking just
+    those keeps a round O(n) instead of O(n * k) when k is in the hundreds
+    or thousands. With few centroids, comparing with all of them is faster.
+    """
+    if len(centroids) <= DENSE_ASSIGN_MAX_CENTROIDS:
+        return _assign_all(points, centroids)
+    candidates = _nearest_centroids(centroids, CANDIDATE_CENTROIDS)[labels]
+    distances = ((points[:, None, :] - centroids[candidates]) ** 2).sum(axis=2)
+    return candidates[np.arange(len(points)), np.argmin(distances, axis=1)]
+
+
+def _plus_plus_centres(points: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    """
+    k starting centres picked greedy k-means++ style from a sample of the points.
+
+    Each step draws a few candidates with odds by squared distance to the
+    nearest centre so far and keeps the one that lowers the total most. A
+    uniform sample of `PLUS_PLUS_SAMPLE` points keeps the density and
+    bounds the cost however many employees there are.
+    """
+    rng = np.random.default_rng(seed)
+    if len(points) > PLUS_PLUS_SAMPLE:
+        points = points[rng.choice(len(points), PLUS_PLUS_SAMPLE, replace=False)]
+    trials = 2 + int(math.log(k))
+    centres = [int(rng.integers(len(points)))]
+    nearest = ((points - points[centres[0]]) ** 2).sum(axis=1)
+    for _ in range(1, k):
+        picks = np.searchsorted(np.cumsum(nearest), rng.random(trials) * nearest.sum())
+        picks = np.minimum(picks, len(points) - 1)
+        distances = ((points[None, :, :] - points[picks, None, :]) ** 2).sum(axis=2)
+        best = int(np.argmin(np.minimum(distances, nearest).sum(axis=1)))
+        centres.append(int(picks[best]))
+        nearest = np.minimum(nearest, distances[best])
+    return points[centres]
+
+
+def kmeans(points: np.ndarray, k: int, max_iterations: int) -> Tuple[np.ndarray, np.ndarray, int]:
+    """
+    Lloyd's k-means, returning (labels, centroids, iterations run).
+
+    Up to `PLUS_PLUS_MAX_CLUSTERS` clusters start from k-means++ centres
+    (seeded, so runs repeat), which keeps a small neighbourhood from being
+    merged into a large one. Picking centres one at a time costs O(n * k),
+    so more clusters start from the bisection groups instead: already
+    compact and dense where employees are, they need few rounds. A cluster
+    left empty takes over the point farthest from its own centroid.
+    """
+    k = max(1, min(k, len(points)))
+    if k <= PLUS_PLUS_MAX_CLUSTERS:
+        labels = _assign_all(points, _plus_plus_centres(points, k))
+    else:
+        labels = bisect(points, k)
+    centroids, _ = _centroids(points, labels, k)
+    iterations = 0
+    while iterations < max_iterations:
+        iterations += 1
+        assigned = _assign(points, centroids, labels)
+        centroids, counts = _centroids(points, assigned, k)
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            spread = ((points - centroids[assigned]) ** 2).sum(axis=1)
+            farthest = np.argsort(spread)[::-1][:len(empty)]
+            assigned[farthest] = empty
+            centroids, _ = _centroids(points, assigned, k)
+        if np.array_equal(assigned, labels):
+            break
+        labels = assigned
+    return labels, centroids, iterations
+
+
+def cluster_stops(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    clusters: Optional[int] = None,
+    capacity: Optional[int] = None,
+    max_iterations: Optional[int] = None,
+) -> dict:
+    """
+    Group stops into `clusters` k-means clusters, or into groups of at most `capacity`.
+
+    Returns `{"groups": [{"stops", "centroid_lat", "centroid_lng",
+    "radius_km"}], "iterations", "elapsed_ms"}`, where stops are indices
+    into the coordinates and the radius is the great-circle distance from
+    the centroid to the farthest member.
+    """
+    if (clusters is None) == (capacity is None):
+        raise ValueError("Give exactly one of clusters and capacity")
+    start = time.perf_counter()
+    points, origin = project(lats, lngs)
+    if not len(points):
+        return {"groups": [], "iterations": 0, "elapsed_ms": 0.0}
+
+    if capacity is not None:
+        labels, iterations = bisect(points, -(-len(points) // capacity)), 0
+        centroids, _ = _centroids(points, labels, int(labels.max()) + 1)
+    else:
+        if max_iterations is None:
+            max_iterations = settings.CLUSTER_MAX_ITERATIONS
+        labels, centroids, iterations = kmeans(points, clusters, max_iterations)
+
+    centroid_lats, centroid_lngs = unproject(centroids, origin)
+    members = np.argsort(labels, kind="stable")
+    bounds = np.cumsum(np.bincount(labels, minlength=len(centroids)))[:-1]
+    radii = np.zeros(len(centroids))
+    np.maximum.at(radii, labels, haversine_pairs(lats, lngs, centroid_lats[labels], centroid_lngs[labels]))
+
+    groups = [
+        {
+            "stops": group.tolist(),
+            "centroid_lat": float(centroid_lats[index]),
+            "centroid_lng": float(centroid_lngs[index]),
+            "radius_km": float(radii[index]),
+        }
+        for index, group in enumerate(np.split(members, bounds))
+        if len(group)
+    ]
+    return {
+        "groups": groups,
+        "iterations": iterations,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
@@ -0,0 +1,130 @@
+"""LRU cache of stop-to-stop distance matrices, shared by route services."""
+
+import threading
+from collections import OrderedDict, defaultdict
+from typing import Dict, Sequence, Set, Tuple
+
+import numpy as np
+
+from safe_route.config import get_settings
+from safe_route.utils.geo import haversine_matrix
+
+settings = get_settings()
+
+StopPoint = Tuple[int, float, float]  # (employee_id, lat, lng)
+MatrixKey = Tuple[StopPoint, ...]
+
+
+class DistanceMatrixCache:
+    """
+    Pairwise haversine distances (km) of a route's stops, computed once.
+
+    Entries are keyed by the route's (employee_id, lat, lng) tuples sorted
+    by employee, so the same stops hit the same entry in whatever order a
+    caller lists them, and an edited coordinate can never be served from
+    an old entry. `invalidate_employee` also drops those entries right
+    away instead of leaving them to age out. Cached matrices are read-only
+    and shared; `matrix` returns them in the caller's stop order.
+
+    The cache holds at most `max_entries` matrices and `max_bytes` of them
+    in total, evicting least recently used first. A matrix larger than
+    `max_bytes` on its own (n stops take 8 * n^2 bytes) is computed for
+    the caller and not kept.
+    """
+
+    def __init__(self, max_entries: int, max_bytes: int):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self._entries: "OrderedDict[MatrixKey, np.ndarray]" = OrderedDict()
+        self._keys_by_employee: Dict[int, Set[MatrixKey]] = defaultdict(set)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def matrix(self, stops: Sequence[StopPoint]) -> np.ndarray:
+        """Distances between `stops`, row and column i being stops[i]."""
+        stops = [(int(e), float(lat), float(lng)) for e, lat, lng in stops]
+        order = sorted(range(len(stops)), key=stops.__getitem__)
+        key = tuple(stops[i] for i in order)
+
+        with self._lock:
+            cached = self._entries.get(key)
+            if cached is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if cached is None:
+            cached = haversine_matrix([stop[1] for stop in key], [stop[2] for stop in key])
+            cached.setflags(write=False)
+            if cached.nbytes <= self.max_bytes:
+                self._put(key, cached)
+
+        if order == list(range(len(stops))):
+            return cached
+        # Position of each caller stop within the sorted key
+        rank = np.empty(len(order), dtype=np.intp)
+        rank[order] = np.arange(len(order))
+        return cached[np.ix_(rank, rank)]
+
+    def invalidate_employee(self, employee_id: int) -> int:
+        """Drop every matrix that includes the employee; returns how many."""
+        with self._lock:
+            keys = self._keys_by_employee.pop(employee_id, set())
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+        return len(keys)
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "bytes": self.bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+            }
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_employee.clear()
+            self.bytes = 0
+            self.hits = self.misses = self.evictions = self.invalidations = 0
+
+    def _put(self, key: MatrixKey, matrix: np.ndarray) -> None:
+        with self._lock:
+            self._remove(key)  # Another caller may have stored it meanwhile
+            self._entries[key] = matrix
+            self.bytes += matrix.nbytes
+            for employee_id, _, _ in key:
+                self._keys_by_employee[employee_id].add(key)
+            while len(self._entries) > self.max_entries or self.bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.evictions += 1
+
+    def _remove(self, key: MatrixKey) -> None:
+        matrix = self._entries.pop(key, None)
+        if matrix is None:
+            return
+        self.bytes -= matrix.nbytes
+        for employee_id, _, _ in key:
+            keys = self._keys_by_employee.get(employee_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_employee[employee_id]
+
+
+distance_cache = DistanceMatrixCache(
+    settings.ROUTE_DISTANCE_CACHE_SIZE, settings.ROUTE_DISTANCE_CACHE_MAX_MB * 2**20,
+)
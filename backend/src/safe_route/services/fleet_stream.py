@@ -0,0 +1,84 @@
+"""Server-Sent Events stream of fleet positions for the admin map."""
+
+import asyncio
+from typing import AsyncIterator, Dict, List
+
+from safe_route.schemas.location import LocationResponse
+from safe_route.services.location_hub import LocationFrame, location_hub
+
+
+class FleetStreamSubscriber:
+    """
+    Hub subscriber that coalesces positions per driver for one SSE client.
+
+    Only the newest frame per driver is kept and each driver is emitted at
+    most once per `min_interval` seconds, so the work done per client tracks
+    the number of drivers that moved rather than the size of the fleet.
+    """
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._pending: Dict[int, str] = {}
+        self._last_sent: Dict[int, float] = {}
+        self._wakeup = asyncio.Event()
+
+    async def deliver(self, frame: LocationFrame) -> None:
+        self._pending[frame.driver_id] = frame.json
+        self._wakeup.set()
+
+    async def next_batch(self, timeout: float) -> List[str]:
+        """Wait up to `timeout` seconds for frames that are due to be sent."""
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while True:
+            now = loop.time()
+            due = [
+                driver_id for driver_id in self._pending
+                if now - self._last_sent.get(driver_id, float("-inf")) >= self.min_interval
+            ]
+            if due:
+                for driver_id in due:
+                    self._last_sent[driver_id] = now
+                return [self._pending.pop(driver_id) for driver_id in due]
+
+            wait = deadline - now
+            if self._pending:
+                next_due = min(self._last_sent[driver_id] for driver_id in self._pending) + self.min_interval
+                wait = min(wait, next_due - now)
+            if wait <= 0:
+                return []
+
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), wait)
+            except asyncio.TimeoutError:
+                pass
+
+
+def sse_event(event: str, data: str) -> str:
+    """Format a single Server-Sent Event."""
+    return f"event: {event}\ndata: {data}\n\n"
+
+
+async def fleet_event_stream(
+    subscriber: FleetStreamSubscriber,
+    snapshot: List[LocationResponse],
+    keepalive: float,
+) -> AsyncIterator[str]:
+    """
+    Yield one `snapshot` event, then `delta` events as drivers move.
+
+    Frames arrive pre-serialized from the hub and are joined into a JSON
+    array without being decoded again. The subscriber is removed from the
+    hub when the client goes away.
+    """
+    try:
+        yield sse_event("snapshot", "[" + ",".join(loc.model_dump_json() for loc in snapshot) + "]")
+        while True:
+            frames = await subscriber.next_batch(keepalive)
+            if frames:
+                yield sse_event("delta", "[" + ",".join(frames) + "]")
+            else:
+                yield ": keepalive\n\n"
+    finally:
+        location_hub.unsubscribe(subscriber)
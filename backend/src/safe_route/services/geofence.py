@@ -0,0 +1,276 @@
+"""Incremental stop geofencing for active trips."""
+
+import math
+import threading
+from collections import deque
+from typing import Deque, Dict, List, NamedTuple, Optional, Set
+
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.schemas.trip import GeofenceEvent
+from safe_route.services.distance_cache import distance_cache
+from safe_route.services.route_optimizer import configured_depot
+
+settings = get_settings()
+
+EARTH_RADIUS_M = 6371000.0
+TRACKED_STATUSES = [TripStatus.STARTED, TripStatus.IN_PROGRESS]
+
+
+class Fence(NamedTuple):
+    """A circular fence around one stop, with its cosine precomputed."""
+    stop_id: Optional[int]  # None, like employee_id, for the office
+    employee_id: Optional[int]
+    sequence_order: int
+    lat: float
+    lng: float
+    cos_lat: float
+
+
+def _fence(stop_id: Optional[int], employee_id: Optional[int], sequence_order: int, lat: float, lng: float) -> Fence:
+    return Fence(stop_id, employee_id, sequence_order, lat, lng, math.cos(math.radians(lat)))
+
+
+def _distance_m(fence: Fence, lat: float, lng: float) -> float:
+    """Equirectangular distance; accurate to well under a meter at fence scale."""
+    dx = math.radians(lng - fence.lng) * fence.cos_lat
+    dy = math.radians(lat - fence.lat)
+    return EARTH_RADIUS_M * math.hypot(dx, dy)
+
+
+def _legs_km(stops: List[Fence]) -> List[float]:
+    """Distance in km from each stop to the next."""
+    if len(stops) < 2:
+        return []
+    matrix = distance_cache.matrix([(fence.employee_id, fence.lat, fence.lng) for fence in stops])
+    return matrix.diagonal(1).tolist()
+
+
+class TripFences:
+    """
+    Precomputed fences of one trip and its progress along them.
+
+    The distance from each stop to the next comes from the shared
+    distance-matrix cache, so a route the optimizer has just ordered costs
+    no trigonometry to fence.
+
+    Only the next unvisited stop and the one after it are ever checked, so
+    evaluating a fix costs the same however long the route is. Arrival
+    happens inside `arrival_m`; departure once the vehicle is back outside
+    `departure_m`, the wider radius keeping GPS jitter at the edge from
+    producing repeated events.
+    """
+
+    def __init__(self, trip_id: int, driver_id: int, start: Optional[Fence], stops: List[Fence]):
+        self.trip_id = trip_id
+        self.driver_id = driver_id
+        self.start = start
+        self.stops = stops
+        self.legs_km = _legs_km(stops)
+        self.next_index = 0
+        self.inside = False
+
+    def observe(self, lat: float, lng: float, timestamp, arrival_m: float, departure_m: float) -> List[GeofenceEvent]:
+        events = []
+        if self.next_index >= len(self.stops):
+            return events
+
+        current = self.stops[self.next_index]
+        distance = _distance_m(current, lat, lng)
+        if self.inside:
+            if distance > departure_m:
+                events.append(self._event(current, "departure", timestamp, distance))
+                self.inside = False
+                self.next_index += 1
+            return events
+
+        if distance <= arrival_m:
+            events.append(self._event(current, "arrival", timestamp, distance))
+            self.inside = True
+            return events
+
+        # A stop the driver never came close to is passed once the next one is reached
+        if self.next_index + 1 < len(self.stops):
+            following = self.stops[self.next_index + 1]
+            distance = _distance_m(following, lat, lng)
+            if distance <= arrival_m:
+                self.next_index += 1
+                events.append(self._event(following, "arrival", timestamp, distance))
+                self.inside = True
+        return events
+
+    def _event(self, fence: Fence, kind: str, timestamp, distance: float) -> GeofenceEvent:
+        return GeofenceEvent(
+            trip_id=self.trip_id,
+            driver_id=self.driver_id,
+            stop_id=fence.stop_id,
+            employee_id=fence.employee_id,
+            sequence_order=fence.sequence_order,
+            event=kind,
+            timestamp=timestamp,
+            distance_m=round(distance, 1),
+        )
+
+
+class GeofenceEngine:
+    """
+    Stop fences of every tracked trip, looked up by driver on each fix.
+
+    Fences are built once per trip from a single stops query: PICKUP routes
+    fence each employee's pickup point and DROP routes their drop point.
+    A PICKUP trip starts at the first stop's pickup point, where the vehicle
+    first boards employees; a DROP trip starts at the office (the configured
+    depot), where they all board, and has no start point without one.
+    Started and in-progress trips are loaded lazily on first use; recent
+    events are kept per trip.
+    """
+
+    def __init__(self, event_history: int = 100):
+        self._trips: Dict[int, TripFences] = {}
+        self._active_by_driver: Dict[int, int] = {}
+        self._stale: Set[int] = set()
+        self._events: Dict[int, Deque[GeofenceEvent]] = {}
+        self._event_history = event_history
+        self._lock = threading.Lock()
+        self._warm = False
+
+    def load(self, db: Session, trip: Trip) -> TripFences:
+        """Build (or rebuild) the fences of a trip."""
+        route_type = db.query(Route.route_type).filter(Route.id == trip.route_id).scalar()
+        rows = db.query(
+            RouteStop.id, RouteStop.employee_id, RouteStop.sequence_order,
+            Employee.pickup_lat, Employee.pickup_lng, Employee.drop_lat, Employee.drop_lng,
+        ).join(Employee, Employee.id == RouteStop.employee_id).filter(
+            RouteStop.route_id == trip.route_id
+        ).order_by(RouteStop.sequence_order).all()
+
+        stops = []
+        for stop_id, employee_id, order, pickup_lat, pickup_lng, drop_lat, drop_lng in rows:
+            lat, lng = (drop_lat, drop_lng) if route_type == RouteType.DROP else (pickup_lat, pickup_lng)
+            if lat is not None and lng is not None:
+                stops.append(_fence(stop_id, employee_id, order, lat, lng))
+
+        start = None
+        if route_type == RouteType.DROP:
+            depot = configured_depot()
+            if depot is not None:
+                start = _fence(None, None, 0, *depot)
+        elif rows:
+            stop_id, employee_id, order, pickup_lat, pickup_lng, _, _ = rows[0]
+            if pickup_lat is not None and pickup_lng is not None:
+                start = _fence(stop_id, employee_id, order, pickup_lat, pickup_lng)
+
+        fences = TripFences(trip.id, trip.driver_id, start, stops)
+        with self._lock:
+            previous = self._trips.get(trip.id)
+            # A rebuild after an address change keeps the trip's progress
+            if previous is not None and [f.stop_id for f in previous.stops] == [f.stop_id for f in stops]:
+                fences.next_index, fences.inside = previous.next_index, previous.inside
+            self._trips[trip.id] = fences
+            self._stale.discard(trip.id)
+        return fences
+
+    def start_distance_km(self, db: Session, trip: Trip, lat: float, lng: float) -> Optional[float]:
+        """Distance from the trip's start point, or None if it has none."""
+        fences = self._trips.get(trip.id)
+        if fences is None or trip.id in self._stale:
+            fences = self.load(db, trip)
+        if fences.start is None:
+            return None
+        return _distance_m(fences.start, lat, lng) / 1000
+
+    def activate(self, db: Session, trip: Trip) -> None:
+        """Start evaluating fixes from the trip's driver against its stops."""
+        if trip.id not in self._trips or trip.id in self._stale:
+            self.load(db, trip)
+        with self._lock:
+            self._active_by_driver[trip.driver_id] = trip.id
+
+    def deactivate(self, trip_id: int) -> None:
+        """Stop tracking a trip that completed, was cancelled or deleted."""
+        with self._lock:
+            fences = self._trips.pop(trip_id, None)
+            if fences is not None and self._active_by_driver.get(fences.driver_id) == trip_id:
+                del self._active_by_driver[fences.driver_id]
+            self._events.pop(trip_id, None)
+            self._stale.discard(trip_id)
+
+    def invalidate_employee(self, employee_id: int) -> None:
+        """Rebuild fences that use an employee's coordinates on next use."""
+        with self._lock:
+            for trip_id, fences in self._trips.items():
+                if any(fence.employee_id == employee_id for fence in [fences.start, *fences.stops] if fence):
+                    self._stale.add(trip_id)
+
+    def ensure_warm(self, db: Session) -> None:
+        if not self._warm:
+            for trip in db.query(Trip).filter(Trip.status.in_(TRACKED_STATUSES)).all():
+                self.activate(db, trip)
+            self._warm = True
+
+    def evaluate(self, db: Session, rows: List[dict]) -> List[GeofenceEvent]:
+        """
+        Run accepted fixes through their trips' fences, oldest first.
+
+        A fix is matched to the trip its driver is currently running. Fixes
+        tagged with a different trip are ignored.
+        """
+        self.ensure_warm(db)
+        events: List[GeofenceEvent] = []
+        for row in sorted(rows, key=lambda row: row["timestamp"]):
+            trip_id = self._active_by_driver.get(row["driver_id"])
+            if trip_id is None or row.get("trip_id") not in (None, trip_id):
+                continue
+            if trip_id in self._stale:
+                trip = db.query(Trip).filter(Trip.id == trip_id).first()
+                if trip is None:
+                    self.deactivate(trip_id)
+                    continue
+                self.load(db, trip)
+            fences = self._trips[trip_id]
+            events.extend(fences.observe(
+                row["lat"], row["lng"], row["timestamp"],
+                settings.GEOFENCE_ARRIVAL_RADIUS_M, settings.GEOFENCE_DEPARTURE_RADIUS_M,
+            ))
+
+        if events:
+            with self._lock:
+                for event in events:
+                    history = self._events.get(event.trip_id)
+                    if history is None:
+                        history = self._events[event.trip_id] = deque(maxlen=self._event_history)
+                    history.append(event)
+        return events
+
+    def active_trip(self, driver_id: int) -> Optional[int]:
+        """The tracked trip a driver is currently running, if any."""
+        return self._active_by_driver.get(driver_id)
+
+    def fences(self, db: Session, trip_id: int) -> Optional[TripFences]:
+        """A trip's current fences and progress, rebuilt if stale; None for unknown trips."""
+        fences = self._trips.get(trip_id)
+        if fences is None or trip_id in self._stale:
+            trip = db.query(Trip).filter(Trip.id == trip_id).first()
+            if trip is None:
+                return None
+            fences = self.load(db, trip)
+        return fences
+
+    def events(self, trip_id: int) -> List[GeofenceEvent]:
+        """Recent arrival and departure events of a tracked trip."""
+        return list(self._events.get(trip_id, ()))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._trips.clear()
+            self._active_by_driver.clear()
+            self._stale.clear()
+            self._events.clear()
+            self._warm = False
+
+
+geofence_engine = GeofenceEngine()
@@ -0,0 +1,163 @@
+"""Background jobs: CPU-bound work in worker processes, tracked by id."""
+
+import asyncio
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from datetime import datetime
+from functools import partial
+from multiprocessing import get_context
+from typing import Any, Callable, Optional
+
+from safe_route.config import get_settings
+
+settings = get_settings()
+
+FINISHED_STATUSES = {"succeeded", "failed", "cancelled", "timed_out"}
+
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def executor() -> ProcessPoolExecutor:
+    """Worker processes shared by all CPU-bound jobs, started on first use."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(max_workers=settings.JOB_WORKERS, mp_context=get_context("spawn"))
+        return _executor
+
+
+async def run_in_pool(fn: Callable, *args, **kwargs) -> Any:
+    """Await `fn(*args, **kwargs)` computed in a worker process."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor(), partial(fn, *args, **kwargs))
+
+
+class Job:
+    """One submitted unit of work and its outcome."""
+
+    def __init__(self, kind: str, subject_id: Optional[int], time_limit: float):
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.subject_id = subject_id
+        self.time_limit = time_limit
+        self.status = "pending"
+        self.submitted_at = datetime.utcnow()
+        self.finished_at: Optional[datetime] = None
+        self.result: Any = None
+        self.error: Optional[str] = None
+        self.future: Optional[Future] = None
+        self.task: Optional[asyncio.Task] = None
+
+    def finish(self, status: str, result: Any = None, error: Optional[str] = None) -> None:
+        self.status, self.result, self.error = status, result, error
+        self.finished_at = datetime.utcnow()
+
+    def snapshot(self) -> dict:
+        status = self.status
+        if status == "pending" and self.future is not None and self.future.running():
+            status = "running"
+        return {
+            "id": self.id,
+            "kind": self.kind,
+            "subject_id": self.subject_id,
+            "status": status,
+            "submitted_at": self.submitted_at,
+            "finished_at": self.finished_at,
+            "time_limit_seconds": self.time_limit,
+            "result": self.result,
+            "error": self.error,
+        }
+
+
+class JobRunner:
+    """
+    Runs jobs in the shared process pool so request handlers stay responsive.
+
+    A job computes in a worker; its `on_result` callback then runs back in
+    the API process (that is where results are written to the database),
+    and its return value becomes the job's result. A job that is not done
+    within its time limit, or is cancelled, ends without `on_result`, so
+    nothing is applied: a queued job is dropped from the pool, a running
+    one finishes its (time-bounded) computation and the outcome is
+    discarded. Finished jobs are kept, oldest dropped first, up to
+    `history` of them.
+    """
+
+    def __init__(self, history: int):
+        self.history = history
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+
+    def submit(
+        self,
+        kind: str,
+        fn: Callable,
+        *args,
+        on_result: Callable[[Any], Any] = lambda value: value,
+        subject_id: Optional[int] = None,
+        time_limit: Optional[float] = None,
+        **kwargs,
+    ) -> Job:
+        """Queue `fn(*args, **kwargs)`; must be called from the event loop."""
+        job = Job(kind, subject_id, time_limit or settings.JOB_TIME_LIMIT_SECONDS)
+        job.future = executor().submit(fn, *args, **kwargs)
+        job.task = asyncio.get_running_loop().create_task(self._watch(job, on_result))
+        self._jobs[job.id] = job
+        self._prune()
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        return self._jobs.get(job_id)
+
+    def active(self, kind: str, subject_id: int) -> Optional[Job]:
+        """The unfinished job of a kind working on a subject, if any."""
+        for job in self._jobs.values():
+            if job.kind == kind and job.subject_id == subject_id and job.status not in FINISHED_STATUSES:
+                return job
+        return None
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self._jobs.get(job_id)
+        if job is None or job.status in FINISHED_STATUSES:
+            return job
+        job.future.cancel()
+        job.task.cancel()
+        job.finish("cancelled")
+        return job
+
+    def clear(self) -> None:
+        for job in list(self._jobs.values()):
+            self.cancel(job.id)
+        self._jobs.clear()
+
+    async def _watch(self, job: Job, on_result: Callable[[Any], Any]) -> None:
+        try:
+            value = await asyncio.wait_for(asyncio.wrap_future(job.future), timeout=job.time_limit)
+            job.finish("succeeded", result=on_result(value))
+        except asyncio.TimeoutError:
+            job.future.cancel()
+            job.finish("timed_out", error=f"Exceeded the {job.time_limit:g}s time limit")
+        except asyncio.CancelledError:
+            if job.status not in FINISHED_STATUSES:
+                job.finish("cancelled")
+        except Exception as e:
+            # HTTP errors raised while applying a result keep their detail
+            job.finish("failed", error=str(getattr(e, "detail", None) or e) or type(e).__name__)
+
+    def _prune(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if job.status in FINISHED_STATUSES]
+        for job_id in finished[:max(len(self._jobs) - self.history, 0)]:
+            del self._jobs[job_id]
+
+
+def shutdown_workers() -> None:
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
+
+
+job_runner = JobRunner(settings.JOB_HISTORY_SIZE)
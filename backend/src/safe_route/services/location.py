@@ -0,0 +1,84 @@
+"""Location ingestion service shared by the REST and WebSocket paths."""
+
+from datetime import datetime
+from typing import List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.schemas.location import LocationUpdate, LocationResponse
+from safe_route.services.audit import AuditLogger
+from safe_route.services.geofence import geofence_engine
+from safe_route.services.location_buffer import location_buffer
+from safe_route.services.location_hub import location_hub
+from safe_route.services.location_sampler import location_sampler
+from safe_route.services.location_store import location_store
+from safe_route.services.location_writer import write_locations
+from safe_route.services.trip_eta import trip_eta
+
+settings = get_settings()
+
+
+def build_location_rows(driver_id: int, points: Sequence[LocationUpdate]) -> List[dict]:
+    """Convert validated location updates into insertable row dicts."""
+    now = datetime.utcnow()
+    return [
+        {
+            "driver_id": driver_id,
+            "trip_id": point.trip_id,
+            "lat": point.lat,
+            "lng": point.lng,
+            "heading": point.heading,
+            "speed": point.speed,
+            "timestamp": point.timestamp or now,
+        }
+        for point in points
+    ]
+
+
+def publish_latest(rows: List[dict], ids: List[Optional[int]]) -> LocationResponse:
+    """Push the newest of the accepted rows to the latest-position store."""
+    row, row_id = max(zip(rows, ids), key=lambda pair: pair[0]["timestamp"])
+    location = LocationResponse(id=row_id, **row)
+    location_store.put(location)
+    return location
+
+
+async def ingest_locations(db: Session, driver_id: int, points: Sequence[LocationUpdate]) -> LocationResponse:
+    """
+    Accept a driver's fixes from any write path and notify watchers.
+
+    Near-duplicate fixes are kept out of history by the sampler but still
+    move the latest position. A returned position has no id when its fix
+    was suppressed, or buffered with write-behind enabled. Raises
+    LocationBufferFull when the buffer cannot take the rows. Stop arrivals
+    and departures detected along the way are written to the audit log, and
+    changed stop ETAs are pushed to the trip's watchers.
+    """
+    rows = build_location_rows(driver_id, points)
+    stored = location_sampler.select(rows)
+    # Stored rows may include a corner held from an earlier call, so count by identity
+    stored_keys = {id(row) for row in stored}
+    suppressed = [row for row in rows if id(row) not in stored_keys]
+
+    if location_buffer.running:
+        await location_buffer.enqueue(stored, latest_only=suppressed)
+        ids = [None] * len(rows)
+    else:
+        new_ids = dict(zip(map(id, stored), write_locations(db, stored, suppressed)))
+        db.commit()
+        ids = [new_ids.get(id(row)) for row in rows]
+    latest = publish_latest(rows, ids)
+    await location_hub.publish(latest)
+    for event in geofence_engine.evaluate(db, rows):
+        AuditLogger.log(
+            db,
+            f"GEOFENCE_{event.event.upper()}",
+            entity_type="TRIP",
+            entity_id=event.trip_id,
+            details=event.model_dump_json(),
+        )
+    eta = trip_eta.observe(db, latest)
+    if eta is not None:
+        await location_hub.publish_eta(eta)
+    return latest
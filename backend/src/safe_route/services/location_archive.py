@@ -0,0 +1,308 @@
+"""Columnar per-day archive of driver location history.
+
+Each closed UTC day lives in its own directory::
+
+    <root>/2024-01-01/
+        driver_id.npy  int32      trip_id.npy  int32 (0 = no trip)
+        epoch_ms.npy   int64      lat.npy      float64
+        lng.npy        float64    speed.npy    float32 (NaN = unknown)
+        heading.npy    float32    drivers.npy  per-driver row offsets
+        trips.npy      sorted unique trip ids
+        meta.json      row count, resolution and format version
+
+Rows are sorted by (driver_id, epoch_ms), so one driver's day is a
+contiguous slice found through `drivers.npy`. Columns are opened with
+`numpy.load(mmap_mode="r")` and read without copying.
+
+`<root>/2024-01-01` is a symlink to the directory holding the day's
+current version (`.2024-01-01.<ns>`). A rewrite fills a new version
+directory and publishes it by replacing the symlink with a single
+`os.replace`, so readers see either the old day or the new one, never a
+partial or missing day. An opened day maps all its files up front, so it
+keeps reading its own version after a rewrite deletes it.
+"""
+
+import json
+import os
+import shutil
+import threading
+import time
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func, select
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.models.location import DriverLocation
+
+settings = get_settings()
+
+FORMAT_VERSION = 1
+COLUMNS: Dict[str, np.dtype] = {
+    "driver_id": np.dtype("<i4"),
+    "trip_id": np.dtype("<i4"),
+    "epoch_ms": np.dtype("<i8"),
+    "lat": np.dtype("<f8"),
+    "lng": np.dtype("<f8"),
+    "speed": np.dtype("<f4"),
+    "heading": np.dtype("<f4"),
+}
+DRIVER_INDEX = np.dtype([("driver_id", "<i4"), ("start", "<i8"), ("stop", "<i8")])
+
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+
+
+def to_epoch_ms(timestamp: datetime) -> int:
+    return (timestamp - _EPOCH) // _MS
+
+
+def from_epoch_ms(epoch_ms: int) -> datetime:
+    return _EPOCH + int(epoch_ms) * _MS
+
+
+class ArchivedDay:
+    """
+    Read-only, memory-mapped view of one archived day.
+
+    Every file is mapped or read when the day is opened. A rewrite deletes
+    the old version once the new one is published, and the open mappings
+    keep its data readable for as long as this view is in use.
+    """
+
+    def __init__(self, path: Path):
+        self.day = date.fromisoformat(path.name)
+        self.path = path.resolve()  # The version current when opened, not whatever replaces it
+        self.meta = json.loads((self.path / "meta.json").read_text())
+        self._columns: Dict[str, np.ndarray] = {
+            name: np.load(self.path / f"{name}.npy", mmap_mode="r") for name in COLUMNS
+        }
+        self._drivers = np.load(self.path / "drivers.npy")
+        self._trips = np.load(self.path / "trips.npy")
+
+    def __len__(self) -> int:
+        return self.meta["rows"]
+
+    @property
+    def bucket_seconds(self) -> int:
+        """Resolution the day has been downsampled to; 0 for full."""
+        return self.meta["bucket_seconds"]
+
+    def column(self, name: str) -> np.ndarray:
+        return self._columns[name]
+
+    def driver_slice(self, driver_id: int) -> slice:
+        """Rows of one driver; empty if the driver has none that day."""
+        index = int(np.searchsorted(self._drivers["driver_id"], driver_id))
+        if index < len(self._drivers) and self._drivers["driver_id"][index] == driver_id:
+            entry = self._drivers[index]
+            return slice(int(entry["start"]), int(entry["stop"]))
+        return slice(0, 0)
+
+    def has_trip(self, trip_id: int) -> bool:
+        index = int(np.searchsorted(self._trips, trip_id))
+        return index < len(self._trips) and self._trips[index] == trip_id
+
+    def trip_rows(self, trip_id: int) -> np.ndarray:
+        """Row indices of a trip's fixes, in (driver, time) order."""
+        if not self.has_trip(trip_id):
+            return np.empty(0, dtype=np.int64)
+        return np.flatnonzero(self.column("trip_id") == trip_id)
+
+    def read(self, rows=slice(None)) -> Dict[str, np.ndarray]:
+        """Copy the selected rows of every column out of the mapping."""
+        return {name: np.asarray(self.column(name)[rows]) for name in COLUMNS}
+
+
+def _sorted_columns(columns: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    order = np.lexsort((columns["epoch_ms"], columns["driver_id"]))
+    return {name: columns[name][order] for name in COLUMNS}
+
+
+def _empty_columns() -> Dict[str, np.ndarray]:
+    return {name: np.empty(0, dtype=dtype) for name, dtype in COLUMNS.items()}
+
+
+class LocationArchive:
+    """
+    Exporter and reader for the per-day columnar archive.
+
+    The archive is disabled when `root` is empty. Opened days are cached and
+    dropped from the cache whenever a day is rewritten or removed.
+    """
+
+    def __init__(self, root: str, chunk_rows: int = 10000):
+        self.root = Path(root) if root else None
+        self.chunk_rows = chunk_rows
+        self._open: Dict[date, ArchivedDay] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.root is not None
+
+    def days(self) -> List[date]:
+        """Archived days, oldest first."""
+        if not self.enabled or not self.root.exists():
+            return []
+        days = []
+        for path in self.root.iterdir():
+            if path.is_dir() and (path / "meta.json").exists():
+                try:
+                    days.append(date.fromisoformat(path.name))
+                except ValueError:
+                    continue
+        return sorted(days)
+
+    def open(self, day: date) -> Optional[ArchivedDay]:
+        with self._lock:
+            archived = self._open.get(day)
+            if archived is None:
+                path = self.root / day.isoformat()
+                if not (path / "meta.json").exists():
+                    return None
+                archived = self._open[day] = ArchivedDay(path)
+            return archived
+
+    def export_day(self, db: Session, day: date) -> int:
+        """
+        Move one closed day of history from the database into the archive.
+
+        Rows already archived for that day (late fixes) are merged in. The
+        database rows are deleted only after the day has been written.
+        Returns the number of rows moved.
+        """
+        start = datetime.combine(day, datetime.min.time())
+        end = start + timedelta(days=1)
+        result = db.execute(
+            select(
+                DriverLocation.id, DriverLocation.driver_id, DriverLocation.trip_id,
+                DriverLocation.timestamp, DriverLocation.lat, DriverLocation.lng,
+                DriverLocation.speed, DriverLocation.heading,
+            )
+            .where(DriverLocation.timestamp >= start, DriverLocation.timestamp < end)
+            .execution_options(yield_per=self.chunk_rows)
+        )
+        ids: List[int] = []
+        parts: List[Dict[str, np.ndarray]] = []
+        for chunk in result.partitions():
+            row_ids, drivers, trips, timestamps, lats, lngs, speeds, headings = zip(*chunk)
+            ids.extend(row_ids)
+            parts.append({
+                "driver_id": np.array(drivers, dtype=COLUMNS["driver_id"]),
+                "trip_id": np.array([t or 0 for t in trips], dtype=COLUMNS["trip_id"]),
+                "epoch_ms": np.array([to_epoch_ms(ts) for ts in timestamps], dtype=COLUMNS["epoch_ms"]),
+                "lat": np.array(lats, dtype=COLUMNS["lat"]),
+                "lng": np.array(lngs, dtype=COLUMNS["lng"]),
+                "speed": np.array([np.nan if s is None else s for s in speeds], dtype=COLUMNS["speed"]),
+                "heading": np.array([np.nan if h is None else h for h in headings], dtype=COLUMNS["heading"]),
+            })
+        if not ids:
+            return 0
+
+        bucket_seconds = 0
+        existing = self.open(day)
+        if existing is not None:
+            parts.append(existing.read())
+            bucket_seconds = existing.bucket_seconds
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        self._write_day(day, _sorted_columns(columns), bucket_seconds)
+
+        for offset in range(0, len(ids), self.chunk_rows):
+            db.query(DriverLocation).filter(
+                DriverLocation.id.in_(ids[offset:offset + self.chunk_rows])
+            ).delete(synchronize_session=False)
+            db.commit()
+        return len(ids)
+
+    def export_before(self, db: Session, before: date) -> Tuple[int, int]:
+        """Archive every day of history older than `before`; returns (rows, days)."""
+        rows = days = 0
+        while True:
+            oldest = db.query(func.min(DriverLocation.timestamp)).filter(
+                DriverLocation.timestamp < datetime.combine(before, datetime.min.time())
+            ).scalar()
+            if oldest is None:
+                return rows, days
+            rows += self.export_day(db, oldest.date())
+            days += 1
+
+    def drop_before(self, before: date) -> int:
+        """Delete archived days older than `before`; returns rows removed."""
+        removed = 0
+        for day in self.days():
+            if day >= before:
+                break
+            archived = self.open(day)
+            removed += len(archived)
+            self._forget(day)
+            (self.root / day.isoformat()).unlink()
+            shutil.rmtree(archived.path)
+        return removed
+
+    def downsample_day(self, day: date, bucket_seconds: int) -> int:
+        """Keep the first fix per driver per bucket; returns rows removed."""
+        archived = self.open(day)
+        if archived is None or archived.bucket_seconds >= bucket_seconds:
+            return 0
+        columns = archived.read()
+        slots = columns["epoch_ms"] // (bucket_seconds * 1000)
+        drivers = columns["driver_id"]
+        keep = np.ones(len(drivers), dtype=bool)
+        keep[1:] = (drivers[1:] != drivers[:-1]) | (slots[1:] != slots[:-1])
+        self._write_day(day, {name: column[keep] for name, column in columns.items()}, bucket_seconds)
+        return int(len(keep) - keep.sum())
+
+    def load_trip(self, trip_id: int) -> Dict[str, np.ndarray]:
+        """All archived fixes of a trip across days, in time order."""
+        parts = []
+        for day in self.days():
+            archived = self.open(day)
+            if archived.has_trip(trip_id):
+                parts.append(archived.read(archived.trip_rows(trip_id)))
+        if not parts:
+            return _empty_columns()
+        columns = {name: np.concatenate([part[name] for part in parts]) for name in COLUMNS}
+        order = np.argsort(columns["epoch_ms"], kind="stable")
+        return {name: column[order] for name, column in columns.items()}
+
+    def _write_day(self, day: date, columns: Dict[str, np.ndarray], bucket_seconds: int) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        final = self.root / day.isoformat()
+        version = f".{day.isoformat()}.{time.time_ns()}"
+        staging = self.root / version
+        staging.mkdir()
+
+        for name, dtype in COLUMNS.items():
+            np.save(staging / f"{name}.npy", np.ascontiguousarray(columns[name], dtype=dtype))
+
+        drivers, starts, counts = np.unique(columns["driver_id"], return_index=True, return_counts=True)
+        index = np.empty(len(drivers), dtype=DRIVER_INDEX)
+        index["driver_id"], index["start"], index["stop"] = drivers, starts, starts + counts
+        np.save(staging / "drivers.npy", index)
+        trips = np.unique(columns["trip_id"])
+        np.save(staging / "trips.npy", trips[trips != 0])
+        (staging / "meta.json").write_text(json.dumps({
+            "format": FORMAT_VERSION,
+            "day": day.isoformat(),
+            "rows": int(len(columns["driver_id"])),
+            "bucket_seconds": int(bucket_seconds),
+        }))
+
+        self._forget(day)
+        previous = final.resolve() if final.is_symlink() else None
+        link = self.root / f"{version}.link"
+        os.symlink(version, link)
+        os.replace(link, final)  # The one step that publishes the day
+        if previous is not None:
+            shutil.rmtree(previous, ignore_errors=True)
+
+    def _forget(self, day: date) -> None:
+        with self._lock:
+            self._open.pop(day, None)
+
+
+location_archive = LocationArchive(settings.LOCATION_ARCHIVE_DIR)
@@ -0,0 +1,191 @@
+"""Write-behind buffer for DriverLocation inserts."""
+
+import asyncio
+import time
+from typing import Callable, Dict, List, Optional, Sequence
+
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.database import SessionLocal
+from safe_route.services.location_writer import write_locations
+
+settings = get_settings()
+
+
+class LocationBufferFull(Exception):
+    """Raised when fixes cannot be buffered before the put timeout."""
+
+
+class LocationWriteBuffer:
+    """
+    Bounded asyncio buffer that acknowledges fixes before they are written.
+
+    Rows are flushed in bulk by a background task once `flush_rows` rows are
+    pending or every `flush_interval` seconds. The buffer never holds more
+    than `max_rows` rows: writers wait up to `put_timeout` seconds for a
+    flush to make room and then get LocationBufferFull. Inserts run in a
+    worker thread so the event loop is never blocked on SQLite. Fixes that
+    only update the latest-location table are held as one row per driver
+    and do not count against the bound.
+    """
+
+    def __init__(
+        self,
+        session_factory: Callable[[], Session],
+        max_rows: int,
+        flush_rows: int,
+        flush_interval: float,
+        put_timeout: float,
+    ):
+        self.session_factory = session_factory
+        self.max_rows = max_rows
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._rows: List[dict] = []
+        self._latest_only: Dict[int, dict] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self._space: Optional[asyncio.Condition] = None
+        self._flush_requested: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+
+        self.flushed_rows = 0
+        self.flush_count = 0
+        self.failed_flushes = 0
+        self.rejected_rows = 0
+        self.last_flush_ms = 0.0
+        self.max_flush_ms = 0.0
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None
+
+    @property
+    def depth(self) -> int:
+        return len(self._rows)
+
+    async def start(self) -> None:
+        """Create the loop-bound primitives and start the flusher task."""
+        if self._task is not None:
+            return
+        self._space = asyncio.Condition()
+        self._flush_requested = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Stop the flusher and write out everything still buffered."""
+        if self._task is None:
+            return
+        # Let the flusher finish its current write instead of cancelling it
+        self._stopping = True
+        self._flush_requested.set()
+        await self._task
+        self._task = None
+        await self.flush()
+
+    async def enqueue(self, rows: List[dict], latest_only: Sequence[dict] = ()) -> None:
+        """
+        Buffer rows for a later bulk insert, waiting briefly for space.
+
+        `latest_only` rows are written to the latest-location table only.
+        """
+        if len(rows) > self.max_rows:
+            self.rejected_rows += len(rows)
+            raise LocationBufferFull(f"Batch of {len(rows)} exceeds buffer capacity")
+
+        async with self._space:
+            if len(self._rows) + len(rows) > self.max_rows:
+                self._flush_requested.set()
+                try:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: len(self._rows) + len(rows) <= self.max_rows),
+                        self.put_timeout,
+                    )
+                except asyncio.TimeoutError:
+                    self.rejected_rows += len(rows)
+                    raise LocationBufferFull("Location buffer is full")
+            self._rows.extend(rows)
+        self._hold_latest(latest_only)
+
+        if len(self._rows) >= self.flush_rows:
+            self._flush_requested.set()
+
+    async def flush(self) -> int:
+        """Write all buffered rows in one transaction; returns rows written."""
+        async with self._flush_lock:
+            if not self._rows and not self._latest_only:
+                return 0
+            rows, self._rows = self._rows, []
+            latest_only, self._latest_only = list(self._latest_only.values()), {}
+
+            start = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._write, rows, latest_only)
+            except Exception as e:
+                self.failed_flushes += 1
+                # Keep the rows for the next attempt as long as they still fit
+                room = self.max_rows - len(self._rows)
+                self._rows[:0] = rows[-room:] if room > 0 else []
+                self._hold_latest(latest_only)
+                print(f"CRITICAL: Failed to flush {len(rows)} buffered locations! {e}")
+                return 0
+            finally:
+                async with self._space:
+                    self._space.notify_all()
+
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            self.last_flush_ms = elapsed_ms
+            self.max_flush_ms = max(self.max_flush_ms, elapsed_ms)
+            self.flush_count += 1
+            self.flushed_rows += len(rows)
+            return len(rows)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.running,
+            "depth": self.depth,
+            "capacity": self.max_rows,
+            "flushed_rows": self.flushed_rows,
+            "flush_count": self.flush_count,
+            "failed_flushes": self.failed_flushes,
+            "rejected_rows": self.rejected_rows,
+            "last_flush_ms": round(self.last_flush_ms, 3),
+            "max_flush_ms": round(self.max_flush_ms, 3),
+        }
+
+    def _hold_latest(self, rows: Sequence[dict]) -> None:
+        for row in rows:
+            held = self._latest_only.get(row["driver_id"])
+            if held is None or row["timestamp"] >= held["timestamp"]:
+                self._latest_only[row["driver_id"]] = row
+
+    def _write(self, rows: List[dict], latest_only: List[dict]) -> None:
+        db = self.session_factory()
+        try:
+            write_locations(db, rows, latest_only)
+            db.commit()
+        finally:
+            db.close()
+
+    async def _run(self) -> None:
+        while not self._stopping:
+            try:
+                await asyncio.wait_for(self._flush_requested.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            await self.flush()
+
+
+location_buffer = LocationWriteBuffer(
+    SessionLocal,
+    max_rows=settings.LOCATION_BUFFER_MAX_ROWS,
+    flush_rows=settings.LOCATION_BUFFER_FLUSH_ROWS,
+    flush_interval=settings.LOCATION_BUFFER_FLUSH_INTERVAL_SECONDS,
+    put_timeout=settings.LOCATION_BUFFER_PUT_TIMEOUT_SECONDS,
+)
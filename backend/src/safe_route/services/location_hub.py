@@ -0,0 +1,340 @@
+"""Publish/subscribe hub for live driver positions."""
+
+import asyncio
+import time
+from collections import OrderedDict, defaultdict
+from typing import Dict, Hashable, Optional, Protocol, Set, Tuple, Union
+
+from fastapi import WebSocket
+
+from safe_route.config import get_settings
+from safe_route.schemas.location import LocationResponse
+from safe_route.schemas.trip import TripEta
+from safe_route.utils.location_codec import HEARTBEAT_FRAME, FrameEncoder
+
+settings = get_settings()
+
+
+class LocationFrame:
+    """
+    One published position, serialized lazily and at most once per format.
+
+    Every subscriber of a publish shares the same frame object, so the JSON
+    text and the full binary frame are each built once however many
+    subscribers want them.
+    """
+
+    __slots__ = ("location", "_json", "_binary")
+
+    def __init__(self, location: LocationResponse):
+        self.location = location
+        self._json: Optional[str] = None
+        self._binary: Optional[bytes] = None
+
+    @property
+    def driver_id(self) -> int:
+        return self.location.driver_id
+
+    @property
+    def key(self) -> Hashable:
+        """Outbox slot; a newer frame with the same key replaces an unsent one."""
+        return self.location.driver_id
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = self.location.model_dump_json()
+        return self._json
+
+    @property
+    def binary(self) -> bytes:
+        if self._binary is None:
+            self._binary = encode_location(FrameEncoder(), self.location)
+        return self._binary
+
+
+class EtaFrame:
+    """Per-stop ETAs of a trip, serialized once as JSON for every watcher."""
+
+    __slots__ = ("eta", "_json")
+
+    def __init__(self, eta: TripEta):
+        self.eta = eta
+        self._json: Optional[str] = None
+
+    @property
+    def key(self) -> Hashable:
+        return ("eta", self.eta.trip_id)
+
+    @property
+    def json(self) -> str:
+        if self._json is None:
+            self._json = self.eta.model_dump_json()
+        return self._json
+
+
+Frame = Union[LocationFrame, EtaFrame]
+
+
+def encode_location(encoder: FrameEncoder, location: LocationResponse) -> bytes:
+    """Encode a position with the given connection encoder."""
+    return encoder.encode(
+        location.driver_id, location.timestamp, location.lat, location.lng,
+        location.heading, location.speed, location.trip_id,
+    )
+
+
+class Subscriber(Protocol):
+    """Receiver of published position frames."""
+
+    async def deliver(self, frame: Frame) -> None: ...
+
+
+class SlowSubscriber(Exception):
+    """Raised when a connection has fallen too far behind the live feed."""
+
+
+class WebSocketSubscriber:
+    """
+    Sends frames to one WebSocket as JSON text from a per-connection outbox.
+
+    `deliver` never waits on the network. It queues the frame under its
+    driver, replacing any frame for that driver still waiting to go out
+    (counted as coalesced). When the outbox already holds `max_drivers`
+    drivers, the longest-waiting one is dropped. `run` drains the outbox
+    and fills quiet periods with heartbeats. Once the oldest queued frame
+    has waited longer than `lag_deadline`, or a single send takes that
+    long, the connection is given up so one slow client cannot hold memory
+    or delay anyone else. A trip's ETA frames share one slot per trip.
+    """
+
+    HEARTBEAT = '{"type":"heartbeat"}'
+    format = "json"
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        channel: str = "",
+        user_id: Optional[int] = None,
+        max_drivers: Optional[int] = None,
+        lag_deadline: Optional[float] = None,
+        heartbeat_interval: Optional[float] = None,
+    ):
+        self.websocket = websocket
+        self.channel = channel
+        self.user_id = user_id
+        self.max_drivers = max_drivers or settings.LOCATION_WS_OUTBOX_MAX_DRIVERS
+        self.lag_deadline = lag_deadline or settings.LOCATION_WS_LAG_DEADLINE_SECONDS
+        self.heartbeat_interval = heartbeat_interval or settings.LOCATION_WS_HEARTBEAT_SECONDS
+        # frame key -> (newest unsent frame, when the key was first queued)
+        self._outbox: "OrderedDict[Hashable, Tuple[Frame, float]]" = OrderedDict()
+        self._ready = asyncio.Event()
+        self._lagged = False
+        self.connected_at = time.monotonic()
+        self.sent = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.heartbeats = 0
+        self.max_lag = 0.0
+
+    def lag(self, now: Optional[float] = None) -> float:
+        """Seconds the oldest queued frame has been waiting."""
+        if not self._outbox:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        _, queued_at = next(iter(self._outbox.values()))
+        return now - queued_at
+
+    async def deliver(self, frame: Frame) -> None:
+        now = time.monotonic()
+        if self._lagged or self.lag(now) > self.lag_deadline:
+            self._give_up()
+            raise SlowSubscriber(f"Subscriber lagged more than {self.lag_deadline:g}s behind")
+
+        entry = self._outbox.get(frame.key)
+        if entry is not None:
+            # Keep the original queue time and position: lag is measured from
+            # the first unsent update, not the latest replacement
+            self._outbox[frame.key] = (frame, entry[1])
+            self.coalesced += 1
+        else:
+            if len(self._outbox) >= self.max_drivers:
+                self._outbox.popitem(last=False)
+                self.dropped += 1
+            self._outbox[frame.key] = (frame, now)
+        self._ready.set()
+
+    async def run(self) -> None:
+        """Send queued frames until the connection falls behind; raises SlowSubscriber."""
+        while True:
+            try:
+                await asyncio.wait_for(self._ready.wait(), self.heartbeat_interval)
+            except asyncio.TimeoutError:
+                await self._send_within_deadline(self._heartbeat())
+                self.heartbeats += 1
+                continue
+            self._ready.clear()
+            if self._lagged:
+                raise SlowSubscriber(f"Subscriber lagged more than {self.lag_deadline:g}s behind")
+
+            while self._outbox:
+                _, (frame, queued_at) = self._outbox.popitem(last=False)
+                await self._send_within_deadline(self._encode(frame))
+                self.sent += 1
+                self.max_lag = max(self.max_lag, time.monotonic() - queued_at)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "channel": self.channel,
+            "user_id": self.user_id,
+            "format": self.format,
+            "connected_seconds": round(now - self.connected_at, 3),
+            "pending": len(self._outbox),
+            "sent": self.sent,
+            "coalesced": self.coalesced,
+            "dropped": self.dropped,
+            "heartbeats": self.heartbeats,
+            "lag_ms": round(self.lag(now) * 1000, 3),
+            "max_lag_ms": round(self.max_lag * 1000, 3),
+        }
+
+    def _give_up(self) -> None:
+        self._lagged = True
+        self._outbox.clear()
+        self._ready.set()
+
+    async def _send_within_deadline(self, message) -> None:
+        try:
+            await asyncio.wait_for(self._send(message), self.lag_deadline)
+        except asyncio.TimeoutError:
+            self._give_up()
+            raise SlowSubscriber(f"Send blocked for more than {self.lag_deadline:g}s") from None
+
+    def _encode(self, frame: Frame):
+        return frame.json
+
+    def _heartbeat(self):
+        return self.HEARTBEAT
+
+    async def _send(self, message) -> None:
+        await self.websocket.send_text(message)
+
+
+class BinaryWebSocketSubscriber(WebSocketSubscriber):
+    """
+    Sends frames in the compact binary format.
+
+    Without delta encoding the shared full frame is sent as is; with it,
+    each connection keeps its own encoder state. Deltas are taken against
+    the last frame actually sent, so coalesced frames never break the chain.
+    ETA frames have no binary form and go out as JSON text messages.
+    """
+
+    def __init__(self, websocket: WebSocket, delta: bool = False, **kwargs):
+        super().__init__(websocket, **kwargs)
+        self._encoder = FrameEncoder(delta=True) if delta else None
+        self.format = "binary-delta" if delta else "binary"
+
+    def _encode(self, frame: Frame):
+        if isinstance(frame, EtaFrame):
+            return frame.json
+        if self._encoder is None:
+            return frame.binary
+        return encode_location(self._encoder, frame.location)
+
+    def _heartbeat(self):
+        return HEARTBEAT_FRAME
+
+    async def _send(self, message) -> None:
+        if isinstance(message, str):
+            await self.websocket.send_text(message)
+        else:
+            await self.websocket.send_bytes(message)
+
+
+class LocationHub:
+    """
+    Fans driver positions out to per-driver, per-trip and fleet channels.
+
+    Drivers publish each fix once; the frame is serialized a single time per
+    wire format and handed to every subscriber of the driver's channel, of
+    the fleet channel and, when the fix is tagged with a trip, of that
+    trip's channel. Trip ETAs go to the trip's channel only. Deliveries run
+    concurrently and a subscriber whose delivery fails (for example a
+    lagging WebSocket) is dropped from all channels.
+    """
+
+    FLEET_CHANNEL = "fleet"
+
+    def __init__(self):
+        self._channels: Dict[str, Set[Subscriber]] = defaultdict(set)
+
+    @staticmethod
+    def driver_channel(driver_id: int) -> str:
+        return f"driver:{driver_id}"
+
+    @staticmethod
+    def trip_channel(trip_id: int) -> str:
+        return f"trip:{trip_id}"
+
+    def subscribe(self, subscriber: Subscriber, channel: str) -> None:
+        self._channels[channel].add(subscriber)
+
+    def unsubscribe(self, subscriber: Subscriber, channel: Optional[str] = None) -> None:
+        """Remove a subscriber from one channel, or from all of them."""
+        channels = [channel] if channel else list(self._channels)
+        for name in channels:
+            members = self._channels.get(name)
+            if members is None:
+                continue
+            members.discard(subscriber)
+            if not members:
+                del self._channels[name]
+
+    def subscriber_count(self, channel: str) -> int:
+        return len(self._channels.get(channel, ()))
+
+    def subscribers(self) -> Set[Subscriber]:
+        """Every subscriber currently attached to any channel."""
+        return set().union(*self._channels.values())
+
+    async def publish(self, location: LocationResponse) -> int:
+        """Send a position to all interested subscribers; returns how many."""
+        targets = set(self._channels.get(self.driver_channel(location.driver_id), ()))
+        targets |= self._channels.get(self.FLEET_CHANNEL, set())
+        if location.trip_id is not None:
+            targets |= self._channels.get(self.trip_channel(location.trip_id), set())
+        if not targets:
+            return 0
+
+        frame = LocationFrame(location)
+        targets = list(targets)
+        results = await asyncio.gather(
+            *(subscriber.deliver(frame) for subscriber in targets),
+            return_exceptions=True,
+        )
+        self._drop_failed(targets, results)
+        return len(targets)
+
+    async def publish_eta(self, eta: TripEta) -> int:
+        """Send a trip's ETAs to the subscribers of its channel; returns how many."""
+        targets = list(self._channels.get(self.trip_channel(eta.trip_id), ()))
+        if not targets:
+            return 0
+        frame = EtaFrame(eta)
+        results = await asyncio.gather(
+            *(subscriber.deliver(frame) for subscriber in targets),
+            return_exceptions=True,
+        )
+        self._drop_failed(targets, results)
+        return len(targets)
+
+    def _drop_failed(self, targets, results) -> None:
+        for subscriber, result in zip(targets, results):
+            if isinstance(result, Exception):
+                self.unsubscribe(subscriber)
+
+
+location_hub = LocationHub()
@@ -0,0 +1,186 @@
+"""Retention and downsampling of driver location history."""
+
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.models.location import DriverLocation, LocationRetentionWatermark
+from safe_route.services.location_archive import LocationArchive, location_archive
+
+settings = get_settings()
+
+
+def _bucket_start(timestamp: datetime, bucket: int) -> datetime:
+    """Start of the `bucket`-second slot holding a naive UTC timestamp."""
+    seconds = int(timestamp.replace(tzinfo=timezone.utc).timestamp())
+    return datetime.fromtimestamp(seconds - seconds % bucket, timezone.utc).replace(tzinfo=None)
+
+
+class LocationRetentionJob:
+    """
+    Compacts `driver_locations` according to age tiers.
+
+    `tiers` is a list of `(max_age_days, bucket_seconds)` pairs, youngest
+    first. Rows younger than the first tier's age keep full resolution when
+    its bucket is 0; older tiers keep one point per driver per bucket; rows
+    older than the last tier are dropped. Every chunk of at most
+    `chunk_rows` rows is its own short transaction, so SQLite's write lock is
+    never held for long. Per-tier watermarks, stored in
+    `location_retention_watermarks`, remember how far each tier has been
+    compacted, so repeated runs (also after a restart) only scan rows that
+    aged into a tier since the previous run.
+
+    With an enabled `archive`, closed days older than `archive_after_days`
+    are first moved out of the database, and the same tiers are applied to
+    the archived days: a whole day is downsampled to the bucket of the tier
+    its newest possible fix falls in, and dropped once entirely past the
+    last tier.
+    """
+
+    def __init__(
+        self,
+        tiers: Sequence[Sequence[int]],
+        chunk_rows: int,
+        archive: Optional[LocationArchive] = None,
+        archive_after_days: int = 0,
+    ):
+        self.tiers = [(int(days), int(bucket)) for days, bucket in tiers]
+        self.chunk_rows = chunk_rows
+        self.archive = archive
+        self.archive_after_days = archive_after_days
+
+    def run(self, db: Session, now: Optional[datetime] = None) -> dict:
+        """Run one compaction pass and report what it removed."""
+        now = now or datetime.utcnow()
+        start = time.perf_counter()
+        report = {"archived": 0, "dropped": 0, "downsampled": 0, "chunks": 0}
+        archiving = self.archive is not None and self.archive.enabled
+        if archiving:
+            archive_before = (now - timedelta(days=self.archive_after_days)).date()
+            report["archived"], _ = self.archive.export_before(db, archive_before)
+        if not self.tiers:
+            return {**report, "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+        drop_before = now - timedelta(days=self.tiers[-1][0])
+        report["dropped"], report["chunks"] = self._drop(db, drop_before)
+
+        watermarks = self._watermarks(db)
+        upper = now
+        for days, bucket in self.tiers:
+            lower = now - timedelta(days=days)
+            if bucket > 0:
+                watermark = watermarks.get((days, bucket))
+                scan_from = lower if watermark is None else max(lower, watermark.compacted_until)
+                removed, chunks = self._downsample(db, scan_from, upper, bucket)
+                report["downsampled"] += removed
+                report["chunks"] += chunks
+                if watermark is None:
+                    watermark = LocationRetentionWatermark(max_age_days=days, bucket_seconds=bucket)
+                    db.add(watermark)
+                # A bucket cut by `upper` is rescanned whole next time, so it keeps one point
+                watermark.compacted_until = _bucket_start(upper, bucket)
+                db.commit()
+            upper = lower
+
+        if archiving:
+            dropped, downsampled = self._compact_archive(now, drop_before)
+            report["dropped"] += dropped
+            report["downsampled"] += downsampled
+
+        report["elapsed_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        return report
+
+    async def run_periodically(self, session_factory: Callable[[], Session], interval_hours: float) -> None:
+        """Run the job forever in a worker thread, every `interval_hours`."""
+        while True:
+            await asyncio.sleep(interval_hours * 3600)
+            db = session_factory()
+            try:
+                report = await asyncio.to_thread(self.run, db)
+                print(f"Location retention: {report}")
+            except Exception as e:
+                print(f"CRITICAL: Location retention run failed! {e}")
+            finally:
+                db.close()
+
+    def _watermarks(self, db: Session) -> Dict[Tuple[int, int], LocationRetentionWatermark]:
+        return {
+            (row.max_age_days, row.bucket_seconds): row
+            for row in db.query(LocationRetentionWatermark).all()
+        }
+
+    def _compact_archive(self, now: datetime, drop_before: datetime) -> tuple[int, int]:
+        dropped = self.archive.drop_before(drop_before.date())
+        downsampled = 0
+        for day in self.archive.days():
+            # Age of the day's newest possible fix decides its tier
+            age = now - datetime.combine(day + timedelta(days=1), datetime.min.time())
+            for days, bucket in self.tiers:
+                if age < timedelta(days=days):
+                    if bucket > 0:
+                        downsampled += self.archive.downsample_day(day, bucket)
+                    break
+        return dropped, downsampled
+
+    def _drop(self, db: Session, before: datetime) -> tuple[int, int]:
+        dropped = chunks = 0
+        while True:
+            ids = [row.id for row in db.query(DriverLocation.id).filter(
+                DriverLocation.timestamp < before
+            ).limit(self.chunk_rows)]
+            if not ids:
+                return dropped, chunks
+            db.query(DriverLocation).filter(
+                DriverLocation.id.in_(ids)
+            ).delete(synchronize_session=False)
+            db.commit()
+            dropped += len(ids)
+            chunks += 1
+
+    def _downsample(self, db: Session, start: datetime, end: datetime, bucket: int) -> tuple[int, int]:
+        """Keep the first point per driver per bucket within [start, end)."""
+        removed = chunks = 0
+        last_kept: Dict[int, int] = {}
+        cursor_ts, cursor_id = start, -1
+        while True:
+            rows = db.query(
+                DriverLocation.id, DriverLocation.driver_id, DriverLocation.timestamp
+            ).filter(
+                DriverLocation.timestamp < end,
+                or_(
+                    DriverLocation.timestamp > cursor_ts,
+                    and_(DriverLocation.timestamp == cursor_ts, DriverLocation.id > cursor_id),
+                ),
+            ).order_by(DriverLocation.timestamp, DriverLocation.id).limit(self.chunk_rows).all()
+            if not rows:
+                return removed, chunks
+
+            doomed: List[int] = []
+            for row in rows:
+                slot = int(row.timestamp.replace(tzinfo=timezone.utc).timestamp()) // bucket
+                if last_kept.get(row.driver_id) == slot:
+                    doomed.append(row.id)
+                else:
+                    last_kept[row.driver_id] = slot
+            if doomed:
+                db.query(DriverLocation).filter(
+                    DriverLocation.id.in_(doomed)
+                ).delete(synchronize_session=False)
+            db.commit()
+
+            removed += len(doomed)
+            chunks += 1
+            cursor_ts, cursor_id = rows[-1].timestamp, rows[-1].id
+
+
+location_retention = LocationRetentionJob(
+    settings.LOCATION_RETENTION_TIERS,
+    settings.LOCATION_RETENTION_CHUNK_ROWS,
+    archive=location_archive,
+    archive_after_days=settings.LOCATION_ARCHIVE_AFTER_DAYS,
+)
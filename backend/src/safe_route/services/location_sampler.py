@@ -0,0 +1,185 @@
+"""Server-side adaptive sampling of incoming GPS fixes."""
+
+import math
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from safe_route.config import get_settings
+
+settings = get_settings()
+
+EARTH_RADIUS_M = 6371000.0
+
+
+class _Anchor(NamedTuple):
+    """The last fix stored for a driver, with its meters-per-degree scale."""
+    lat: float
+    lng: float
+    timestamp: object
+    heading: Optional[float]
+    trip_id: Optional[int]
+    cos_lat: float
+
+
+class _DriverCounts:
+    __slots__ = ("received", "stored")
+
+    def __init__(self):
+        self.received = 0
+        self.stored = 0
+
+
+def _anchor(row: dict) -> _Anchor:
+    return _Anchor(
+        row["lat"], row["lng"], row["timestamp"], row["heading"], row["trip_id"],
+        math.cos(math.radians(row["lat"])),
+    )
+
+
+def _offset_m(anchor: _Anchor, row: dict) -> Tuple[float, float]:
+    """East/north offset of a fix from the anchor; equirectangular, fine at these scales."""
+    return (
+        math.radians(row["lng"] - anchor.lng) * anchor.cos_lat * EARTH_RADIUS_M,
+        math.radians(row["lat"] - anchor.lat) * EARTH_RADIUS_M,
+    )
+
+
+def _heading_change(a: Optional[float], b: Optional[float]) -> float:
+    if a is None or b is None:
+        return 0.0
+    change = abs(a - b) % 360
+    return min(change, 360 - change)
+
+
+class LocationSampler:
+    """
+    Decides which fixes are worth a row in `driver_locations`.
+
+    Every decision is made against the driver's last stored fix (the
+    anchor) and the last fix suppressed since (the held fix):
+
+    - the first fix, a fix for a different trip, an out-of-order fix and
+      one `max_interval` seconds after the anchor are always stored, the
+      last bounding the gap a parked vehicle leaves in history;
+    - fixes within `min_distance_m` of the anchor are GPS jitter and are
+      suppressed;
+    - a straight run stores one fix every `max_distance_m`;
+    - a turn, seen as a heading change of `min_heading_change` degrees or
+      as the held fix lying `min_distance_m` off the line from the anchor,
+      stores the held fix too, so the corner survives.
+
+    Each check is constant time. Suppression only affects history; callers
+    still use every fix for the live position.
+    """
+
+    def __init__(self, min_distance_m: float, max_distance_m: float, max_interval: float, min_heading_change: float):
+        self.min_distance_m = min_distance_m
+        self.max_distance_m = max_distance_m
+        self.max_interval = max_interval
+        self.min_heading_change = min_heading_change
+        self._anchors: Dict[int, _Anchor] = {}
+        self._held: Dict[int, dict] = {}
+        self._counts: Dict[int, _DriverCounts] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.min_distance_m > 0
+
+    def select(self, rows: List[dict]) -> List[dict]:
+        """
+        Return the rows to store.
+
+        These are the kept rows in their original order, preceded by any
+        held corner fixes from earlier calls that a turn made worth storing.
+        """
+        with self._lock:
+            if self.enabled:
+                # Decide oldest first so each fix is compared to its predecessor
+                corners: List[dict] = []
+                keep = set()
+                for row in sorted(rows, key=lambda row: row["timestamp"]):
+                    for stored in self._decide(row):
+                        if stored is row:
+                            keep.add(id(row))
+                        else:
+                            corners.append(stored)
+                in_batch = {id(row) for row in rows}
+                kept = [row for row in corners if id(row) not in in_batch]
+                keep.update(id(row) for row in corners)
+                kept += [row for row in rows if id(row) in keep]
+            else:
+                kept = rows
+
+            for row in rows:
+                counts = self._counts.get(row["driver_id"])
+                if counts is None:
+                    counts = self._counts[row["driver_id"]] = _DriverCounts()
+                counts.received += 1
+            for row in kept:
+                self._counts[row["driver_id"]].stored += 1
+        return kept
+
+    def _decide(self, row: dict) -> List[dict]:
+        """Rows to store because of this fix: none, the fix, or the held fix and the fix."""
+        driver_id = row["driver_id"]
+        anchor = self._anchors.get(driver_id)
+        if anchor is not None and row["timestamp"] < anchor.timestamp:
+            return [row]
+        if (
+            anchor is None
+            or row["trip_id"] != anchor.trip_id
+            or (row["timestamp"] - anchor.timestamp).total_seconds() >= self.max_interval
+        ):
+            return self._store(row)
+
+        x, y = _offset_m(anchor, row)
+        distance = math.hypot(x, y)
+        if distance < self.min_distance_m:
+            self._held[driver_id] = row
+            return []
+        if distance >= self.max_distance_m:
+            return self._store(row)
+
+        held = self._held.get(driver_id)
+        turned = _heading_change(anchor.heading, row["heading"]) >= self.min_heading_change
+        if held is not None and not turned:
+            hx, hy = _offset_m(anchor, held)
+            turned = abs(x * hy - y * hx) / distance >= self.min_distance_m
+        if turned:
+            return ([held] if held is not None else []) + self._store(row)
+
+        self._held[driver_id] = row
+        return []
+
+    def _store(self, row: dict) -> List[dict]:
+        self._anchors[row["driver_id"]] = _anchor(row)
+        self._held.pop(row["driver_id"], None)
+        return [row]
+
+    def stats(self) -> List[dict]:
+        """Per-driver received and stored counts with the suppression ratio."""
+        with self._lock:
+            return [
+                {
+                    "driver_id": driver_id,
+                    "received": counts.received,
+                    "stored": counts.stored,
+                    "suppression_ratio": round(1 - counts.stored / counts.received, 4),
+                }
+                for driver_id, counts in sorted(self._counts.items())
+            ]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._anchors.clear()
+            self._held.clear()
+            self._counts.clear()
+
+
+location_sampler = LocationSampler(
+    min_distance_m=settings.LOCATION_SAMPLING_MIN_DISTANCE_M,
+    max_distance_m=settings.LOCATION_SAMPLING_MAX_DISTANCE_M,
+    max_interval=settings.LOCATION_SAMPLING_MAX_INTERVAL_SECONDS,
+    min_heading_change=settings.LOCATION_SAMPLING_MIN_HEADING_CHANGE_DEG,
+)
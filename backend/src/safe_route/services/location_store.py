@@ -0,0 +1,102 @@
+"""Process-local store of the latest known position per driver."""
+
+import threading
+from typing import Dict, List, Optional
+
+from sqlalchemy.orm import Session
+
+from safe_route.models.location import DriverLocation, DriverLatestLocation
+from safe_route.schemas.location import LocationResponse
+from safe_route.services.location_writer import rebuild_latest_locations
+from safe_route.services.spatial_index import driver_grid
+
+
+def _from_latest_row(row: DriverLatestLocation) -> LocationResponse:
+    return LocationResponse(
+        id=row.location_id,
+        driver_id=row.driver_id,
+        trip_id=row.trip_id,
+        lat=row.lat,
+        lng=row.lng,
+        heading=row.heading,
+        speed=row.speed,
+        timestamp=row.timestamp,
+    )
+
+
+class LatestLocationStore:
+    """
+    Latest position per driver, kept current by every location write path.
+
+    Once warm, reads are dictionary lookups and never touch the database.
+    A cold store is filled from `driver_latest_locations` on first full
+    read, and a per-driver miss falls back to a primary-key lookup. Accepted
+    positions are mirrored into the spatial grid.
+    """
+
+    def __init__(self):
+        self._positions: Dict[int, LocationResponse] = {}
+        self._lock = threading.Lock()
+        self._warm = False
+
+    def put(self, location: LocationResponse) -> None:
+        """Record a position, ignoring fixes older than the one stored."""
+        with self._lock:
+            current = self._positions.get(location.driver_id)
+            if current is None or location.timestamp >= current.timestamp:
+                self._positions[location.driver_id] = location
+                driver_grid.update(location.driver_id, location.lat, location.lng)
+
+    def get(self, db: Session, driver_id: int) -> Optional[LocationResponse]:
+        """Get the latest position for a driver, loading it on a miss."""
+        location = self._positions.get(driver_id)
+        if location is not None:
+            return location
+
+        row = db.get(DriverLatestLocation, driver_id)
+        if row is None:
+            return None
+
+        location = _from_latest_row(row)
+        self.put(location)
+        return location
+
+    def all(self, db: Session) -> List[LocationResponse]:
+        """Get the latest position of every driver."""
+        self.ensure_warm(db)
+        return list(self._positions.values())
+
+    def get_many(self, driver_ids: List[int]) -> List[LocationResponse]:
+        """Get cached positions for the given drivers, skipping unknown ones."""
+        positions = self._positions
+        return [positions[driver_id] for driver_id in driver_ids if driver_id in positions]
+
+    def ensure_warm(self, db: Session) -> None:
+        if not self._warm:
+            self.warm(db)
+
+    def warm(self, db: Session) -> None:
+        """
+        Load the latest position of every driver.
+
+        An empty latest-location table next to a non-empty history means
+        the table predates this deployment, so it is backfilled first.
+        """
+        rows = db.query(DriverLatestLocation).all()
+        if not rows and db.query(DriverLocation.id).first() is not None:
+            rebuild_latest_locations(db)
+            rows = db.query(DriverLatestLocation).all()
+
+        for row in rows:
+            self.put(_from_latest_row(row))
+        self._warm = True
+
+    def clear(self) -> None:
+        """Drop all cached positions and mark the store cold."""
+        with self._lock:
+            self._positions.clear()
+            driver_grid.clear()
+            self._warm = False
+
+
+location_store = LatestLocationStore()
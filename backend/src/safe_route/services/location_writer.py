@@ -0,0 +1,106 @@
+"""Bulk writes of location rows and the per-driver latest-location table."""
+
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import func, insert, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from safe_route.models.location import DriverLocation, DriverLatestLocation
+
+_LATEST_COLUMNS = ("location_id", "trip_id", "lat", "lng", "heading", "speed", "timestamp")
+
+
+def bulk_insert_locations(db: Session, rows: List[dict]) -> List[int]:
+    """
+    Insert location rows with a single executemany statement.
+
+    Returns the new row ids in parameter order. The caller owns the
+    transaction and is responsible for committing.
+    """
+    if not rows:
+        return []
+    stmt = insert(DriverLocation).returning(DriverLocation.id, sort_by_parameter_order=True)
+    return list(db.scalars(stmt, rows))
+
+
+def upsert_latest_locations(db: Session, rows: List[dict], ids: List[Optional[int]]) -> None:
+    """
+    Upsert the newest of `rows` per driver into `driver_latest_locations`.
+
+    Older fixes never overwrite newer ones, so out-of-order batches are
+    safe. The caller owns the transaction and is responsible for committing.
+    """
+    newest: Dict[int, Tuple[dict, Optional[int]]] = {}
+    for row, row_id in zip(rows, ids):
+        current = newest.get(row["driver_id"])
+        if current is None or row["timestamp"] >= current[0]["timestamp"]:
+            newest[row["driver_id"]] = (row, row_id)
+    if not newest:
+        return
+
+    dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+    stmt = dialect.insert(DriverLatestLocation)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[DriverLatestLocation.driver_id],
+        set_={column: stmt.excluded[column] for column in _LATEST_COLUMNS},
+        where=stmt.excluded.timestamp >= DriverLatestLocation.timestamp,
+    )
+    db.execute(stmt, [
+        {
+            "driver_id": row["driver_id"],
+            "location_id": row_id,
+            **{column: row[column] for column in _LATEST_COLUMNS[1:]},
+        }
+        for row, row_id in newest.values()
+    ])
+
+
+def write_locations(db: Session, rows: List[dict], latest_only: Sequence[dict] = ()) -> List[int]:
+    """
+    Insert history rows and refresh the latest-location table together.
+
+    `latest_only` rows advance the latest-location table without being
+    stored in history, e.g. fixes suppressed by sampling. A history row
+    wins a timestamp tie.
+    """
+    ids = bulk_insert_locations(db, rows)
+    upsert_latest_locations(db, [*latest_only, *rows], [None] * len(latest_only) + ids)
+    return ids
+
+
+def rebuild_latest_locations(db: Session) -> int:
+    """
+    Rebuild `driver_latest_locations` from the full location history.
+
+    Runs as one transaction over the whole history table, so it is meant
+    for backfills and recovery rather than the request path. Returns the
+    number of drivers written.
+    """
+    ranked = select(
+        DriverLocation.id,
+        DriverLocation.driver_id,
+        DriverLocation.trip_id,
+        DriverLocation.lat,
+        DriverLocation.lng,
+        DriverLocation.heading,
+        DriverLocation.speed,
+        DriverLocation.timestamp,
+        func.row_number().over(
+            partition_by=DriverLocation.driver_id,
+            order_by=(DriverLocation.timestamp.desc(), DriverLocation.id.desc()),
+        ).label("rank"),
+    ).subquery()
+
+    db.query(DriverLatestLocation).delete(synchronize_session=False)
+    db.execute(
+        insert(DriverLatestLocation).from_select(
+            ["driver_id", *_LATEST_COLUMNS],
+            select(
+                ranked.c.driver_id, ranked.c.id, ranked.c.trip_id, ranked.c.lat, ranked.c.lng,
+                ranked.c.heading, ranked.c.speed, ranked.c.timestamp,
+            ).where(ranked.c.rank == 1),
+        )
+    )
+    db.commit()
+    return db.query(DriverLatestLocation).count()
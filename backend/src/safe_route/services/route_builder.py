@@ -0,0 +1,292 @@
+"""Fleet-wide route building: a capacitated vehicle routing heuristic."""
+
+import math
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from safe_route.config import get_settings
+from safe_route.services.job_runner import run_in_pool
+from safe_route.utils.geo import EARTH_RADIUS_KM, haversine_matrix, haversine_one_to_many
+from safe_route.utils.tour import improve_path
+
+settings = get_settings()
+
+IMPROVEMENT_EPSILON = 1e-9
+
+
+def nearest_neighbours(lats: np.ndarray, lngs: np.ndarray, k: int, block_rows: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    The k nearest other points of every point, with their distances in km.
+
+    The distance matrix is computed one block of rows at a time and only
+    the k smallest entries of each row are kept, so memory stays O(n * k).
+    """
+    count = len(lats)
+    k = min(k, count - 1)
+    indices = np.empty((count, k), dtype=np.intp)
+    distances = np.empty((count, k), dtype=np.float64)
+    for start in range(0, count, block_rows):
+        block = haversine_matrix(lats[start:start + block_rows], lngs[start:start + block_rows], lats, lngs)
+        rows = np.arange(len(block))
+        block[rows, rows + start] = np.inf  # Not its own neighbour
+        nearest = np.argpartition(block, k - 1, axis=1)[:, :k]
+        indices[start:start + len(block)] = nearest
+        distances[start:start + len(block)] = block[rows[:, None], nearest]
+    return indices, distances
+
+
+class _Plan:
+    """
+    Working state of one build: routes as stop lists leaving the depot.
+
+    Routes are open: they start at the depot and end at their last stop,
+    which is how a drop route is driven; a pickup route is the same path
+    reversed. Stops are indices into the coordinates, the depot is index n.
+    """
+
+    def __init__(self, lats: np.ndarray, lngs: np.ndarray, depot: Tuple[float, float]):
+        self.depot = len(lats)
+        self.lats = np.radians(np.append(lats, depot[0])).tolist()
+        self.lngs = np.radians(np.append(lngs, depot[1])).tolist()
+        self.cos_lats = [math.cos(lat) for lat in self.lats]
+        self.routes: List[List[int]] = []
+        self.capacities: List[int] = []
+        self.route_of = [-1] * len(lats)
+
+    def distance(self, a: int, b: Optional[int]) -> float:
+        """Distance in km; None stands for the open end of a route."""
+        if b is None:
+            return 0.0
+        dlat = math.sin((self.lats[b] - self.lats[a]) / 2)
+        dlng = math.sin((self.lngs[b] - self.lngs[a]) / 2)
+        h = dlat * dlat + self.cos_lats[a] * self.cos_lats[b] * dlng * dlng
+        return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+
+    def removal_gain(self, route: List[int], position: int) -> float:
+        prev = route[position - 1] if position else self.depot
+        stop = route[position]
+        nxt = route[position + 1] if position + 1 < len(route) else None
+        return self.distance(prev, stop) + self.distance(stop, nxt) - self.distance(prev, nxt)
+
+    def cheapest_insertion(self, route: List[int], stop: int) -> Tuple[float, int]:
+        """Added km and position of the cheapest place for `stop` in `route`."""
+        best, where = math.inf, -1
+        prev = self.depot
+        for position in range(len(route) + 1):
+            nxt = route[position] if position < len(route) else None
+            cost = self.distance(prev, stop) + self.distance(stop, nxt) - self.distance(prev, nxt)
+            if cost < best:
+                best, where = cost, position
+            prev = nxt
+        return best, where
+
+    def length(self, route: List[int]) -> float:
+        stops = [self.depot, *route]
+        return sum(self.distance(a, b) for a, b in zip(stops, stops[1:]))
+
+    def add_route(self, route: List[int], capacity: int) -> None:
+        index = len(self.routes)
+        self.routes.append(route)
+        self.capacities.append(capacity)
+        for stop in route:
+            self.route_of[stop] = index
+
+    def insert(self, stop: int, candidates: Sequence[int]) -> bool:
+        """Put `stop` where it adds least among the candidate routes with room."""
+        best, target, where = math.inf, -1, -1
+        for index in candidates:
+            route = self.routes[index]
+            if len(route) >= self.capacities[index]:
+                continue
+            cost, position = self.cheapest_insertion(route, stop)
+            if cost < best:
+                best, target, where = cost, index, position
+        if target < 0:
+            return False
+        self.routes[target].insert(where, stop)
+        self.route_of[stop] = target
+        return True
+
+
+def savings_routes(
+    depot_km: np.ndarray, neighbours: np.ndarray, neighbour_km: np.ndarray, capacities: Sequence[int],
+) -> List[List[int]]:
+    """
+    Clarke-Wright savings construction for open routes leaving the depot.
+
+    Every stop starts on its own route. Appending the route headed by j to
+    the route ending at i drops the depot leg to j and adds the leg i -> j,
+    saving depot_km[j] - d(i, j). Only nearest-neighbour pairs are
+    considered, best saving first. A merge is taken only while the routes
+    of each size can still get their own vehicle: for every load L, no more
+    routes carry L or more stops than there are vehicles seating L.
+    """
+    count = len(depot_km)
+    largest = max(capacities)
+    # seats[L] = vehicles seating at least L, routes[L] = routes carrying at least L
+    seats = np.zeros(largest + 2, dtype=np.int64)
+    np.add.at(seats, np.asarray(capacities), 1)
+    seats = np.cumsum(seats[::-1])[::-1].tolist()
+    loads = [0] * (largest + 2)
+    loads[1] = count
+    tails = np.repeat(np.arange(count), neighbours.shape[1])
+    heads = neighbours.reshape(-1)
+    savings = depot_km[heads] - neighbour_km.reshape(-1)
+    keep = savings > 0
+    tails, heads, savings = tails[keep], heads[keep], savings[keep]
+    ranked = np.argsort(-savings, kind="stable")
+
+    nxt = [-1] * count
+    is_head = [True] * count
+    members = [[stop] for stop in range(count)]
+    route_of = list(range(count))
+    for tail, head in zip(tails[ranked].tolist(), heads[ranked].tolist()):
+        if nxt[tail] != -1 or not is_head[head]:
+            continue
+        first, second = route_of[tail], route_of[head]
+        if first == second:
+            continue
+        smaller, larger = sorted((len(members[first]), len(members[second])))
+        merged = smaller + larger
+        # Loads above the larger part gain one route; the smaller part's loads lose one
+        if merged > largest or any(loads[load] + 1 > seats[load] for load in range(larger + 1, merged + 1)):
+            continue
+        for load in range(larger + 1, merged + 1):
+            loads[load] += 1
+        for load in range(1, smaller + 1):
+            loads[load] -= 1
+        nxt[tail] = head
+        is_head[head] = False
+        # Relabel the smaller route into the larger
+        keep_id, drop_id = (first, second) if len(members[first]) >= len(members[second]) else (second, first)
+        for stop in members[drop_id]:
+            route_of[stop] = keep_id
+        members[keep_id].extend(members[drop_id])
+        members[drop_id] = []
+
+    routes = []
+    for stop in range(count):
+        if is_head[stop]:
+            route = [stop]
+            while nxt[route[-1]] != -1:
+                route.append(nxt[route[-1]])
+            routes.append(route)
+    return routes
+
+
+def plan_routes(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    depot: Tuple[float, float],
+    capacities: Sequence[int],
+    ends_at_depot: bool = False,
+    time_budget: Optional[float] = None,
+    neighbour_count: Optional[int] = None,
+) -> dict:
+    """
+    Split stops over vehicles and order each route.
+
+    1. Savings construction that keeps the routes assignable to the fleet.
+    2. The largest routes go to the largest vehicles. Routes left without a
+       vehicle are dissolved and their stops reinserted where they add
+       least into routes with spare seats.
+    3. Relocation: each stop moves to a neighbouring route with room when
+       that shortens the total, until no move helps or time runs out.
+    4. Every route is polished with 2-opt and Or-opt.
+
+    Returns, per used vehicle (an index into `capacities`), the stops in
+    driving order and the route length, plus the stops nothing had room for.
+    """
+    start = time.perf_counter()
+    if time_budget is None:
+        time_budget = settings.ROUTE_BUILD_TIME_BUDGET_SECONDS
+    deadline = start + time_budget
+    count = len(lats)
+    if not count or not capacities:
+        return {"routes": [], "unassigned": list(range(count)), "total_length_km": 0.0,
+                "elapsed_ms": round((time.perf_counter() - start) * 1000, 3)}
+
+    lats, lngs = np.asarray(lats, dtype=np.float64), np.asarray(lngs, dtype=np.float64)
+    depot_km = haversine_one_to_many(depot[0], depot[1], lats, lngs)
+    if count > 1:
+        neighbours, neighbour_km = nearest_neighbours(
+            lats, lngs, neighbour_count or settings.ROUTE_BUILD_NEIGHBOURS
+        )
+    else:
+        neighbours, neighbour_km = np.empty((1, 0), dtype=np.intp), np.empty((1, 0))
+    plan = _Plan(lats, lngs, depot)
+
+    routes = savings_routes(depot_km, neighbours, neighbour_km, capacities)
+
+    # 2. Largest routes to largest vehicles; savings guarantees they fit
+    vehicles = sorted(range(len(capacities)), key=lambda v: -capacities[v])
+    routes.sort(key=len, reverse=True)
+    vehicle_of_route = []
+    for route, vehicle in zip(routes, vehicles):
+        plan.add_route(route, capacities[vehicle])
+        vehicle_of_route.append(vehicle)
+
+    # Farthest first: those are the stops whose placement matters most
+    pool = [stop for route in routes[len(vehicles):] for stop in route]
+    unassigned = []
+    for stop in sorted(pool, key=lambda s: -depot_km[s]):
+        nearby = {plan.route_of[other] for other in neighbours[stop].tolist()} - {-1}
+        if not plan.insert(stop, nearby) and not plan.insert(stop, range(len(plan.routes))):
+            unassigned.append(stop)
+
+    # 3. Relocate stops between neighbouring routes
+    improved = True
+    while improved and time.perf_counter() < deadline:
+        improved = False
+        for stop in range(count):
+            source = plan.route_of[stop]
+            if source < 0:
+                continue
+            route = plan.routes[source]
+            position = route.index(stop)
+            gain = plan.removal_gain(route, position)
+            best, target, where = gain - IMPROVEMENT_EPSILON, -1, -1
+            for index in {plan.route_of[other] for other in neighbours[stop].tolist()} - {source, -1}:
+                if len(plan.routes[index]) >= plan.capacities[index]:
+                    continue
+                cost, at = plan.cheapest_insertion(plan.routes[index], stop)
+                if cost < best:
+                    best, target, where = cost, index, at
+            if target >= 0:
+                route.pop(position)
+                plan.routes[target].insert(where, stop)
+                plan.route_of[stop] = target
+                improved = True
+            if time.perf_counter() > deadline:
+                break
+
+    # 4. Polish each route on its own small matrix
+    result = []
+    for index, route in enumerate(plan.routes):
+        if not route:
+            continue
+        if len(route) > 2:
+            points = haversine_matrix([*lats[route], depot[0]], [*lngs[route], depot[1]])
+            distances = np.zeros((len(route) + 2, len(route) + 2))
+            distances[:-1, :-1] = points
+            remaining = max(deadline - time.perf_counter(), 0.0) / (len(plan.routes) - index)
+            order, _ = improve_path(distances, [len(route), *range(len(route)), len(route) + 1], remaining)
+            route = [route[i] for i in order[1:-1]]
+        length = plan.length(route)
+        if ends_at_depot:
+            route = route[::-1]
+        result.append({"vehicle": vehicle_of_route[index], "stops": route, "length_km": round(length, 3)})
+
+    return {
+        "routes": result,
+        "unassigned": sorted(unassigned),
+        "total_length_km": round(sum(route["length_km"] for route in result), 3),
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+async def plan_routes_in_pool(*args, **kwargs) -> dict:
+    """Run `plan_routes` in a worker process so the event loop stays free."""
+    return await run_in_pool(plan_routes, *args, **kwargs)
@@ -0,0 +1,95 @@
+"""Stop sequencing for routes: a greedy tour refined by local search."""
+
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from safe_route.config import get_settings
+from safe_route.services.distance_cache import distance_cache
+from safe_route.utils.geo import haversine_matrix, haversine_one_to_many, nearest_neighbor_order
+from safe_route.utils.tour import improve_path, path_length
+
+settings = get_settings()
+
+
+def configured_depot() -> Optional[Tuple[float, float]]:
+    """The office location routes start or end at, when one is configured."""
+    if settings.ROUTE_DEPOT_LAT is None or settings.ROUTE_DEPOT_LNG is None:
+        return None
+    return settings.ROUTE_DEPOT_LAT, settings.ROUTE_DEPOT_LNG
+
+
+def optimize_stop_order(
+    lats: Sequence[float],
+    lngs: Sequence[float],
+    depot: Optional[Tuple[float, float]] = None,
+    ends_at_depot: bool = False,
+    time_budget: Optional[float] = None,
+    employee_ids: Optional[Sequence[int]] = None,
+    stop_distances: Optional[np.ndarray] = None,
+) -> dict:
+    """
+    Order stops, given in their current sequence, to shorten the drive.
+
+    With a depot, the route is an open path leaving it (or, when
+    `ends_at_depot`, the same path reversed, arriving at it). Without one,
+    both ends are free. The distance matrix is built once; a nearest-
+    neighbour tour is then improved by 2-opt and Or-opt moves until they
+    stop helping or `time_budget` seconds have passed. Stop-to-stop
+    distances are `stop_distances` when given, else come from the shared
+    cache given the stops' `employee_ids`. Worker processes have their own
+    empty cache, so pooled callers look the matrix up first and pass it.
+
+    Returns the new order as indices into the input, the length in km of
+    the current, greedy and final orders, and the number of moves applied.
+    """
+    start = time.perf_counter()
+    if time_budget is None:
+        time_budget = settings.ROUTE_OPTIMIZE_TIME_BUDGET_MS / 1000
+    count = len(lats)
+    if stop_distances is not None:
+        stops = stop_distances
+    elif employee_ids is not None:
+        stops = distance_cache.matrix(list(zip(employee_ids, lats, lngs)))
+    else:
+        stops = haversine_matrix(lats, lngs)
+
+    # Open ends become a dummy node at zero distance from everything, so
+    # every move below sees a path with both endpoints fixed
+    size = count + 1 if depot is None else count + 2
+    distances = np.zeros((size, size))
+    distances[:count, :count] = stops
+    if depot is not None:
+        distances[count, :count] = distances[:count, count] = haversine_one_to_many(depot[0], depot[1], lats, lngs)
+        points = distances[:count + 1, :count + 1]
+    else:
+        points = stops
+    end = size - 1
+    if depot is not None:
+        anchor = count
+        greedy = nearest_neighbor_order(points, start=anchor)
+    else:
+        anchor = end
+        greedy = [0] + nearest_neighbor_order(points, start=0)
+
+    current = [anchor, *range(count), end]
+    initial = [anchor, *greedy, end]
+    improved, moves = improve_path(distances, initial, max(time_budget - (time.perf_counter() - start), 0.0))
+
+    order: List[int] = improved[1:-1]
+    if depot is not None and ends_at_depot:
+        order.reverse()
+    return {
+        "order": order,
+        "length_before_km": round(path_length(distances, current), 3),
+        "greedy_length_km": round(path_length(distances, initial), 3),
+        "length_after_km": round(path_length(distances, improved), 3),
+        "moves": moves,
+        "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+    }
+
+
+def optimize_stop_orders(problems: Sequence[dict]) -> List[dict]:
+    """Optimize several routes in one call, each given as `optimize_stop_order` keyword arguments."""
+    return [optimize_stop_order(**problem) for problem in problems]
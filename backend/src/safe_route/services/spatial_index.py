@@ -0,0 +1,109 @@
+"""Uniform grid index over live driver positions."""
+
+import math
+import threading
+from typing import Dict, List, Set, Tuple
+
+import numpy as np
+
+from safe_route.config import get_settings
+from safe_route.utils.geo import haversine_one_to_many
+
+settings = get_settings()
+
+KM_PER_DEGREE_LAT = 111.32
+
+Cell = Tuple[int, int]
+
+
+class DriverGrid:
+    """
+    Buckets each driver's latest position into fixed-size lat/lng cells.
+
+    Radius and bounding-box queries only visit the cells overlapping the
+    query area (or the occupied cells, whichever is fewer), so their cost
+    follows the size of the neighbourhood rather than the fleet.
+    """
+
+    def __init__(self, cell_km: float):
+        self.cell_deg = cell_km / KM_PER_DEGREE_LAT
+        self._cells: Dict[Cell, Set[int]] = {}
+        self._drivers: Dict[int, Tuple[Cell, float, float]] = {}
+        self._lock = threading.Lock()
+
+    def _cell(self, lat: float, lng: float) -> Cell:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def update(self, driver_id: int, lat: float, lng: float) -> None:
+        """Move a driver to a new position."""
+        cell = self._cell(lat, lng)
+        with self._lock:
+            previous = self._drivers.get(driver_id)
+            if previous is not None and previous[0] != cell:
+                self._discard(previous[0], driver_id)
+            self._cells.setdefault(cell, set()).add(driver_id)
+            self._drivers[driver_id] = (cell, lat, lng)
+
+    def remove(self, driver_id: int) -> None:
+        with self._lock:
+            previous = self._drivers.pop(driver_id, None)
+            if previous is not None:
+                self._discard(previous[0], driver_id)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells.clear()
+            self._drivers.clear()
+
+    def __len__(self) -> int:
+        return len(self._drivers)
+
+    def within_bbox(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float) -> List[int]:
+        """Drivers inside a bounding box."""
+        ids, lats, lngs = self._candidates(min_lat, min_lng, max_lat, max_lng)
+        inside = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+        return [ids[i] for i in np.flatnonzero(inside)]
+
+    def within_radius(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """Drivers within `radius_km` of a point as (driver_id, km), nearest first."""
+        dlat = radius_km / KM_PER_DEGREE_LAT
+        dlng = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 1e-6))
+        ids, lats, lngs = self._candidates(lat - dlat, lng - dlng, lat + dlat, lng + dlng)
+        if not ids:
+            return []
+        distances = haversine_one_to_many(lat, lng, lats, lngs)
+        order = np.argsort(distances, kind="stable")
+        return [(ids[i], float(distances[i])) for i in order if distances[i] <= radius_km]
+
+    def _candidates(self, min_lat: float, min_lng: float, max_lat: float, max_lng: float):
+        """Positions of drivers in every cell overlapping the box."""
+        row_lo, col_lo = self._cell(min_lat, min_lng)
+        row_hi, col_hi = self._cell(max_lat, max_lng)
+        with self._lock:
+            if (row_hi - row_lo + 1) * (col_hi - col_lo + 1) > len(self._cells):
+                cells = [
+                    members for (row, col), members in self._cells.items()
+                    if row_lo <= row <= row_hi and col_lo <= col <= col_hi
+                ]
+            else:
+                cells = [
+                    self._cells[(row, col)]
+                    for row in range(row_lo, row_hi + 1)
+                    for col in range(col_lo, col_hi + 1)
+                    if (row, col) in self._cells
+                ]
+            ids = [driver_id for members in cells for driver_id in members]
+            positions = [self._drivers[driver_id] for driver_id in ids]
+        lats = np.fromiter((p[1] for p in positions), dtype=float, count=len(positions))
+        lngs = np.fromiter((p[2] for p in positions), dtype=float, count=len(positions))
+        return ids, lats, lngs
+
+    def _discard(self, cell: Cell, driver_id: int) -> None:
+        members = self._cells.get(cell)
+        if members is not None:
+            members.discard(driver_id)
+            if not members:
+                del self._cells[cell]
+
+
+driver_grid = DriverGrid(settings.SPATIAL_GRID_CELL_KM)
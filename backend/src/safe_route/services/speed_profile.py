@@ -0,0 +1,237 @@
+"""Historical speed profile used to estimate travel times."""
+
+import asyncio
+import math
+import threading
+import time
+from datetime import datetime
+from typing import Callable, Dict, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.models.location import DriverLocation
+from safe_route.models.speed_profile import SpeedProfileCell, SpeedProfileWatermark
+
+settings = get_settings()
+
+HOURS_PER_WEEK = 7 * 24
+KMH_PER_MPS = 3.6  # Fixes report speed in m/s, the profile works in km/h
+MAX_PLAUSIBLE_KMH = 150.0  # Faster reports are GPS glitches
+
+CellKey = Tuple[int, int, int]
+
+
+def hour_of_week(timestamp: datetime) -> int:
+    return timestamp.weekday() * 24 + timestamp.hour
+
+
+class SpeedProfile:
+    """
+    Mean speed per grid cell and hour of week, learned from trip history.
+
+    The table keeps sample counts and speed sums rather than means, so
+    `refresh` can fold in only the rows added since the last run (tracked by
+    a driver_locations id watermark) and add them to the existing totals.
+    The same totals are mirrored in memory, making `speed_kmh` a dict
+    lookup. Cells with fewer than `min_samples` fixes at that hour fall back
+    to the cell's mean over all hours, then to the fleet-wide mean for the
+    hour, then to `default_kmh`.
+
+    Hours are UTC, like every stored timestamp; a local rush hour is simply
+    a different hour of the week.
+    """
+
+    def __init__(
+        self,
+        cell_deg: Optional[float] = None,
+        min_samples: Optional[int] = None,
+        default_kmh: Optional[float] = None,
+        min_kmh: Optional[float] = None,
+        chunk_rows: Optional[int] = None,
+    ):
+        self.cell_deg = cell_deg or settings.SPEED_PROFILE_CELL_DEG
+        self.min_samples = min_samples if min_samples is not None else settings.SPEED_PROFILE_MIN_SAMPLES
+        self.default_kmh = default_kmh or settings.ETA_AVERAGE_SPEED_KMH
+        self.min_kmh = min_kmh if min_kmh is not None else settings.SPEED_PROFILE_MIN_KMH
+        self.chunk_rows = chunk_rows or settings.SPEED_PROFILE_CHUNK_ROWS
+        self._cells: Dict[CellKey, Tuple[int, float]] = {}
+        self._cell_totals: Dict[Tuple[int, int], Tuple[int, float]] = {}
+        self._hour_samples = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        self._hour_sums = np.zeros(HOURS_PER_WEEK, dtype=np.float64)
+        self._lock = threading.Lock()
+        self._warm = False
+
+    def cell(self, lat: float, lng: float) -> Tuple[int, int]:
+        return math.floor(lat / self.cell_deg), math.floor(lng / self.cell_deg)
+
+    def speed_kmh(self, lat: float, lng: float, at: datetime) -> float:
+        """Expected speed around a point at a time of the week."""
+        hour = hour_of_week(at)
+        cell = self.cell(lat, lng)
+        for samples, speed_sum in (
+            self._cells.get((*cell, hour), (0, 0.0)),
+            self._cell_totals.get(cell, (0, 0.0)),
+            (self._hour_samples[hour], self._hour_sums[hour]),
+        ):
+            if samples >= self.min_samples:
+                return max(speed_sum / samples, self.min_kmh)
+        return self.default_kmh
+
+    def travel_minutes(self, from_lat: float, from_lng: float, to_lat: float, to_lng: float,
+                       distance_km: float, at: datetime) -> float:
+        """Minutes to cover a leg, at the speed of the cell around its midpoint."""
+        if distance_km <= 0:
+            return 0.0
+        speed = self.speed_kmh((from_lat + to_lat) / 2, (from_lng + to_lng) / 2, at)
+        return distance_km / speed * 60
+
+    def ensure_warm(self, db: Session) -> None:
+        if not self._warm:
+            self.load(db)
+
+    def load(self, db: Session) -> int:
+        """Mirror the stored profile in memory; returns the number of cells."""
+        cells: Dict[CellKey, Tuple[int, float]] = {}
+        cell_totals: Dict[Tuple[int, int], Tuple[int, float]] = {}
+        hour_samples = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+        hour_sums = np.zeros(HOURS_PER_WEEK, dtype=np.float64)
+        for cell_lat, cell_lng, hour, samples, speed_sum in db.execute(select(
+            SpeedProfileCell.cell_lat, SpeedProfileCell.cell_lng, SpeedProfileCell.hour_of_week,
+            SpeedProfileCell.samples, SpeedProfileCell.speed_sum,
+        )):
+            cells[(cell_lat, cell_lng, hour)] = (samples, speed_sum)
+            total = cell_totals.get((cell_lat, cell_lng), (0, 0.0))
+            cell_totals[(cell_lat, cell_lng)] = (total[0] + samples, total[1] + speed_sum)
+            hour_samples[hour] += samples
+            hour_sums[hour] += speed_sum
+        with self._lock:
+            self._cells, self._cell_totals = cells, cell_totals
+            self._hour_samples, self._hour_sums = hour_samples, hour_sums
+            self._warm = True
+        return len(cells)
+
+    def refresh(self, db: Session) -> dict:
+        """
+        Fold history rows added since the last refresh into the profile.
+
+        Only trip fixes (sent with a trip_id) with a plausible reported
+        speed count; their m/s speeds are converted to km/h. Rows are read
+        in id order, `chunk_rows` at a time; each chunk's totals and the
+        watermark are committed together, so an interrupted refresh resumes
+        where it stopped without counting any row twice.
+        """
+        start = time.perf_counter()
+        self.ensure_warm(db)
+        watermark = db.get(SpeedProfileWatermark, 1)
+        if watermark is None:
+            watermark = SpeedProfileWatermark(id=1, last_location_id=0)
+            db.add(watermark)
+            db.flush()
+
+        rows = 0
+        touched = set()
+        while True:
+            chunk = db.execute(
+                select(DriverLocation.id, DriverLocation.lat, DriverLocation.lng,
+                       DriverLocation.speed, DriverLocation.timestamp)
+                .where(
+                    DriverLocation.id > watermark.last_location_id,
+                    DriverLocation.trip_id.is_not(None),
+                    DriverLocation.speed.is_not(None),
+                )
+                .order_by(DriverLocation.id)
+                .limit(self.chunk_rows)
+            ).all()
+            if not chunk:
+                break
+            totals = self._aggregate(chunk)
+            self._store(db, totals)
+            watermark.last_location_id = chunk[-1][0]
+            db.commit()
+            self._merge(totals)
+            rows += len(chunk)
+            touched.update(totals)
+            if len(chunk) < self.chunk_rows:
+                break
+        db.commit()
+        return {
+            "rows": rows,
+            "cells": len(touched),
+            "elapsed_ms": round((time.perf_counter() - start) * 1000, 3),
+        }
+
+    async def run_periodically(self, session_factory: Callable[[], Session], interval_hours: float) -> None:
+        """Refresh the profile forever in a worker thread, every `interval_hours`."""
+        while True:
+            await asyncio.sleep(interval_hours * 3600)
+            db = session_factory()
+            try:
+                report = await asyncio.to_thread(self.refresh, db)
+                print(f"Speed profile refresh: {report}")
+            except Exception as e:
+                print(f"CRITICAL: Speed profile refresh failed! {e}")
+            finally:
+                db.close()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells = {}
+            self._cell_totals = {}
+            self._hour_samples = np.zeros(HOURS_PER_WEEK, dtype=np.int64)
+            self._hour_sums = np.zeros(HOURS_PER_WEEK, dtype=np.float64)
+            self._warm = False
+
+    def _aggregate(self, chunk) -> Dict[CellKey, Tuple[int, float]]:
+        """Sum one chunk of (id, lat, lng, speed, timestamp) rows per cell and hour."""
+        _, lats, lngs, speeds, timestamps = zip(*chunk)
+        speeds = np.array(speeds, dtype=np.float64) * KMH_PER_MPS
+        keep = (speeds >= 0) & (speeds <= MAX_PLAUSIBLE_KMH)
+        keys = np.column_stack([
+            np.floor(np.array(lats) / self.cell_deg).astype(np.int64),
+            np.floor(np.array(lngs) / self.cell_deg).astype(np.int64),
+            np.fromiter((hour_of_week(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps)),
+        ])[keep]
+        if not len(keys):
+            return {}
+        unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+        inverse = inverse.reshape(-1)
+        counts = np.bincount(inverse)
+        sums = np.bincount(inverse, weights=speeds[keep])
+        return {
+            (int(k[0]), int(k[1]), int(k[2])): (int(n), float(s))
+            for k, n, s in zip(unique, counts, sums)
+        }
+
+    def _store(self, db: Session, totals: Dict[CellKey, Tuple[int, float]]) -> None:
+        if not totals:
+            return
+        dialect = postgresql if db.get_bind().dialect.name == "postgresql" else sqlite
+        stmt = dialect.insert(SpeedProfileCell)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SpeedProfileCell.cell_lat, SpeedProfileCell.cell_lng, SpeedProfileCell.hour_of_week],
+            set_={
+                "samples": SpeedProfileCell.samples + stmt.excluded.samples,
+                "speed_sum": SpeedProfileCell.speed_sum + stmt.excluded.speed_sum,
+            },
+        )
+        db.execute(stmt, [
+            {"cell_lat": k[0], "cell_lng": k[1], "hour_of_week": k[2], "samples": n, "speed_sum": s}
+            for k, (n, s) in totals.items()
+        ])
+
+    def _merge(self, totals: Dict[CellKey, Tuple[int, float]]) -> None:
+        with self._lock:
+            for key, (samples, speed_sum) in totals.items():
+                current = self._cells.get(key, (0, 0.0))
+                self._cells[key] = (current[0] + samples, current[1] + speed_sum)
+                current = self._cell_totals.get(key[:2], (0, 0.0))
+                self._cell_totals[key[:2]] = (current[0] + samples, current[1] + speed_sum)
+                self._hour_samples[key[2]] += samples
+                self._hour_sums[key[2]] += speed_sum
+
+
+speed_profile = SpeedProfile()
@@ -0,0 +1,139 @@
+"""Live per-stop ETAs of in-progress trips, computed once per driver fix."""
+
+import threading
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from safe_route.models.trip import Trip
+from safe_route.schemas.location import LocationResponse
+from safe_route.schemas.trip import StopEta, TripEta
+from safe_route.services.geofence import TRACKED_STATUSES, TripFences, geofence_engine
+from safe_route.services.location_store import location_store
+from safe_route.services.speed_profile import SpeedProfile, speed_profile
+from safe_route.utils.geo import haversine_distance
+
+
+def cumulative_km(fences: TripFences) -> List[float]:
+    """Distance along the stop sequence from the first stop to each stop."""
+    totals = [0.0]
+    for leg in fences.legs_km:
+        totals.append(totals[-1] + leg)
+    return totals
+
+
+class TripEtaService:
+    """
+    Shared ETA computation for every watcher of a trip.
+
+    Stop order and progress come from the geofence engine, and the legs
+    between consecutive stops from the fences. The legs are summed once per
+    set of fences, so a fix costs one distance to the next stop plus, per
+    remaining stop, a subtraction and one speed-profile lookup for the leg
+    at the time the vehicle is expected to drive it. The result is cached
+    per trip; the API and the live channels serve that one copy however
+    many employees are watching.
+    """
+
+    def __init__(self, profile: Optional[SpeedProfile] = None):
+        self.profile = profile or speed_profile
+        # trip_id -> (fences the totals were computed for, cumulative km per stop)
+        self._legs: Dict[int, Tuple[TripFences, List[float]]] = {}
+        self._etas: Dict[int, TripEta] = {}
+        self._lock = threading.Lock()
+
+    def compute(self, fences: TripFences, location: LocationResponse) -> TripEta:
+        """ETAs to the stops not yet departed from, measured from one fix."""
+        legs = self._legs.get(fences.trip_id)
+        if legs is None or legs[0] is not fences:
+            legs = (fences, cumulative_km(fences))
+            self._legs[fences.trip_id] = legs
+        totals = legs[1]
+
+        stops = []
+        first = fences.next_index
+        if first < len(fences.stops):
+            if fences.inside:
+                to_next = 0.0
+            else:
+                current = fences.stops[first]
+                to_next = haversine_distance(current.lat, current.lng, location.lat, location.lng)
+            lat, lng, elapsed = location.lat, location.lng, 0.0
+            for index in range(first, len(fences.stops)):
+                stop = fences.stops[index]
+                leg = to_next if index == first else totals[index] - totals[index - 1]
+                elapsed += self.profile.travel_minutes(
+                    lat, lng, stop.lat, stop.lng, leg, location.timestamp + timedelta(minutes=elapsed)
+                )
+                lat, lng = stop.lat, stop.lng
+                distance = to_next + totals[index] - totals[first]
+                minutes = int(elapsed)
+                stops.append(StopEta(
+                    stop_id=stop.stop_id,
+                    employee_id=stop.employee_id,
+                    sequence_order=stop.sequence_order,
+                    distance_km=round(distance, 3),
+                    eta_minutes=minutes,
+                    eta=location.timestamp + timedelta(minutes=minutes),
+                ))
+        return TripEta(
+            trip_id=fences.trip_id, driver_id=fences.driver_id,
+            lat=location.lat, lng=location.lng, timestamp=location.timestamp, stops=stops,
+        )
+
+    def observe(self, db: Session, location: LocationResponse) -> Optional[TripEta]:
+        """
+        Refresh the ETAs of the trip the driver is running.
+
+        Returns the new ETAs only when they changed for some stop, so that
+        fixes which move no minute are not pushed to watchers.
+        """
+        trip_id = geofence_engine.active_trip(location.driver_id)
+        if trip_id is None or location.trip_id not in (None, trip_id):
+            return None
+        fences = geofence_engine.fences(db, trip_id)
+        if fences is None:
+            return None
+
+        self.profile.ensure_warm(db)
+        eta = self.compute(fences, location)
+        with self._lock:
+            previous = self._etas.get(trip_id)
+            self._etas[trip_id] = eta
+        if previous is not None and _minutes(previous) == _minutes(eta):
+            return None
+        return eta
+
+    def get(self, db: Session, trip: Trip) -> Optional[TripEta]:
+        """Cached ETAs of a trip, computed from the driver's last position if missing."""
+        eta = self._etas.get(trip.id)
+        if eta is not None or trip.status not in TRACKED_STATUSES:
+            return eta
+        location = location_store.get(db, trip.driver_id)
+        fences = geofence_engine.fences(db, trip.id)
+        if location is None or fences is None:
+            return None
+        self.profile.ensure_warm(db)
+        eta = self.compute(fences, location)
+        with self._lock:
+            self._etas[trip.id] = eta
+        return eta
+
+    def discard(self, trip_id: int) -> None:
+        """Forget a trip that completed, was cancelled or deleted."""
+        with self._lock:
+            self._etas.pop(trip_id, None)
+            self._legs.pop(trip_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._etas.clear()
+            self._legs.clear()
+
+
+def _minutes(eta: TripEta) -> List[Tuple[int, int]]:
+    return [(stop.stop_id, stop.eta_minutes) for stop in eta.stops]
+
+
+trip_eta = TripEtaService()
@@ -0,0 +1,120 @@
+"""Streaming replay of a trip's recorded GPS history."""
+
+import asyncio
+import heapq
+from datetime import datetime
+from typing import AsyncIterator, Iterator, Optional
+
+import numpy as np
+from sqlalchemy import and_, or_, select
+from sqlalchemy.orm import Session
+from starlette.concurrency import iterate_in_threadpool
+
+from safe_route.models.location import DriverLocation
+from safe_route.schemas.trip import ReplayPoint
+from safe_route.services.fleet_stream import sse_event
+from safe_route.services.location_archive import LocationArchive, from_epoch_ms, to_epoch_ms
+
+
+def _optional(value) -> Optional[float]:
+    value = float(value)
+    return None if np.isnan(value) else value
+
+
+def iter_database_points(
+    db: Session, trip_id: int, page_size: int, after: Optional[datetime] = None
+) -> Iterator[ReplayPoint]:
+    """
+    Yield a trip's database fixes in time order, one keyset page at a time.
+
+    Each page is an index range scan on (trip_id, timestamp) resuming after
+    the last (timestamp, id) seen, so no page costs more than the first and
+    at most `page_size` rows are held at once.
+    """
+    cursor_ts, cursor_id = after, None
+    while True:
+        query = select(
+            DriverLocation.id, DriverLocation.lat, DriverLocation.lng, DriverLocation.timestamp,
+            DriverLocation.speed, DriverLocation.heading,
+        ).where(DriverLocation.trip_id == trip_id)
+        if cursor_id is not None:
+            query = query.where(or_(
+                DriverLocation.timestamp > cursor_ts,
+                and_(DriverLocation.timestamp == cursor_ts, DriverLocation.id > cursor_id),
+            ))
+        elif cursor_ts is not None:
+            query = query.where(DriverLocation.timestamp > cursor_ts)
+
+        rows = db.execute(
+            query.order_by(DriverLocation.timestamp, DriverLocation.id).limit(page_size)
+        ).all()
+        # Release the pooled connection between pages; timed playback may run for hours
+        db.close()
+        for row in rows:
+            yield ReplayPoint(lat=row.lat, lng=row.lng, timestamp=row.timestamp, speed=row.speed, heading=row.heading)
+        if len(rows) < page_size:
+            return
+        cursor_ts, cursor_id = rows[-1].timestamp, rows[-1].id
+
+
+def iter_archived_points(
+    archive: LocationArchive, trip_id: int, page_size: int, after: Optional[datetime] = None
+) -> Iterator[ReplayPoint]:
+    """Yield a trip's archived fixes in time order, reading `page_size` rows at a time."""
+    after_ms = to_epoch_ms(after) if after is not None else None
+    for day in archive.days():
+        archived = archive.open(day)
+        if not archived.has_trip(trip_id):
+            continue
+        rows = archived.trip_rows(trip_id)
+        epochs = archived.column("epoch_ms")
+        rows = rows[np.argsort(epochs[rows], kind="stable")]
+        if after_ms is not None:
+            rows = rows[epochs[rows] > after_ms]
+        for offset in range(0, len(rows), page_size):
+            page = archived.read(rows[offset:offset + page_size])
+            for i in range(len(page["epoch_ms"])):
+                yield ReplayPoint(
+                    lat=float(page["lat"][i]),
+                    lng=float(page["lng"][i]),
+                    timestamp=from_epoch_ms(page["epoch_ms"][i]),
+                    speed=_optional(page["speed"][i]),
+                    heading=_optional(page["heading"][i]),
+                )
+
+
+def iter_trip_points(
+    db: Session, archive: LocationArchive, trip_id: int, page_size: int, after: Optional[datetime] = None
+) -> Iterator[ReplayPoint]:
+    """Archived and database fixes of a trip merged lazily in time order."""
+    return heapq.merge(
+        iter_archived_points(archive, trip_id, page_size, after),
+        iter_database_points(db, trip_id, page_size, after),
+        key=lambda point: point.timestamp,
+    )
+
+
+def ndjson_lines(points: Iterator[ReplayPoint]) -> Iterator[str]:
+    for point in points:
+        yield point.model_dump_json() + "\n"
+
+
+async def playback_events(
+    points: Iterator[ReplayPoint], speed: float, max_gap: float
+) -> AsyncIterator[str]:
+    """
+    Emit points as SSE `point` events at `speed` times real time.
+
+    Pauses between fixes are capped at `max_gap` seconds of wall time so
+    long stops do not stall playback. Database pages are fetched in a
+    worker thread. Ends with an `end` event.
+    """
+    previous = None
+    async for point in iterate_in_threadpool(points):
+        if previous is not None:
+            gap = (point.timestamp - previous).total_seconds() / speed
+            if gap > 0:
+                await asyncio.sleep(min(gap, max_gap))
+        previous = point.timestamp
+        yield sse_event("point", point.model_dump_json())
+    yield sse_event("end", "{}")
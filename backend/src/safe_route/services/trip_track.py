@@ -0,0 +1,102 @@
+"""Recorded trip paths, simplified for display."""
+
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from safe_route.config import get_settings
+from safe_route.models.location import DriverLocation
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.schemas.trip import TrackPoint, TripTrackResponse
+from safe_route.services.location_archive import from_epoch_ms, location_archive, to_epoch_ms
+from safe_route.utils.track import douglas_peucker, encode_polyline, project_to_meters
+
+settings = get_settings()
+
+
+class TrackCache:
+    """LRU cache of simplified tracks; only completed trips are cached."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple[int, float, str], TripTrackResponse]" = OrderedDict()
+
+    def get(self, key: Tuple[int, float, str]):
+        track = self._entries.get(key)
+        if track is not None:
+            self._entries.move_to_end(key)
+        return track
+
+    def put(self, key: Tuple[int, float, str], track: TripTrackResponse) -> None:
+        self._entries[key] = track
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def invalidate(self, trip_id: int) -> None:
+        for key in [key for key in self._entries if key[0] == trip_id]:
+            del self._entries[key]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+
+track_cache = TrackCache(settings.TRIP_TRACK_CACHE_SIZE)
+
+
+def load_trip_points(db: Session, trip_id: int):
+    """Load a trip's fixes in time order as (lats, lngs, timestamps), archive included."""
+    rows = db.execute(
+        select(DriverLocation.lat, DriverLocation.lng, DriverLocation.timestamp)
+        .where(DriverLocation.trip_id == trip_id)
+        .order_by(DriverLocation.timestamp, DriverLocation.id)
+    ).all()
+    lats = np.fromiter((row[0] for row in rows), dtype=float, count=len(rows))
+    lngs = np.fromiter((row[1] for row in rows), dtype=float, count=len(rows))
+    timestamps = [row[2] for row in rows]
+
+    archived = location_archive.load_trip(trip_id)
+    if len(archived["epoch_ms"]):
+        epochs = np.concatenate([
+            archived["epoch_ms"],
+            np.fromiter((to_epoch_ms(ts) for ts in timestamps), dtype=np.int64, count=len(timestamps)),
+        ])
+        order = np.argsort(epochs, kind="stable")
+        lats = np.concatenate([archived["lat"], lats])[order]
+        lngs = np.concatenate([archived["lng"], lngs])[order]
+        timestamps = [from_epoch_ms(ms) for ms in epochs[order]]
+    return lats, lngs, timestamps
+
+
+def get_trip_track(db: Session, trip: Trip, tolerance_m: float, fmt: str) -> TripTrackResponse:
+    """Build (or fetch from cache) a trip's simplified path."""
+    key = (trip.id, float(tolerance_m), fmt)
+    cacheable = trip.status == TripStatus.COMPLETED
+    if cacheable:
+        cached = track_cache.get(key)
+        if cached is not None:
+            return cached
+
+    lats, lngs, timestamps = load_trip_points(db, trip.id)
+    kept = douglas_peucker(project_to_meters(lats, lngs), tolerance_m)
+
+    track = TripTrackResponse(
+        trip_id=trip.id,
+        tolerance_m=tolerance_m,
+        original_points=len(lats),
+        simplified_points=len(kept),
+    )
+    if fmt == "polyline":
+        track.polyline = encode_polyline(np.column_stack((lats[kept], lngs[kept])))
+    else:
+        track.points = [
+            TrackPoint(lat=lats[i], lng=lngs[i], timestamp=timestamps[i])
+            for i in kept.tolist()
+        ]
+
+    if cacheable:
+        track_cache.put(key, track)
+    return track
@@ -3,22 +3,92 @@
 import math
 from typing import List, Tuple
 
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0
+
+
 def haversine_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """
-    Calculate the great circle distance between two points 
+    Calculate the great circle distance between two points
     on the earth (specified in decimal degrees).
     Returns distance in kilometers.
     """
-    # Convert decimal degrees to radians 
-    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lon2, lat1, lon2])
+    # Convert decimal degrees to radians
+    lon1, lat1, lon2, lat2 = map(math.radians, [lon1, lat1, lon2, lat2])
 
-    # Haversine formula 
-    dlon = lon2 - lon1 
-    dlat = lat2 - lat1 
+    # Haversine formula
+    dlon = lon2 - lon1
+    dlat = lat2 - lat1
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
-    c = 2 * math.asin(math.sqrt(a)) 
-    r = 6371 # Radius of earth in kilometers. Use 3956 for miles.
-    return c * r
+    c = 2 * math.asin(math.sqrt(min(a, 1.0)))
+    return c * EARTH_RADIUS_KM
+
+
+def _haversine(lat1, lng1, cos_lat1, lat2, lng2, cos_lat2) -> np.ndarray:
+    """Broadcasting haversine over coordinates already in radians, in km."""
+    a = np.sin((lat2 - lat1) / 2) ** 2 + cos_lat1 * cos_lat2 * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+def haversine_one_to_many(lat: float, lng: float, lats, lngs) -> np.ndarray:
+    """Distances in km from one point to each of many points (float64)."""
+    lat1, lng1 = math.radians(lat), math.radians(lng)
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lngs = np.radians(np.asarray(lngs, dtype=np.float64))
+    return _haversine(lat1, lng1, math.cos(lat1), lats, lngs, np.cos(lats))
+
+
+def haversine_pairs(lats1, lngs1, lats2, lngs2) -> np.ndarray:
+    """Distances in km between the i-th point of one set and the i-th of another."""
+    lats1, lngs1, lats2, lngs2 = (
+        np.radians(np.asarray(values, dtype=np.float64)) for values in (lats1, lngs1, lats2, lngs2)
+    )
+    return _haversine(lats1, lngs1, np.cos(lats1), lats2, lngs2, np.cos(lats2))
+
+
+def haversine_matrix(
+    lats, lngs, to_lats=None, to_lngs=None, block_rows: int = 1024,
+) -> np.ndarray:
+    """
+    Pairwise distances in km between two point sets, in one call.
+
+    Returns an (n, m) float64 matrix from `lats`/`lngs` to `to_lats`/`to_lngs`,
+    or the symmetric (n, n) matrix of the first set when no targets are
+    given. Sines and cosines of the half angles are taken once per point,
+    so each pair only costs products plus one sqrt and arcsin:
+    sin((b - a) / 2) = sin(b/2)cos(a/2) - cos(b/2)sin(a/2). Rows are
+    computed `block_rows` at a time, in place, so temporaries stay bounded
+    however large the matrix is.
+    """
+    half1 = _half_angles(lats, lngs)
+    half2 = half1 if to_lats is None else _half_angles(to_lats, to_lngs)
+    sin_lat2, cos_lat2, sin_lng2, cos_lng2, cos2 = half2
+
+    out = np.empty((len(half1[0]), len(sin_lat2)), dtype=np.float64)
+    for start in range(0, len(out), block_rows):
+        sin_lat1, cos_lat1, sin_lng1, cos_lng1, cos1 = (column[start:start + block_rows] for column in half1)
+        a = np.multiply.outer(sin_lat1, cos_lat2)
+        a -= np.multiply.outer(cos_lat1, sin_lat2)
+        a *= a
+        b = np.multiply.outer(sin_lng1, cos_lng2)
+        b -= np.multiply.outer(cos_lng1, sin_lng2)
+        b *= b
+        b *= np.multiply.outer(cos1, cos2)
+        a += b
+        np.minimum(a, 1.0, out=a)
+        np.sqrt(a, out=a)
+        block = out[start:start + block_rows]
+        np.arcsin(a, out=block)
+        block *= 2 * EARTH_RADIUS_KM
+    return out
+
+
+def _half_angles(lats, lngs):
+    lats = np.radians(np.asarray(lats, dtype=np.float64))
+    lngs = np.radians(np.asarray(lngs, dtype=np.float64))
+    return np.sin(lats / 2), np.cos(lats / 2), np.sin(lngs / 2), np.cos(lngs / 2), np.cos(lats)
+
 
 def calculate_eta_minutes(distance_km: float, speed_kmh: float = 30.0) -> int:
     """Calculate ETA in minutes based on distance and average speed."""
@@ -26,6 +96,26 @@ def calculate_eta_minutes(distance_km: float, speed_kmh: float = 30.0) -> int:
     hours = distance_km / speed_kmh
     return int(hours * 60)
 
+
+def nearest_neighbor_order(distances: np.ndarray, start: int = 0) -> List[int]:
+    """
+    Greedy tour over a distance matrix, beginning at `start`.
+
+    Each step is one vectorized argmin over the row of the current point;
+    ties go to the lowest index. Returns every other index in visiting order.
+    """
+    remaining = np.ones(len(distances), dtype=bool)
+    remaining[start] = False
+    visits = []
+    current = start
+    for _ in range(len(distances) - 1):
+        row = np.where(remaining, distances[current], np.inf)
+        current = int(np.argmin(row))
+        remaining[current] = False
+        visits.append(current)
+    return visits
+
+
 def optimize_route_sequence(start_location: Tuple[float, float], stops: List[dict]) -> List[dict]:
     """
     Re-order stops using Nearest Neighbor algorithm.
@@ -33,20 +123,14 @@ def optimize_route_sequence(start_location: Tuple[float, float], stops: List[dic
     """
     if not stops:
         return []
-        
-    optimized = []
-    current_pos = start_location
-    pool = stops.copy()
-    
-    while pool:
-        # Find nearest stop to current position
-        nearest = min(pool, key=lambda s: haversine_distance(current_pos[0], current_pos[1], s['lat'], s['lng']))
-        optimized.append(nearest)
-        current_pos = (nearest['lat'], nearest['lng'])
-        pool.remove(nearest)
-    
+
+    # Index 0 is the start location, stop i is index i + 1
+    lats = [start_location[0]] + [s['lat'] for s in stops]
+    lngs = [start_location[1]] + [s['lng'] for s in stops]
+    optimized = [stops[index - 1] for index in nearest_neighbor_order(haversine_matrix(lats, lngs))]
+
     # Update sequence order
     for idx, stop in enumerate(optimized):
         stop['sequence_order'] = idx + 1
-        
+
     return optimized
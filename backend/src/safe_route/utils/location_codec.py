@@ -0,0 +1,156 @@
+"""Compact binary frame format for live location traffic.
+
+Frames are little-endian and fixed-layout. A full frame carries everything:
+
+    type u8 = 0x01 | driver_id u32 | epoch_ms i64 | lat i32 | lng i32
+    | heading i16 | speed i16 | trip_id u32                      (29 bytes)
+
+A delta frame is relative to the previous frame for the same driver on
+the same connection and reuses its trip:
+
+    type u8 = 0x02 | driver_id u32 | dt_ms u16 | dlat i16 | dlng i16
+    | heading i16 | speed i16                                    (15 bytes)
+
+A heartbeat is the single byte 0x00 and carries no fix.
+
+Coordinates are microdegrees, heading is tenths of a degree and speed is
+tenths of a metre per second. A missing heading or speed is sent as -32768 and a
+missing trip as 0. A message may hold any number of concatenated frames.
+"""
+
+import struct
+from datetime import datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+BINARY_CONTENT_TYPE = "application/x-saferoute-location"
+SUBPROTOCOL_BINARY = "saferoute.location.bin"
+SUBPROTOCOL_BINARY_DELTA = "saferoute.location.bin-delta"
+
+FRAME_HEARTBEAT = 0x00
+FRAME_FULL = 0x01
+FRAME_DELTA = 0x02
+HEARTBEAT_FRAME = bytes([FRAME_HEARTBEAT])
+
+_FULL = struct.Struct("<BIqiihhI")
+_DELTA = struct.Struct("<BIHhhhh")
+
+_MISSING = -32768
+_INT16_MAX = 32767
+_EPOCH = datetime(1970, 1, 1)
+_MS = timedelta(milliseconds=1)
+_MIN_EPOCH_MS = (datetime.min - _EPOCH) // _MS
+_MAX_EPOCH_MS = (datetime.max - _EPOCH) // _MS
+
+
+class DecodedFix(NamedTuple):
+    """One location fix read from a binary frame."""
+    driver_id: int
+    timestamp: datetime
+    lat: float
+    lng: float
+    heading: Optional[float]
+    speed: Optional[float]
+    trip_id: Optional[int]
+
+
+def _to_int16(value: Optional[float]) -> int:
+    if value is None:
+        return _MISSING
+    return max(-_INT16_MAX, min(_INT16_MAX, round(value * 10)))
+
+
+def _from_int16(value: int) -> Optional[float]:
+    return None if value == _MISSING else value / 10
+
+
+class FrameEncoder:
+    """
+    Encodes fixes for one connection.
+
+    With `delta` enabled, a fix whose change from the driver's previous fix
+    fits the delta ranges is sent as a 15-byte delta frame.
+    """
+
+    def __init__(self, delta: bool = False):
+        self.delta = delta
+        self._previous: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def encode(
+        self,
+        driver_id: int,
+        timestamp: datetime,
+        lat: float,
+        lng: float,
+        heading: Optional[float] = None,
+        speed: Optional[float] = None,
+        trip_id: Optional[int] = None,
+    ) -> bytes:
+        epoch_ms = (timestamp - _EPOCH) // _MS
+        lat_u = round(lat * 1_000_000)
+        lng_u = round(lng * 1_000_000)
+        trip = trip_id or 0
+
+        previous = self._previous.get(driver_id)
+        self._previous[driver_id] = (epoch_ms, lat_u, lng_u, trip)
+        if self.delta and previous is not None and previous[3] == trip:
+            dt = epoch_ms - previous[0]
+            dlat = lat_u - previous[1]
+            dlng = lng_u - previous[2]
+            if 0 <= dt <= 0xFFFF and abs(dlat) <= _INT16_MAX and abs(dlng) <= _INT16_MAX:
+                return _DELTA.pack(
+                    FRAME_DELTA, driver_id, dt, dlat, dlng, _to_int16(heading), _to_int16(speed)
+                )
+
+        return _FULL.pack(
+            FRAME_FULL, driver_id, epoch_ms, lat_u, lng_u,
+            _to_int16(heading), _to_int16(speed), trip,
+        )
+
+
+class FrameDecoder:
+    """Decodes frames for one connection, tracking delta state per driver."""
+
+    def __init__(self):
+        self._previous: Dict[int, Tuple[int, int, int, int]] = {}
+
+    def decode(self, data: bytes) -> List[DecodedFix]:
+        """Decode every frame in a message; raises ValueError if malformed."""
+        fixes = []
+        view = memoryview(data)
+        offset = 0
+        while offset < len(view):
+            frame_type = view[offset]
+            if frame_type == FRAME_HEARTBEAT:
+                offset += 1
+                continue
+            if frame_type == FRAME_FULL:
+                if offset + _FULL.size > len(view):
+                    raise ValueError("Truncated location frame")
+                _, driver_id, epoch_ms, lat_u, lng_u, heading, speed, trip = _FULL.unpack_from(view, offset)
+                offset += _FULL.size
+            elif frame_type == FRAME_DELTA:
+                if offset + _DELTA.size > len(view):
+                    raise ValueError("Truncated location frame")
+                _, driver_id, dt, dlat, dlng, heading, speed = _DELTA.unpack_from(view, offset)
+                offset += _DELTA.size
+                previous = self._previous.get(driver_id)
+                if previous is None:
+                    raise ValueError(f"Delta frame for driver {driver_id} without a full frame")
+                epoch_ms, lat_u, lng_u = previous[0] + dt, previous[1] + dlat, previous[2] + dlng
+                trip = previous[3]
+            else:
+                raise ValueError(f"Unknown location frame type {frame_type}")
+
+            if not _MIN_EPOCH_MS <= epoch_ms <= _MAX_EPOCH_MS:
+                raise ValueError(f"Location frame timestamp {epoch_ms} ms out of range")
+            self._previous[driver_id] = (epoch_ms, lat_u, lng_u, trip)
+            fixes.append(DecodedFix(
+                driver_id=driver_id,
+                timestamp=_EPOCH + epoch_ms * _MS,
+                lat=lat_u / 1_000_000,
+                lng=lng_u / 1_000_000,
+                heading=_from_int16(heading),
+                speed=_from_int16(speed),
+                trip_id=trip or None,
+            ))
+        return fixes
@@ -0,0 +1,98 @@
+"""Local search over stop sequences: 2-opt and Or-opt on a distance matrix."""
+
+import time
+from typing import List, Sequence, Tuple
+
+import numpy as np
+
+IMPROVEMENT_EPSILON = 1e-9  # Ignore "improvements" that are float noise
+OR_OPT_SEGMENTS = (1, 2, 3)
+
+
+def path_length(distances: np.ndarray, path: Sequence[int]) -> float:
+    path = np.asarray(path)
+    return float(distances[path[:-1], path[1:]].sum())
+
+
+def two_opt_pass(distances: np.ndarray, path: np.ndarray, deadline: float) -> int:
+    """
+    One sweep of 2-opt over the interior of `path`, in place.
+
+    For each position i, every reversal of path[i..j] is scored in one
+    vectorized expression and the best improving one is applied. The first
+    and last entries never move. Returns the number of moves applied.
+    """
+    moves = 0
+    last = len(path) - 1
+    for i in range(1, last - 1):
+        if time.perf_counter() > deadline:
+            break
+        a, b = path[i - 1], path[i]
+        c, d = path[i + 1:last], path[i + 2:last + 1]  # j = i+1 .. last-1
+        delta = distances[a, c] + distances[b, d] - distances[a, b] - distances[c, d]
+        best = int(np.argmin(delta))
+        if delta[best] < -IMPROVEMENT_EPSILON:
+            j = i + 1 + best
+            path[i:j + 1] = path[i:j + 1][::-1]
+            moves += 1
+    return moves
+
+
+def or_opt_pass(distances: np.ndarray, path: np.ndarray, deadline: float) -> Tuple[np.ndarray, int]:
+    """
+    One sweep of Or-opt: move runs of 1-3 stops, possibly reversed, elsewhere.
+
+    For each run, the cost of reinserting it into every other edge is
+    scored in one vectorized expression and the best improving move is
+    applied. The first and last entries never move. Returns the new path
+    and the number of moves applied.
+    """
+    moves = 0
+    for length in OR_OPT_SEGMENTS:
+        i = 1
+        while i + length < len(path):
+            if time.perf_counter() > deadline:
+                return path, moves
+            p, q = path[i - 1], path[i + length]
+            first, last = path[i], path[i + length - 1]
+            removal_gain = distances[p, first] + distances[last, q] - distances[p, q]
+
+            rest = np.concatenate([path[:i], path[i + length:]])
+            x, y = rest[:-1], rest[1:]
+            forward = distances[x, first] + distances[last, y]
+            backward = distances[x, last] + distances[first, y]
+            insert_cost = np.minimum(forward, backward) - distances[x, y]
+            insert_cost[i - 1] = np.inf  # Putting the run back where it was
+            k = int(np.argmin(insert_cost))
+            if insert_cost[k] - removal_gain < -IMPROVEMENT_EPSILON:
+                run = path[i:i + length]
+                if backward[k] < forward[k]:
+                    run = run[::-1]
+                path = np.concatenate([rest[:k + 1], run, rest[k + 1:]])
+                moves += 1
+            else:
+                i += 1
+    return path, moves
+
+
+def improve_path(distances: np.ndarray, path: Sequence[int], time_budget: float) -> Tuple[List[int], int]:
+    """
+    Shorten a path with 2-opt and Or-opt until neither helps or time runs out.
+
+    The first and last entries of `path` stay fixed; an open end is modelled
+    by a dummy node at zero distance from every other. `distances` must be
+    symmetric. Returns the improved path and the number of moves applied.
+    """
+    deadline = time.perf_counter() + time_budget
+    path = np.asarray(path, dtype=np.intp).copy()
+    moves = 0
+    if len(path) < 4:
+        return path.tolist(), moves
+    while time.perf_counter() < deadline:
+        applied = two_opt_pass(distances, path, deadline)
+        path, or_moves = or_opt_pass(distances, path, deadline)
+        applied += or_moves
+        moves += applied
+        if not applied:
+            break
+    return path.tolist(), moves
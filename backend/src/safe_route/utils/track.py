@@ -0,0 +1,79 @@
+"""Trajectory utilities: projection, simplification and polyline encoding."""
+
+from typing import Iterable, Tuple
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000.0
+
+
+def project_to_meters(lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """
+    Project coordinates onto a local equirectangular plane, in meters.
+
+    Accurate to well under a meter over the extent of a single trip, which
+    is all the simplification tolerance needs.
+    """
+    lat0 = np.radians(np.mean(lats)) if len(lats) else 0.0
+    x = np.radians(lngs) * np.cos(lat0) * EARTH_RADIUS_M
+    y = np.radians(lats) * EARTH_RADIUS_M
+    return np.column_stack((x, y))
+
+
+def _segment_distances(points: np.ndarray, start: np.ndarray, end: np.ndarray) -> np.ndarray:
+    """Distance from each point to the segment start-end."""
+    seg = end - start
+    seg_len_sq = float(seg @ seg)
+    rel = points - start
+    if seg_len_sq == 0.0:
+        return np.hypot(rel[:, 0], rel[:, 1])
+    t = np.clip((rel @ seg) / seg_len_sq, 0.0, 1.0)
+    offset = rel - np.outer(t, seg)
+    return np.hypot(offset[:, 0], offset[:, 1])
+
+
+def douglas_peucker(xy: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Simplify a projected path with the Douglas-Peucker algorithm.
+
+    Returns the indices of the points to keep, in order. Each split scans its
+    span with one vectorized distance computation, and an explicit stack
+    replaces recursion so very long tracks cannot hit the recursion limit.
+    """
+    n = len(xy)
+    if n < 3 or tolerance <= 0:
+        return np.arange(n)
+
+    keep = np.zeros(n, dtype=bool)
+    keep[0] = keep[-1] = True
+    stack = [(0, n - 1)]
+    while stack:
+        first, last = stack.pop()
+        if last - first < 2:
+            continue
+        distances = _segment_distances(xy[first + 1:last], xy[first], xy[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            stack.append((first, split))
+            stack.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def encode_polyline(coords: Iterable[Tuple[float, float]], precision: int = 5) -> str:
+    """Encode (lat, lng) pairs using Google's encoded polyline format."""
+    coords = np.asarray(list(coords), dtype=float).reshape(-1, 2)
+    if not len(coords):
+        return ""
+    scaled = np.round(coords * 10 ** precision).astype(np.int64)
+    deltas = np.diff(scaled, axis=0, prepend=[[0, 0]]).ravel()
+    values = np.where(deltas < 0, ~(deltas << 1), deltas << 1)
+
+    chars = []
+    for value in values.tolist():
+        while value >= 0x20:
+            chars.append(chr((0x20 | (value & 0x1F)) + 63))
+            value >>= 5
+        chars.append(chr(value + 63))
+    return "".join(chars)
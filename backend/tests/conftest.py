@@ -8,6 +8,13 @@ from sqlalchemy.pool import StaticPool
 
 from safe_route.database import Base, get_db
 from safe_route.main import app
+from safe_route.services.distance_cache import distance_cache
+from safe_route.services.geofence import geofence_engine
+from safe_route.services.location_sampler import location_sampler
+from safe_route.services.location_store import location_store
+from safe_route.services.speed_profile import speed_profile
+from safe_route.services.trip_eta import trip_eta
+from safe_route.services.trip_track import track_cache
 
 
 # Create test database in memory
@@ -43,6 +50,13 @@ def client(db):
             pass
     
     app.dependency_overrides[get_db] = override_get_db
+    location_store.clear()
+    track_cache.clear()
+    geofence_engine.clear()
+    location_sampler.clear()
+    trip_eta.clear()
+    speed_profile.clear()
+    distance_cache.clear()
     with TestClient(app) as test_client:
         yield test_client
     app.dependency_overrides.clear()
@@ -70,3 +84,28 @@ def admin_token(client, db):
         json={"username": "testadmin", "password": "testpass123"}
     )
     return response.json()["access_token"]
+
+
+@pytest.fixture
+def driver_token(client, admin_token):
+    """Create a driver user and return the auth token."""
+    from datetime import date, timedelta
+
+    client.post(
+        "/drivers/",
+        json={
+            "username": "testdriver",
+            "email": "testdriver@test.com",
+            "password": "testpass123",
+            "first_name": "Test",
+            "last_name": "Driver",
+            "license_number": "DRV123456",
+            "license_expiry": str(date.today() + timedelta(days=365)),
+        },
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    response = client.post(
+        "/auth/login",
+        json={"username": "testdriver", "password": "testpass123"}
+    )
+    return response.json()["access_token"]
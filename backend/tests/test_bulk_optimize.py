@@ -0,0 +1,84 @@
+"""Tests for optimizing every active route in one request."""
+
+import numpy as np
+from sqlalchemy import insert
+
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.models.trip import Trip, TripStatus
+
+
+def add_route(db, name, rng, first_id, count=12, route_type=RouteType.PICKUP):
+    route = Route(name=name, route_type=route_type)
+    db.add(route)
+    db.flush()
+    db.execute(insert(Employee), [
+        {"id": first_id + i, "user_id": first_id + i, "pickup_lat": lat, "pickup_lng": lng,
+         "drop_lat": lat, "drop_lng": lng}
+        for i, (lat, lng) in enumerate(zip(rng.uniform(12.85, 13.10, count), rng.uniform(77.45, 77.75, count)))
+    ])
+    db.execute(insert(RouteStop), [
+        {"route_id": route.id, "employee_id": first_id + i, "sequence_order": i + 1} for i in range(count)
+    ])
+    db.commit()
+    return route.id
+
+
+def stop_order(db, route_id):
+    db.expire_all()
+    return [stop.employee_id for stop in
+            db.query(RouteStop).filter(RouteStop.route_id == route_id).order_by(RouteStop.sequence_order)]
+
+
+def test_optimize_all_routes(client, db, admin_token):
+    """Test every unlocked active route is re-sequenced and reported."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    rng = np.random.default_rng(3)
+    route_ids = [
+        add_route(db, f"Route {i}", rng, 1000 + 100 * i, route_type=route_type)
+        for i, route_type in enumerate([RouteType.PICKUP, RouteType.DROP, RouteType.PICKUP])
+    ]
+    before = {route_id: stop_order(db, route_id) for route_id in route_ids}
+
+    response = client.post("/routes/optimize-all", params={"time_budget_ms": 50}, headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["skipped"] == []
+    assert [summary["route_id"] for summary in data["routes"]] == route_ids
+    for summary in data["routes"]:
+        assert summary["stop_count"] == 12
+        assert summary["length_after_km"] < summary["length_before_km"]
+        assert summary["improvement_pct"] > 0
+        after = stop_order(db, summary["route_id"])
+        assert sorted(after) == sorted(before[summary["route_id"]]) and after != before[summary["route_id"]]
+    assert data["total_length_after_km"] < data["total_length_before_km"]
+
+    only_drop = client.post("/routes/optimize-all", params={"route_type": "DROP"}, headers=headers).json()
+    assert [summary["route_id"] for summary in only_drop["routes"]] == [route_ids[1]]
+
+
+def test_optimize_all_skips_locked_and_incomplete_routes(client, db, admin_token):
+    """Test routes with an active trip or missing coordinates are left alone."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    rng = np.random.default_rng(5)
+    free_id = add_route(db, "Free", rng, 1000)
+    locked_id = add_route(db, "Locked", rng, 2000)
+    incomplete_id = add_route(db, "Incomplete", rng, 3000)
+    done_id = add_route(db, "Done trip", rng, 4000)
+    db.add(Trip(route_id=locked_id, driver_id=1, vehicle_id=1, status=TripStatus.STARTED))
+    db.add(Trip(route_id=done_id, driver_id=1, vehicle_id=1, status=TripStatus.COMPLETED))
+    db.get(Employee, 3005).pickup_lat = None
+    db.commit()
+    locked_before = stop_order(db, locked_id)
+    incomplete_before = stop_order(db, incomplete_id)
+
+    data = client.post("/routes/optimize-all", headers=headers).json()
+    assert sorted(summary["route_id"] for summary in data["routes"]) == [free_id, done_id]
+    reasons = {skipped["route_id"]: skipped["reason"] for skipped in data["skipped"]}
+    assert set(reasons) == {locked_id, incomplete_id}
+    assert reasons[locked_id].startswith("Locked by active trip")
+    assert reasons[incomplete_id] == "Stops without coordinates: 1"
+    assert stop_order(db, locked_id) == locked_before
+    assert stop_order(db, incomplete_id) == incomplete_before
+
+    assert client.post("/routes/optimize-all", params={"depot_lat": 12.9}, headers=headers).status_code == 400
@@ -0,0 +1,82 @@
+"""Tests for spatial clustering of employees."""
+
+import numpy as np
+
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.services.clustering import _centroids, bisect, cluster_stops, project
+
+
+def neighbourhoods(rng, counts, spread_deg=0.004):
+    """Employees around well-separated centres, `counts[i]` around the i-th."""
+    centres = [(12.90, 77.50), (13.05, 77.52), (12.95, 77.70), (13.08, 77.68)][:len(counts)]
+    lats = np.concatenate([rng.normal(lat, spread_deg, count) for (lat, _), count in zip(centres, counts)])
+    lngs = np.concatenate([rng.normal(lng, spread_deg, count) for (_, lng), count in zip(centres, counts)])
+    return lats, lngs
+
+
+def test_capacity_groups_are_capped_and_cover_everyone():
+    """Test capacity grouping uses the fewest groups, none over the cap."""
+    rng = np.random.default_rng(4)
+    lats, lngs = rng.uniform(12.85, 13.10, 1003), rng.uniform(77.45, 77.75, 1003)
+    groups = cluster_stops(lats, lngs, capacity=12)["groups"]
+    sizes = [len(group["stops"]) for group in groups]
+    assert len(groups) == 84 and max(sizes) <= 12 and min(sizes) >= 11
+    assert sorted(index for group in groups for index in group["stops"]) == list(range(1003))
+
+
+def test_kmeans_finds_neighbourhoods_and_tightens_bisection():
+    """Test k-means recovers separated clusters and lowers spread on uniform data."""
+    rng = np.random.default_rng(2)
+    counts = [300, 40, 150, 10]
+    lats, lngs = neighbourhoods(rng, counts)
+    result = cluster_stops(lats, lngs, clusters=4)
+    found = sorted(sorted(group["stops"]) for group in result["groups"])
+    starts = np.cumsum([0] + counts)
+    assert found == sorted(list(range(a, b)) for a, b in zip(starts[:-1], starts[1:]))
+    assert all(group["radius_km"] < 2 for group in result["groups"])
+
+    lats, lngs = rng.uniform(12.85, 13.10, 5000), rng.uniform(77.45, 77.75, 5000)
+    points, _ = project(lats, lngs)
+
+    def spread(labels):
+        centroids, _ = _centroids(points, labels, int(labels.max()) + 1)
+        return ((points - centroids[labels]) ** 2).sum()
+
+    labels = np.empty(5000, dtype=np.intp)
+    for number, group in enumerate(cluster_stops(lats, lngs, clusters=500)["groups"]):
+        labels[group["stops"]] = number
+    assert spread(labels) < spread(bisect(points, 500))
+
+
+def test_cluster_endpoint_creates_draft_routes(client, db, admin_token):
+    """Test the endpoint suggests groups and stores them as inactive draft routes."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    rng = np.random.default_rng(6)
+    lats, lngs = neighbourhoods(rng, [20, 20, 20])
+    employees = [Employee(user_id=500 + i, pickup_lat=float(lat), pickup_lng=float(lng))
+                 for i, (lat, lng) in enumerate(zip(lats, lngs))]
+    db.add_all(employees)
+    db.flush()
+    routed = Route(name="Existing", route_type=RouteType.PICKUP)
+    routed.stops = [RouteStop(employee_id=employees[0].id, sequence_order=1)]
+    db.add(routed)
+    db.commit()
+
+    assert client.post("/routes/cluster", json={}, headers=headers).status_code == 400
+    response = client.post("/routes/cluster", json={"clusters": 3}, headers=headers)
+    assert response.status_code == 200
+    clusters = response.json()["clusters"]
+    assert sorted(len(cluster["employee_ids"]) for cluster in clusters) == [19, 20, 20]
+    assert all(cluster["route_id"] is None for cluster in clusters)
+    assert db.query(Route).count() == 1
+
+    response = client.post("/routes/cluster", json={"capacity": 8, "create_routes": True}, headers=headers)
+    clusters = response.json()["clusters"]
+    assert len(clusters) == 8
+    for cluster in clusters:
+        route = db.get(Route, cluster["route_id"])
+        assert route.is_active is False and route.name.startswith("Cluster Pickup")
+        assert [stop.employee_id for stop in route.stops] == cluster["employee_ids"]
+        assert len(route.stops) <= 8
+    assert employees[0].id not in {i for cluster in clusters for i in cluster["employee_ids"]}
@@ -0,0 +1,97 @@
+"""Tests for the stop distance-matrix cache."""
+
+import numpy as np
+
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.services.distance_cache import DistanceMatrixCache, distance_cache
+from safe_route.utils.geo import haversine_matrix
+
+
+def stops(rng, count):
+    return [(100 + i, float(lat), float(lng)) for i, (lat, lng) in
+            enumerate(zip(rng.uniform(12.85, 13.10, count), rng.uniform(77.45, 77.75, count)))]
+
+
+def test_matrix_shared_across_stop_orders():
+    """Test any ordering of the same stops hits one entry and gets its own order back."""
+    rng = np.random.default_rng(7)
+    cache = DistanceMatrixCache(max_entries=4, max_bytes=2**20)
+    points = stops(rng, 30)
+    expected = haversine_matrix([p[1] for p in points], [p[2] for p in points])
+
+    assert np.allclose(cache.matrix(points), expected)
+    shuffled = rng.permutation(30)
+    reordered = cache.matrix([points[i] for i in shuffled])
+    assert np.allclose(reordered, expected[np.ix_(shuffled, shuffled)])
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # A moved stop is a different key, never a stale hit
+    moved = [points[0][:1] + (points[0][1] + 0.01, points[0][2])] + points[1:]
+    assert cache.matrix(moved)[0, 1] != expected[0, 1]
+    assert cache.misses == 2
+
+
+def test_lru_eviction_and_invalidation():
+    """Test least recently used matrices go first and edits drop their entries."""
+    rng = np.random.default_rng(1)
+    cache = DistanceMatrixCache(max_entries=2, max_bytes=2**20)
+    first, second, third = stops(rng, 5), stops(rng, 5), stops(rng, 5)
+    cache.matrix(first)
+    cache.matrix(second)
+    cache.matrix(first)
+    cache.matrix(third)  # Evicts the second
+
+    stats = cache.stats()
+    assert (stats["entries"], stats["evictions"], stats["hits"], stats["misses"]) == (2, 1, 1, 3)
+    # Employee 100 is in both remaining matrices
+    assert cache.invalidate_employee(100) == 2
+    assert cache.stats()["entries"] == 0
+    assert cache.invalidate_employee(100) == 0
+
+
+def test_eviction_by_total_size():
+    """Test the byte cap evicts old matrices and leaves oversized ones uncached."""
+    rng = np.random.default_rng(2)
+    cache = DistanceMatrixCache(max_entries=100, max_bytes=1000)
+    small, other, large = stops(rng, 5), stops(rng, 8), stops(rng, 12)  # 200, 512 and 1152 bytes
+    cache.matrix(small)
+    cache.matrix(other)
+    assert cache.stats()["bytes"] == 712
+    cache.matrix(small)
+    cache.matrix(stops(rng, 9))  # 648 bytes: the 8-stop matrix goes, the recently used 5-stop one stays
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["evictions"]) == (2, 848, 1)
+
+    assert np.allclose(cache.matrix(large), haversine_matrix([p[1] for p in large], [p[2] for p in large]))
+    cache.matrix(large)
+    stats = cache.stats()
+    assert (stats["entries"], stats["bytes"], stats["misses"]) == (2, 848, 5)
+
+
+def test_reoptimize_hits_cache_until_coordinates_change(client, db, admin_token):
+    """Test repeated optimization reuses the matrix and a coordinate edit invalidates it."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route = Route(name="Morning", route_type=RouteType.PICKUP)
+    db.add(route)
+    db.commit()
+    for order, lat in enumerate([12.93, 12.91, 12.94, 12.92], start=1):
+        employee_id = client.post("/employees/", json={
+            "username": f"rider{order}", "email": f"rider{order}@test.com", "password": "password123",
+            "first_name": "Ri", "last_name": "Der", "pickup_lat": lat, "pickup_lng": 77.5,
+        }, headers=headers).json()["id"]
+        db.add(RouteStop(route_id=route.id, employee_id=employee_id, sequence_order=order))
+    db.commit()
+
+    for _ in range(3):
+        assert client.post(f"/routes/{route.id}/optimize", headers=headers).status_code == 200
+    stats = client.get("/routes/distance-cache", headers=headers).json()
+    assert (stats["hits"], stats["misses"]) == (2, 1)
+
+    client.put(f"/employees/{employee_id}", json={"pickup_address": "Gate 2"}, headers=headers)
+    assert distance_cache.stats()["entries"] == 1
+    client.put(f"/employees/{employee_id}", json={"pickup_lat": 12.95}, headers=headers)
+    stats = distance_cache.stats()
+    assert (stats["entries"], stats["invalidations"]) == (0, 1)
+
+    assert client.post(f"/routes/{route.id}/optimize", headers=headers).status_code == 200
+    assert distance_cache.stats()["misses"] == 2
@@ -0,0 +1,93 @@
+"""Tests for the geo distance kernel."""
+
+import math
+
+import numpy as np
+
+from safe_route.utils.geo import (
+    EARTH_RADIUS_KM, haversine_distance, haversine_matrix, haversine_one_to_many, optimize_route_sequence,
+)
+
+
+def reference_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance by the Vincenty special case, independent of haversine."""
+    p1, p2 = math.radians(lat1), math.radians(lat2)
+    dl = math.radians(lng2 - lng1)
+    y = math.hypot(
+        math.cos(p2) * math.sin(dl),
+        math.cos(p1) * math.sin(p2) - math.sin(p1) * math.cos(p2) * math.cos(dl),
+    )
+    x = math.sin(p1) * math.sin(p2) + math.cos(p1) * math.cos(p2) * math.cos(dl)
+    return EARTH_RADIUS_KM * math.atan2(y, x)
+
+
+def random_points(rng, count):
+    """Points over the whole globe, poles and antimeridian included."""
+    lats = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    lngs = rng.uniform(-180, 180, count)
+    lats[:4] = [90, -90, 0, 0]
+    lngs[:4] = [0, 45, 180, -180]
+    return lats, lngs
+
+
+def test_scalar_haversine_uses_both_latitudes():
+    """Test the scalar distance no longer replaces lat1 with lon2."""
+    assert abs(haversine_distance(10.0, 0.0, 0.0, 0.0) - 1111.95) < 0.01
+    assert abs(haversine_distance(12.9716, 77.5946, 13.0827, 80.2707) - 290.2) < 0.5
+    assert haversine_distance(12.9716, 77.5946, 12.9716, 77.5946) == 0.0
+
+
+def test_one_to_many_matches_reference():
+    """Test vectorized distances agree with the reference for random pairs."""
+    rng = np.random.default_rng(18)
+    lats, lngs = random_points(rng, 500)
+    for lat, lng in zip(*random_points(rng, 20)):
+        distances = haversine_one_to_many(lat, lng, lats, lngs)
+        assert distances.dtype == np.float64
+        expected = [reference_km(lat, lng, a, b) for a, b in zip(lats, lngs)]
+        assert np.allclose(distances, expected, rtol=1e-9, atol=1e-6)
+        scalar = [haversine_distance(lat, lng, a, b) for a, b in zip(lats, lngs)]
+        assert np.allclose(distances, scalar, rtol=1e-12, atol=1e-9)
+
+
+def test_matrix_properties():
+    """Test the pairwise matrix is a symmetric metric consistent with one-to-many."""
+    rng = np.random.default_rng(19)
+    lats, lngs = random_points(rng, 300)
+    matrix = haversine_matrix(lats, lngs, block_rows=64)
+
+    assert matrix.shape == (300, 300)
+    assert np.array_equal(np.diag(matrix), np.zeros(300))
+    assert np.allclose(matrix, matrix.T, rtol=0, atol=1e-9)
+    assert np.all((matrix >= 0) & (matrix <= math.pi * EARTH_RADIUS_KM + 1e-9))
+    assert np.array_equal(matrix, haversine_matrix(lats, lngs, block_rows=1000))
+    for row in rng.integers(0, 300, 10):
+        assert np.allclose(matrix[row], haversine_one_to_many(lats[row], lngs[row], lats, lngs), atol=1e-9)
+
+    i, j, k = rng.integers(0, 300, (3, 2000))
+    assert np.all(matrix[i, k] <= matrix[i, j] + matrix[j, k] + 1e-6)
+
+    rectangular = haversine_matrix(lats[:7], lngs[:7], lats, lngs)
+    assert rectangular.shape == (7, 300)
+    assert np.allclose(rectangular, matrix[:7], atol=1e-9)
+
+
+def test_optimize_route_sequence_matches_greedy_reference():
+    """Test the vectorized ordering visits stops like the scalar nearest-neighbour loop."""
+    rng = np.random.default_rng(20)
+    stops = [
+        {"id": i, "lat": 12.9 + rng.uniform(0, 0.2), "lng": 77.5 + rng.uniform(0, 0.2)}
+        for i in range(60)
+    ]
+    start = (12.9, 77.5)
+
+    expected, current, pool = [], start, list(stops)
+    while pool:
+        nearest = min(pool, key=lambda s: reference_km(current[0], current[1], s["lat"], s["lng"]))
+        expected.append(nearest["id"])
+        current = (nearest["lat"], nearest["lng"])
+        pool.remove(nearest)
+
+    optimized = optimize_route_sequence(start, [dict(stop) for stop in stops])
+    assert [stop["id"] for stop in optimized] == expected
+    assert [stop["sequence_order"] for stop in optimized] == list(range(1, 61))
@@ -0,0 +1,129 @@
+"""Tests for stop geofencing."""
+
+from datetime import datetime
+
+from safe_route.models.audit import AuditLog
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.models.trip import Trip
+from safe_route.services.geofence import TripFences, _fence, settings
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def _setup_trip(client, db, admin_token, route_type=RouteType.PICKUP):
+    """Create a two-stop route and a scheduled trip for the test driver."""
+    driver_id = client.get(
+        "/drivers/", headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()[0]["id"]
+    route = Route(name="Morning", driver_id=driver_id, route_type=route_type)
+    db.add(route)
+    db.flush()
+    for order, (lat, drop_lat) in enumerate([(12.90, 12.80), (12.92, 12.82)], start=1):
+        employee = Employee(user_id=100 + order, pickup_lat=lat, pickup_lng=77.50, drop_lat=drop_lat, drop_lng=77.50)
+        db.add(employee)
+        db.flush()
+        db.add(RouteStop(route_id=route.id, employee_id=employee.id, sequence_order=order))
+    trip = Trip(route_id=route.id, driver_id=driver_id, vehicle_id=1)
+    db.add(trip)
+    db.commit()
+    return trip.id
+
+
+def test_trip_fences_arrival_departure_and_skip():
+    """Test arrivals, departures and a skipped stop are detected in order."""
+    stops = [_fence(i, i, i, 12.90 + i * 0.01, 77.50) for i in range(3)]
+    fences = TripFences(1, 1, stops[0], stops)
+
+    def kinds(lat):
+        return [(e.stop_id, e.event) for e in fences.observe(lat, 77.50, START, 100, 150)]
+
+    assert kinds(12.895) == []
+    assert kinds(12.9002) == [(0, "arrival")]
+    assert kinds(12.9010) == []  # Inside the departure hysteresis
+    assert kinds(12.9030) == [(0, "departure")]
+    # Stop 1 is never reached; arriving at stop 2 moves past it
+    assert kinds(12.9200) == [(2, "arrival")]
+    assert fences.next_index == 2
+
+
+def test_trip_start_requires_being_near_first_stop(client, db, admin_token, driver_token):
+    """Test a trip can only start within the start radius of its first pickup."""
+    trip_id = _setup_trip(client, db, admin_token)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+
+    response = client.patch(f"/trips/{trip_id}/status", json={"status": "STARTED"}, headers=headers)
+    assert response.status_code == 400
+
+    response = client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.95, "lng": 77.50}, headers=headers
+    )
+    assert response.status_code == 400
+    assert "Too far from start point" in response.json()["detail"]
+
+    response = client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.901, "lng": 77.50}, headers=headers
+    )
+    assert response.status_code == 200
+
+
+def test_location_fixes_emit_stop_events(client, db, admin_token, driver_token):
+    """Test fixes from a started trip produce arrival and departure events."""
+    trip_id = _setup_trip(client, db, admin_token)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.899, "lng": 77.50}, headers=headers
+    )
+
+    response = client.post(
+        "/location/batch",
+        json={"points": [
+            {"lat": 12.8995, "lng": 77.50, "timestamp": "2024-01-01T08:00:00"},
+            {"lat": 12.9050, "lng": 77.50, "timestamp": "2024-01-01T08:01:00"},
+            {"lat": 12.9200, "lng": 77.50, "timestamp": "2024-01-01T08:02:00"},
+        ]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+
+    events = client.get(f"/trips/{trip_id}/geofence-events", headers=headers).json()
+    assert [(e["sequence_order"], e["event"]) for e in events] == [
+        (1, "arrival"), (1, "departure"), (2, "arrival"),
+    ]
+    actions = [log.action for log in db.query(AuditLog).filter(AuditLog.entity_id == trip_id)]
+    assert actions.count("GEOFENCE_ARRIVAL") == 2
+
+
+def test_drop_route_fences_drop_points(client, db, admin_token, driver_token):
+    """Test DROP routes fence employees' drop points, not their pickups."""
+    trip_id = _setup_trip(client, db, admin_token, route_type=RouteType.DROP)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.90, "lng": 77.50}, headers=headers
+    )
+
+    client.post("/location/", json={"lat": 12.90, "lng": 77.50}, headers=headers)
+    assert client.get(f"/trips/{trip_id}/geofence-events", headers=headers).json() == []
+
+    client.post("/location/", json={"lat": 12.80, "lng": 77.50}, headers=headers)
+    events = client.get(f"/trips/{trip_id}/geofence-events", headers=headers).json()
+    assert [(e["sequence_order"], e["event"]) for e in events] == [(1, "arrival")]
+
+
+def test_drop_trip_starts_at_the_office(client, db, admin_token, driver_token, monkeypatch):
+    """Test a DROP trip must start near the office, not at the first pickup point."""
+    monkeypatch.setattr(settings, "ROUTE_DEPOT_LAT", 12.97)
+    monkeypatch.setattr(settings, "ROUTE_DEPOT_LNG", 77.59)
+    trip_id = _setup_trip(client, db, admin_token, route_type=RouteType.DROP)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+
+    response = client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.90, "lng": 77.50}, headers=headers
+    )
+    assert response.status_code == 400
+    assert "Too far from start point" in response.json()["detail"]
+
+    response = client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.971, "lng": 77.59}, headers=headers
+    )
+    assert response.status_code == 200
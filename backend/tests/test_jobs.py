@@ -0,0 +1,131 @@
+"""Tests for background route optimization jobs."""
+
+import time
+
+import numpy as np
+from sqlalchemy import insert
+
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.services.distance_cache import distance_cache
+
+
+def large_route(db, count=2000):
+    """A pickup route with `count` scattered stops; returns (route_id, stored order)."""
+    rng = np.random.default_rng(9)
+    route = Route(name="Campus", route_type=RouteType.PICKUP)
+    db.add(route)
+    db.flush()
+    db.execute(insert(Employee), [
+        {"id": 1000 + i, "user_id": 1000 + i, "pickup_lat": lat, "pickup_lng": lng}
+        for i, (lat, lng) in enumerate(zip(rng.uniform(12.85, 13.10, count), rng.uniform(77.45, 77.75, count)))
+    ])
+    db.execute(insert(RouteStop), [
+        {"route_id": route.id, "employee_id": 1000 + i, "sequence_order": i + 1} for i in range(count)
+    ])
+    db.commit()
+    return route.id
+
+
+def stop_order(db, route_id):
+    db.expire_all()
+    return [stop.employee_id for stop in
+            db.query(RouteStop).filter(RouteStop.route_id == route_id).order_by(RouteStop.sequence_order)]
+
+
+def wait_for(client, headers, job_id, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}", headers=headers).json()
+        if job["status"] not in ("pending", "running"):
+            return job
+        time.sleep(0.05)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_large_route_optimizes_in_background_without_blocking(client, db, admin_token):
+    """Test other requests keep their latency while a large optimization runs."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route_id = large_route(db)
+    before = stop_order(db, route_id)
+
+    response = client.post(f"/routes/{route_id}/optimize", params={"time_budget_ms": 3000}, headers=headers)
+    assert response.status_code == 202
+    job = response.json()
+    assert job["kind"] == "route_optimize" and job["subject_id"] == route_id
+
+    latencies = []
+    while client.get(f"/jobs/{job['id']}", headers=headers).json()["status"] in ("pending", "running"):
+        start = time.perf_counter()
+        assert client.get("/health").status_code == 200
+        latencies.append(time.perf_counter() - start)
+        time.sleep(0.02)
+    # The job ran for seconds; no request waited on it
+    assert len(latencies) > 20
+    assert max(latencies) < 0.25
+
+    job = wait_for(client, headers, job["id"])
+    assert job["status"] == "succeeded", job["error"]
+    result = job["result"]
+    assert result["length_after_km"] < result["greedy_length_km"] < result["length_before_km"]
+    after = stop_order(db, route_id)
+    assert sorted(after) == sorted(before) and after != before
+    assert [stop["employee_id"] for stop in result["stops"]] == after
+
+
+def test_cancelled_and_timed_out_jobs_change_nothing(client, db, admin_token):
+    """Test cancellation and the time limit both leave the stop order untouched."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route_id = large_route(db)
+    before = stop_order(db, route_id)
+
+    job = client.post(f"/routes/{route_id}/optimize", params={"time_budget_ms": 5000}, headers=headers).json()
+    duplicate = client.post(f"/routes/{route_id}/optimize", headers=headers)
+    assert duplicate.status_code == 409
+    cancelled = client.post(f"/jobs/{job['id']}/cancel", headers=headers).json()
+    assert cancelled["status"] == "cancelled"
+
+    job = client.post(
+        f"/routes/{route_id}/optimize", params={"time_budget_ms": 5000, "time_limit_seconds": 0.01}, headers=headers,
+    ).json()
+    job = wait_for(client, headers, job["id"])
+    assert job["status"] == "timed_out"
+    assert job["result"] is None
+
+    time.sleep(0.5)
+    assert stop_order(db, route_id) == before
+    assert client.get("/jobs/unknown", headers=headers).status_code == 404
+
+
+def test_small_route_takes_sync_path_unless_asked(client, db, admin_token):
+    """Test routes under the threshold answer inline, or as a job on request."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route_id = large_route(db, count=10)
+
+    response = client.post(f"/routes/{route_id}/optimize", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()["stops"]) == 10
+
+    response = client.post(f"/routes/{route_id}/optimize", params={"background": True}, headers=headers)
+    assert response.status_code == 202
+    job = wait_for(client, headers, response.json()["id"])
+    assert job["status"] == "succeeded"
+    assert len(job["result"]["stops"]) == 10
+
+
+def test_background_jobs_use_api_process_cache(client, db, admin_token):
+    """Test pooled optimizations read the shared matrix cache, and long budgets leave the event loop."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    route_id = large_route(db, count=10)
+    distance_cache.clear()
+
+    for _ in range(2):
+        response = client.post(f"/routes/{route_id}/optimize", params={"background": True}, headers=headers)
+        assert wait_for(client, headers, response.json()["id"])["status"] == "succeeded"
+    stats = client.get("/routes/distance-cache", headers=headers).json()
+    assert (stats["hits"], stats["misses"]) == (1, 1)
+
+    # A budget over the inline cap is not spent on the event loop
+    response = client.post(f"/routes/{route_id}/optimize", params={"time_budget_ms": 5000}, headers=headers)
+    assert response.status_code == 202
+    wait_for(client, headers, response.json()["id"])
@@ -0,0 +1,434 @@
+"""Tests for location tracking endpoints."""
+
+import asyncio
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine, inspect
+from sqlalchemy.pool import StaticPool
+from starlette.websockets import WebSocketDisconnect
+
+from safe_route.config import get_settings
+from safe_route.database import create_schema
+from safe_route.models.location import DriverLocation, DriverLatestLocation
+from safe_route.schemas.location import LocationResponse
+from safe_route.services.location_hub import LocationFrame, SlowSubscriber, WebSocketSubscriber
+
+
+def _frame(driver_id, lat):
+    return LocationFrame(LocationResponse(
+        id=None, driver_id=driver_id, trip_id=None, lat=lat, lng=77.5,
+        heading=None, speed=None, timestamp=datetime(2024, 1, 1),
+    ))
+
+
+class _FakeWebSocket:
+    """Records sent text; sends block until `open` is set."""
+
+    def __init__(self):
+        self.sent = []
+        self.open = asyncio.Event()
+        self.open.set()
+
+    async def send_text(self, text):
+        await self.open.wait()
+        self.sent.append(text)
+
+
+def test_update_location(client, driver_token):
+    """Test recording a single GPS fix."""
+    response = client.post(
+        "/location/",
+        json={"lat": 12.97, "lng": 77.59, "speed": 20.0},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["lat"] == 12.97
+    assert data["lng"] == 77.59
+
+
+def test_update_location_requires_driver(client, admin_token):
+    """Test non-drivers cannot report locations."""
+    response = client.post(
+        "/location/",
+        json={"lat": 12.97, "lng": 77.59},
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 400
+
+
+def test_update_location_batch(client, db, driver_token):
+    """Test a batch of fixes is stored and acknowledged compactly."""
+    points = [
+        {"lat": 12.97 + i * 0.001, "lng": 77.59, "timestamp": f"2024-01-01T08:00:0{i}"}
+        for i in range(5)
+    ]
+    response = client.post(
+        "/location/batch",
+        json={"points": points},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["accepted"] == 5
+    assert data["last_timestamp"] == "2024-01-01T08:00:04"
+    assert db.query(DriverLocation).count() == 5
+
+
+def test_update_location_batch_rejects_invalid_point(client, db, driver_token):
+    """Test one invalid point rejects the whole batch."""
+    response = client.post(
+        "/location/batch",
+        json={"points": [{"lat": 12.97, "lng": 77.59}, {"lat": 123.0, "lng": 77.59}]},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    assert response.status_code == 422
+    assert db.query(DriverLocation).count() == 0
+
+    response = client.post(
+        "/location/batch",
+        json={"points": [{"lat": 12.97, "lng": 77.59, "speed": -1.0}]},  # m/s cannot be negative
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    assert response.status_code == 422
+
+
+def test_update_location_batch_rejects_empty(client, driver_token):
+    """Test an empty batch is rejected."""
+    response = client.post(
+        "/location/batch",
+        json={"points": []},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    assert response.status_code == 422
+
+
+def test_update_location_with_timezone_offsets(client, db, driver_token):
+    """Test aware timestamps are stored as naive UTC and mix with naive ones."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    assert client.post(
+        "/location/", json={"lat": 12.97, "lng": 77.59, "timestamp": "2024-01-01T07:59:00"}, headers=headers,
+    ).status_code == 200
+    response = client.post(
+        "/location/", json={"lat": 12.98, "lng": 77.59, "timestamp": "2024-01-01T08:00:00Z"}, headers=headers,
+    )
+    assert response.status_code == 200
+    assert response.json()["timestamp"] == "2024-01-01T08:00:00"
+
+    response = client.post("/location/batch", json={"points": [
+        {"lat": 12.99, "lng": 77.59, "timestamp": "2024-01-01T13:31:00+05:30"},
+        {"lat": 13.00, "lng": 77.59},
+    ]}, headers=headers)
+    assert response.status_code == 200
+    stored = [row.timestamp for row in db.query(DriverLocation).order_by(DriverLocation.id)]
+    assert stored[2] == datetime(2024, 1, 1, 8, 1)
+    assert all(timestamp.tzinfo is None for timestamp in stored)
+
+
+def test_future_fix_cannot_freeze_latest_position(client, driver_token):
+    """Test fixes dated past the allowed clock skew are rejected, so later real fixes still count."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    response = client.post(
+        "/location/", json={"lat": 12.97, "lng": 77.59, "timestamp": "2099-01-01T00:00:00Z"}, headers=headers,
+    )
+    assert response.status_code == 422
+
+    response = client.post(
+        "/location/", json={"lat": 12.98, "lng": 77.60}, headers=headers,
+    )
+    driver_id = response.json()["driver_id"]
+    latest = client.get(f"/location/driver/{driver_id}", headers=headers).json()
+    assert (latest["lat"], latest["lng"]) == (12.98, 77.60)
+
+
+def test_latest_location_served_from_store(client, db, driver_token):
+    """Test reads reflect the newest write without re-reading history."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    client.post(
+        "/location/batch",
+        json={"points": [
+            {"lat": 12.90, "lng": 77.50, "timestamp": "2024-01-01T08:00:05"},
+            {"lat": 12.91, "lng": 77.51, "timestamp": "2024-01-01T08:00:01"},
+        ]},
+        headers=headers
+    )
+    # Removing history proves the reads below are answered from memory
+    db.query(DriverLocation).delete()
+    db.commit()
+
+    response = client.get("/location/all", headers=headers)
+    assert response.status_code == 200
+    assert [(loc["lat"], loc["lng"]) for loc in response.json()] == [(12.90, 77.50)]
+
+    driver_id = response.json()[0]["driver_id"]
+    response = client.get(f"/location/driver/{driver_id}", headers=headers)
+    assert response.json()["timestamp"] == "2024-01-01T08:00:05"
+
+
+def test_latest_location_cold_start(client, db, driver_token):
+    """Test a cold store falls back to location history."""
+    from safe_route.services.location_store import location_store
+
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    response = client.post("/location/", json={"lat": 12.97, "lng": 77.59}, headers=headers)
+    driver_id = response.json()["driver_id"]
+    location_store.clear()
+
+    response = client.get(f"/location/driver/{driver_id}", headers=headers)
+    assert response.json()["lat"] == 12.97
+
+    location_store.clear()
+    response = client.get("/location/all", headers=headers)
+    assert [loc["driver_id"] for loc in response.json()] == [driver_id]
+
+
+def test_latest_location_table_keeps_newest_fix(client, db, driver_token):
+    """Test the latest-location table is upserted and ignores older fixes."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    client.post(
+        "/location/batch",
+        json={"points": [
+            {"lat": 12.90, "lng": 77.50, "timestamp": "2024-01-01T08:00:05"},
+            {"lat": 12.91, "lng": 77.51, "timestamp": "2024-01-01T08:00:01"},
+        ]},
+        headers=headers
+    )
+    client.post(
+        "/location/",
+        json={"lat": 12.80, "lng": 77.40, "timestamp": "2024-01-01T07:59:00"},
+        headers=headers
+    )
+
+    rows = db.query(DriverLatestLocation).all()
+    assert [(row.lat, row.lng) for row in rows] == [(12.90, 77.50)]
+    newest = db.query(DriverLocation).filter(DriverLocation.lat == 12.90).one()
+    assert rows[0].location_id == newest.id
+
+
+def test_create_schema_adds_indexes_to_existing_table():
+    """Test indexes added to the model reach a database whose table predates them."""
+    engine = create_engine("sqlite:///:memory:", poolclass=StaticPool)
+    with engine.begin() as connection:
+        connection.exec_driver_sql(
+            "CREATE TABLE driver_locations (id INTEGER PRIMARY KEY, driver_id INTEGER NOT NULL, trip_id INTEGER, "
+            "lat FLOAT NOT NULL, lng FLOAT NOT NULL, heading FLOAT, speed FLOAT, timestamp DATETIME)"
+        )
+        connection.exec_driver_sql("CREATE INDEX ix_driver_locations_timestamp ON driver_locations (timestamp)")
+
+    create_schema(engine)
+    create_schema(engine)  # Idempotent
+    indexes = {index["name"] for index in inspect(engine).get_indexes("driver_locations")}
+    assert {
+        "ix_driver_locations_driver_ts", "ix_driver_locations_trip_ts", "ix_driver_locations_timestamp",
+    } <= indexes
+
+
+def test_rebuild_latest_locations(client, db, admin_token, driver_token):
+    """Test the latest-location table can be rebuilt from history."""
+    from safe_route.services.location_store import location_store
+
+    client.post(
+        "/location/batch",
+        json={"points": [
+            {"lat": 12.90, "lng": 77.50, "timestamp": "2024-01-01T08:00:05"},
+            {"lat": 12.91, "lng": 77.51, "timestamp": "2024-01-01T08:00:01"},
+        ]},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    db.query(DriverLatestLocation).delete()
+    db.commit()
+
+    response = client.post("/location/latest/rebuild", headers={"Authorization": f"Bearer {driver_token}"})
+    assert response.status_code == 403
+
+    response = client.post("/location/latest/rebuild", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.json()["drivers"] == 1
+    assert [row.lat for row in db.query(DriverLatestLocation).all()] == [12.90]
+
+    # A cold store backfills an empty table on its own
+    db.query(DriverLatestLocation).delete()
+    db.commit()
+    location_store.clear()
+    response = client.get("/location/all", headers={"Authorization": f"Bearer {admin_token}"})
+    assert [loc["lat"] for loc in response.json()] == [12.90]
+    assert db.query(DriverLatestLocation).count() == 1
+
+
+def test_websocket_location_updates_store(client, admin_token, driver_token):
+    """Test fixes sent over the WebSocket update the latest position."""
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    driver_id = client.get("/drivers/", headers=headers).json()[0]["id"]
+    with client.websocket_connect(f"/location/ws/{driver_id}?token={driver_token}") as websocket:
+        websocket.send_json({"lat": 12.5, "lng": 77.5})
+        websocket.send_json({"lat": 123.0, "lng": 77.5})
+        assert "error" in websocket.receive_json()
+
+    response = client.get(f"/location/driver/{driver_id}", headers=headers)
+    assert response.json()["lat"] == 12.5
+
+
+def test_websocket_subscriber_receives_published_fix(client, admin_token, driver_token):
+    """Test a fix published by the driver reaches a watching admin."""
+    admin_headers = {"Authorization": f"Bearer {admin_token}"}
+    driver_id = client.get("/drivers/", headers=admin_headers).json()[0]["id"]
+
+    with client.websocket_connect(f"/location/ws/{driver_id}?token={admin_token}") as watcher:
+        client.post(
+            "/location/",
+            json={"lat": 12.6, "lng": 77.6},
+            headers={"Authorization": f"Bearer {driver_token}"}
+        )
+        frame = watcher.receive_json()
+        assert frame["driver_id"] == driver_id
+        assert frame["lat"] == 12.6
+
+
+def test_websocket_subscriber_gets_current_position_on_connect(client, admin_token, driver_token):
+    """Test a new watcher immediately receives the latest known position."""
+    response = client.post(
+        "/location/",
+        json={"lat": 12.7, "lng": 77.7},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    driver_id = response.json()["driver_id"]
+
+    with client.websocket_connect(f"/location/ws/{driver_id}?token={admin_token}") as watcher:
+        assert watcher.receive_json()["lat"] == 12.7
+
+
+def test_websocket_trip_channel(client, admin_token, driver_token):
+    """Test fixes tagged with a trip reach that trip's subscribers."""
+    with client.websocket_connect(f"/location/ws/trip/42?token={admin_token}") as watcher:
+        client.post(
+            "/location/batch",
+            json={"points": [{"lat": 12.8, "lng": 77.8, "trip_id": 42}]},
+            headers={"Authorization": f"Bearer {driver_token}"}
+        )
+        frame = watcher.receive_json()
+        assert frame["trip_id"] == 42
+        assert frame["lat"] == 12.8
+
+
+def test_websocket_requires_token(client):
+    """Test unauthenticated WebSocket connections are rejected."""
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect("/location/ws/1") as websocket:
+            websocket.receive_json()
+
+
+def test_websocket_rejects_unrelated_employee(client, admin_token, driver_token):
+    """Test employees cannot watch a driver they are not riding with."""
+    client.post(
+        "/employees/",
+        json={
+            "username": "rider", "email": "rider@test.com", "password": "password123",
+            "first_name": "Ri", "last_name": "Der",
+        },
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    token = client.post(
+        "/auth/login", json={"username": "rider", "password": "password123"}
+    ).json()["access_token"]
+    driver_id = client.get(
+        "/drivers/", headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()[0]["id"]
+
+    with pytest.raises(WebSocketDisconnect):
+        with client.websocket_connect(f"/location/ws/{driver_id}?token={token}") as websocket:
+            websocket.receive_json()
+
+
+def test_fleet_stream_requires_admin(client, driver_token):
+    """Test the SSE fleet stream is restricted to admins."""
+    assert client.get("/location/stream").status_code == 401
+    assert client.get(f"/location/stream?token={driver_token}").status_code == 403
+
+
+def test_fleet_stream_coalesces_per_driver():
+    """Test bursts from one driver collapse into the newest frame."""
+    from safe_route.services.fleet_stream import FleetStreamSubscriber
+
+    frame = _frame
+
+    async def scenario():
+        subscriber = FleetStreamSubscriber(min_interval=0.05)
+        await subscriber.deliver(frame(1, 1.1))
+        await subscriber.deliver(frame(1, 1.2))
+        await subscriber.deliver(frame(2, 2.1))
+        first = await subscriber.next_batch(timeout=1)
+
+        # Driver 1 is rate limited, so its next frame waits for the interval
+        await subscriber.deliver(frame(1, 1.3))
+        await subscriber.deliver(frame(1, 1.4))
+        early = await subscriber.next_batch(timeout=0.01)
+        late = await subscriber.next_batch(timeout=1)
+        return first, early, late
+
+    first, early, late = asyncio.run(scenario())
+    assert sorted(json.loads(f)["lat"] for f in first) == [1.2, 2.1]
+    assert early == []
+    assert [json.loads(f)["lat"] for f in late] == [1.4]
+
+
+def test_websocket_outbox_coalesces_and_drops():
+    """Test the outbox keeps only the newest frame per driver, up to its bound."""
+    async def scenario():
+        websocket = _FakeWebSocket()
+        subscriber = WebSocketSubscriber(websocket, max_drivers=2, lag_deadline=5, heartbeat_interval=5)
+        for driver_id, lat in [(1, 1.1), (1, 1.2), (2, 2.1), (3, 3.1)]:
+            await subscriber.deliver(_frame(driver_id, lat))
+        sender = asyncio.create_task(subscriber.run())
+        await asyncio.sleep(0.05)
+        sender.cancel()
+        return subscriber, [json.loads(text)["lat"] for text in websocket.sent]
+
+    subscriber, sent = asyncio.run(scenario())
+    # Driver 1's coalesced frame was the oldest entry when driver 3 arrived
+    assert sent == [2.1, 3.1]
+    stats = subscriber.stats()
+    assert (stats["coalesced"], stats["dropped"], stats["sent"], stats["pending"]) == (1, 1, 2, 0)
+
+
+def test_websocket_outbox_disconnects_lagging_client():
+    """Test a client stuck past the lag deadline is given up on."""
+    async def scenario():
+        websocket = _FakeWebSocket()
+        websocket.open.clear()
+        subscriber = WebSocketSubscriber(websocket, lag_deadline=0.05, heartbeat_interval=5)
+        sender = asyncio.create_task(subscriber.run())
+        await subscriber.deliver(_frame(1, 1.1))
+        await asyncio.sleep(0)
+        await subscriber.deliver(_frame(2, 2.1))
+        await asyncio.sleep(0.1)
+        with pytest.raises(SlowSubscriber):
+            await subscriber.deliver(_frame(3, 3.1))
+        with pytest.raises(SlowSubscriber):
+            await sender
+        return subscriber
+
+    subscriber = asyncio.run(scenario())
+    assert subscriber.stats()["pending"] == 0
+
+
+def test_websocket_subscriber_heartbeats_and_stats(client, admin_token, driver_token, monkeypatch):
+    """Test quiet subscribers get heartbeats and show up in connection stats."""
+    monkeypatch.setattr(get_settings(), "LOCATION_WS_HEARTBEAT_SECONDS", 0.05)
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    driver_id = client.get("/drivers/", headers=headers).json()[0]["id"]
+
+    with client.websocket_connect(f"/location/ws/{driver_id}?token={admin_token}") as watcher:
+        assert watcher.receive_json() == {"type": "heartbeat"}
+        watcher.send_json({"type": "heartbeat"})
+
+        response = client.get("/location/connections", headers=headers)
+        assert response.status_code == 200
+        [stats] = response.json()
+        assert stats["channel"] == f"driver:{driver_id}"
+        assert stats["format"] == "json"
+        assert stats["heartbeats"] >= 1
+
+    response = client.get("/location/connections", headers={"Authorization": f"Bearer {driver_token}"})
+    assert response.status_code == 403
@@ -0,0 +1,118 @@
+"""Tests for the columnar location archive."""
+
+import os
+from datetime import date, datetime, timedelta
+
+import numpy as np
+
+from safe_route.models.location import DriverLocation
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.services.location_archive import LocationArchive, from_epoch_ms
+from safe_route.services.location_retention import LocationRetentionJob
+
+DAY = date(2024, 1, 1)
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def add_fixes(db, driver_id, count, start=START, step_seconds=1, trip_id=None):
+    for i in range(count):
+        db.add(DriverLocation(
+            driver_id=driver_id, trip_id=trip_id, lat=12.9 + i * 1e-4, lng=77.5,
+            speed=30.0 if i % 2 else None, heading=None,
+            timestamp=start + timedelta(seconds=i * step_seconds),
+        ))
+    db.commit()
+
+
+def test_export_day_round_trip(db, tmp_path):
+    """Test a day moves to memory-mapped columns sorted by driver and time."""
+    add_fixes(db, driver_id=2, count=3, trip_id=9)
+    add_fixes(db, driver_id=1, count=4)
+    add_fixes(db, driver_id=1, count=2, start=START + timedelta(days=1))
+    archive = LocationArchive(str(tmp_path))
+
+    assert archive.export_day(db, DAY) == 7
+    assert db.query(DriverLocation).count() == 2
+    assert archive.days() == [DAY]
+
+    day = archive.open(DAY)
+    assert len(day) == 7
+    assert isinstance(day.column("lat"), np.memmap)
+    assert day.column("driver_id").tolist() == [1, 1, 1, 1, 2, 2, 2]
+    rows = day.driver_slice(2)
+    assert (rows.start, rows.stop) == (4, 7)
+    assert day.driver_slice(3) == slice(0, 0)
+    assert from_epoch_ms(day.column("epoch_ms")[rows.start]) == START
+    assert np.isnan(day.column("speed")[0]) and day.column("speed")[1] == 30.0
+    assert day.trip_rows(9).tolist() == [4, 5, 6]
+
+
+def test_export_merges_late_fixes(db, tmp_path):
+    """Test fixes arriving after a day was archived are merged into it."""
+    archive = LocationArchive(str(tmp_path))
+    add_fixes(db, driver_id=1, count=3)
+    archive.export_day(db, DAY)
+    before = archive.open(DAY)
+    add_fixes(db, driver_id=1, count=2, start=START - timedelta(hours=1))
+
+    rows, days = archive.export_before(db, DAY + timedelta(days=1))
+    assert (rows, days) == (2, 1)
+    epochs = archive.open(DAY).column("epoch_ms")
+    assert len(epochs) == 5
+    assert np.all(np.diff(epochs) > 0)
+    # The rewrite replaced the day's symlink in one step; the old version is gone
+    assert (tmp_path / DAY.isoformat()).is_symlink()
+    assert {path.name for path in tmp_path.iterdir()} == {
+        DAY.isoformat(), os.readlink(tmp_path / DAY.isoformat()),
+    }
+    # A handle opened before the rewrite still reads the old version's columns
+    assert not before.path.exists()
+    assert len(before.column("epoch_ms")) == 3
+    assert before.read()["driver_id"].tolist() == [1, 1, 1]
+
+
+def test_retention_archives_and_compacts_archived_days(db, tmp_path):
+    """Test retention archives closed days and applies its tiers to them."""
+    now = datetime(2024, 6, 1, 12, 0, 0)
+    add_fixes(db, driver_id=1, count=120, start=now - timedelta(days=20), step_seconds=5)
+    add_fixes(db, driver_id=1, count=10, start=now - timedelta(days=200))
+    add_fixes(db, driver_id=1, count=10, start=now - timedelta(hours=1))
+    archive = LocationArchive(str(tmp_path))
+    job = LocationRetentionJob([[7, 0], [90, 30]], chunk_rows=50, archive=archive, archive_after_days=7)
+
+    report = job.run(db, now=now)
+    assert report["archived"] == 130
+    assert report["dropped"] == 10
+    assert report["downsampled"] == 100  # 120 fixes 5 s apart kept at one per 30 s
+    assert db.query(DriverLocation).count() == 10
+    [day] = archive.days()
+    assert archive.open(day).bucket_seconds == 30
+    assert len(archive.open(day)) == 20
+
+    # A second run finds nothing more to do
+    report = job.run(db, now=now)
+    assert (report["archived"], report["dropped"], report["downsampled"]) == (0, 0, 0)
+
+
+def test_trip_track_reads_archived_days(client, db, admin_token, tmp_path, monkeypatch):
+    """Test the track endpoint joins archived and live fixes of a trip."""
+    from safe_route.services import trip_track
+
+    archive = LocationArchive(str(tmp_path))
+    monkeypatch.setattr(trip_track, "location_archive", archive)
+    trip = Trip(route_id=1, driver_id=1, vehicle_id=1, status=TripStatus.IN_PROGRESS)
+    db.add(trip)
+    db.commit()
+    # A trip running across midnight: the first half is archived
+    add_fixes(db, driver_id=1, count=4, start=datetime(2024, 1, 1, 23, 59, 58), trip_id=trip.id)
+    archive.export_day(db, DAY)
+    assert db.query(DriverLocation).count() == 2
+
+    response = client.get(
+        f"/trips/{trip.id}/track?tolerance_m=0", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    data = response.json()
+    assert data["original_points"] == 4
+    assert [p["timestamp"] for p in data["points"]] == [
+        "2024-01-01T23:59:58", "2024-01-01T23:59:59", "2024-01-02T00:00:00", "2024-01-02T00:00:01",
+    ]
@@ -0,0 +1,118 @@
+"""Tests for the write-behind location buffer."""
+
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy.orm import sessionmaker
+
+from safe_route.models.location import DriverLocation, DriverLatestLocation
+from safe_route.services.location_buffer import LocationBufferFull, LocationWriteBuffer
+
+
+def make_rows(count):
+    return [
+        {"driver_id": 1, "trip_id": None, "lat": 12.9, "lng": 77.5,
+         "heading": None, "speed": None, "timestamp": datetime(2024, 1, 1, 8, 0, i % 60)}
+        for i in range(count)
+    ]
+
+
+def make_buffer(db, **overrides):
+    options = dict(max_rows=100, flush_rows=10, flush_interval=60, put_timeout=0.05)
+    options.update(overrides)
+    return LocationWriteBuffer(sessionmaker(bind=db.get_bind()), **options)
+
+
+def test_buffer_flushes_on_size_threshold(db):
+    """Test reaching flush_rows triggers a bulk write."""
+    buffer = make_buffer(db)
+
+    async def scenario():
+        await buffer.start()
+        await buffer.enqueue(make_rows(4))
+        await asyncio.sleep(0.05)
+        pending = buffer.depth
+        await buffer.enqueue(make_rows(8))
+        for _ in range(50):
+            if buffer.depth == 0:
+                break
+            await asyncio.sleep(0.01)
+        await buffer.stop()
+        return pending
+
+    assert asyncio.run(scenario()) == 4
+    assert db.query(DriverLocation).count() == 12
+    stats = buffer.stats()
+    assert stats["flushed_rows"] == 12
+    assert stats["flush_count"] == 1
+    assert stats["depth"] == 0
+
+
+def test_buffer_flushes_on_shutdown(db):
+    """Test rows below every threshold are written when the buffer stops."""
+    buffer = make_buffer(db)
+
+    async def scenario():
+        await buffer.start()
+        await buffer.enqueue(make_rows(3))
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert db.query(DriverLocation).count() == 3
+
+
+def test_buffer_latest_only_rows_skip_history(db):
+    """Test latest-only rows advance the latest-location table but not history."""
+    buffer = make_buffer(db)
+    stored, newer = make_rows(2)[0], make_rows(2)[1]
+
+    async def scenario():
+        await buffer.start()
+        await buffer.enqueue([stored], latest_only=[newer])
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert db.query(DriverLocation).count() == 1
+    latest = db.query(DriverLatestLocation).one()
+    assert latest.timestamp == newer["timestamp"]
+    assert latest.location_id is None
+
+
+def test_buffer_rejects_when_full(db):
+    """Test writers get backpressure once the buffer cannot make room."""
+    buffer = make_buffer(db, max_rows=5)
+
+    async def scenario():
+        await buffer.start()
+        with pytest.raises(LocationBufferFull):
+            await buffer.enqueue(make_rows(6))
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert buffer.stats()["rejected_rows"] == 6
+
+
+def test_buffer_stats_endpoint(client, admin_token):
+    """Test buffer counters are exposed to admins."""
+    response = client.get(
+        "/location/buffer",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["enabled"] is False
+
+
+def test_buffer_waits_for_flush_to_make_room(db):
+    """Test a full buffer forces a flush and then accepts the writer."""
+    buffer = make_buffer(db, max_rows=10, flush_rows=100, put_timeout=1)
+
+    async def scenario():
+        await buffer.start()
+        await buffer.enqueue(make_rows(8))
+        await buffer.enqueue(make_rows(5))
+        await buffer.stop()
+
+    asyncio.run(scenario())
+    assert db.query(DriverLocation).count() == 13
+    assert buffer.stats()["rejected_rows"] == 0
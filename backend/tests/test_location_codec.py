@@ -0,0 +1,137 @@
+"""Tests for the binary location frame format."""
+
+import struct
+from datetime import datetime, timedelta
+
+import pytest
+from starlette.websockets import WebSocketDisconnect
+
+from safe_route.utils.location_codec import (
+    BINARY_CONTENT_TYPE, FRAME_FULL, HEARTBEAT_FRAME, SUBPROTOCOL_BINARY, SUBPROTOCOL_BINARY_DELTA,
+    FrameDecoder, FrameEncoder,
+)
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def test_full_frame_round_trip():
+    """Test a full frame preserves every field at its stated precision."""
+    data = FrameEncoder().encode(7, START, 12.971599, 77.594566, 123.4, 42.5, 3)
+    assert len(data) == 29
+    (fix,) = FrameDecoder().decode(data)
+    assert fix.driver_id == 7
+    assert fix.timestamp == START
+    assert (fix.lat, fix.lng) == (12.971599, 77.594566)
+    assert (fix.heading, fix.speed, fix.trip_id) == (123.4, 42.5, 3)
+
+
+def test_missing_optional_fields():
+    """Test absent heading, speed and trip survive the round trip."""
+    (fix,) = FrameDecoder().decode(FrameEncoder().encode(1, START, 1.0, 2.0))
+    assert (fix.heading, fix.speed, fix.trip_id) == (None, None, None)
+
+
+def test_delta_frames():
+    """Test consecutive nearby fixes shrink to delta frames."""
+    encoder = FrameEncoder(delta=True)
+    frames = [
+        encoder.encode(1, START + timedelta(seconds=i), 12.97 + i * 1e-4, 77.59, 90.0, 30.0, 5)
+        for i in range(10)
+    ]
+    assert [len(frame) for frame in frames] == [29] + [15] * 9
+    fixes = FrameDecoder().decode(b"".join(frames))
+    assert fixes[-1].lat == pytest.approx(12.9709)
+    assert fixes[-1].timestamp == START + timedelta(seconds=9)
+    assert fixes[-1].trip_id == 5
+
+
+def test_heartbeat_frames_are_skipped():
+    """Test heartbeat bytes between frames carry no fix."""
+    data = HEARTBEAT_FRAME + FrameEncoder().encode(1, START, 1.0, 2.0) + HEARTBEAT_FRAME
+    assert [fix.lat for fix in FrameDecoder().decode(data)] == [1.0]
+    assert FrameDecoder().decode(HEARTBEAT_FRAME) == []
+
+
+def test_delta_without_base_frame_is_rejected():
+    """Test a delta frame with no preceding full frame is an error."""
+    encoder = FrameEncoder(delta=True)
+    encoder.encode(1, START, 12.97, 77.59)
+    delta = encoder.encode(1, START + timedelta(seconds=1), 12.97, 77.59)
+    with pytest.raises(ValueError):
+        FrameDecoder().decode(delta)
+
+
+def test_out_of_range_timestamp_is_rejected(client, driver_token):
+    """Test a timestamp beyond what datetime holds is a malformed frame, not a crash."""
+    frame = struct.pack("<BIqiihhI", FRAME_FULL, 1, 2 ** 62, 12_970_000, 77_590_000, 0, 0, 0)
+    with pytest.raises(ValueError):
+        FrameDecoder().decode(frame)
+    response = client.post(
+        "/location/batch",
+        content=frame,
+        headers={"Authorization": f"Bearer {driver_token}", "Content-Type": BINARY_CONTENT_TYPE},
+    )
+    assert response.status_code == 400
+
+
+def test_binary_publisher_text_frame_closes_1003(client, admin_token, driver_token):
+    """Test a text frame on the binary subprotocol closes the connection as unsupported data."""
+    driver_id = client.get(
+        "/drivers/", headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()[0]["id"]
+    with client.websocket_connect(
+        f"/location/ws/{driver_id}?token={driver_token}", subprotocols=[SUBPROTOCOL_BINARY]
+    ) as publisher:
+        publisher.send_text('{"lat": 12.97, "lng": 77.59}')
+        with pytest.raises(WebSocketDisconnect) as closed:
+            publisher.receive_bytes()
+    assert closed.value.code == 1003
+
+
+def test_binary_batch_ingestion(client, driver_token):
+    """Test the batch endpoint accepts binary frames."""
+    encoder = FrameEncoder(delta=True)
+    body = b"".join(
+        encoder.encode(99, START + timedelta(seconds=i), 12.97, 77.59 + i * 1e-4) for i in range(3)
+    )
+    response = client.post(
+        "/location/batch",
+        content=body,
+        headers={"Authorization": f"Bearer {driver_token}", "Content-Type": BINARY_CONTENT_TYPE},
+    )
+    assert response.status_code == 200
+    assert response.json() == {"accepted": 3, "last_timestamp": "2024-01-01T08:00:02"}
+
+
+def test_binary_batch_rejects_out_of_range(client, driver_token):
+    """Test decoded fixes are validated like JSON ones."""
+    response = client.post(
+        "/location/batch",
+        content=FrameEncoder().encode(1, START, 95.0, 77.59),
+        headers={"Authorization": f"Bearer {driver_token}", "Content-Type": BINARY_CONTENT_TYPE},
+    )
+    assert response.status_code == 422
+
+
+def test_binary_websocket_subscriber(client, admin_token, driver_token):
+    """Test a subscriber negotiating the binary subprotocol gets binary frames."""
+    driver_id = client.get(
+        "/drivers/", headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()[0]["id"]
+    with client.websocket_connect(
+        f"/location/ws/{driver_id}?token={admin_token}", subprotocols=[SUBPROTOCOL_BINARY_DELTA]
+    ) as watcher:
+        assert watcher.accepted_subprotocol == SUBPROTOCOL_BINARY_DELTA
+        with client.websocket_connect(
+            f"/location/ws/{driver_id}?token={driver_token}", subprotocols=[SUBPROTOCOL_BINARY_DELTA]
+        ) as publisher:
+            encoder = FrameEncoder(delta=True)
+            for i in range(2):
+                publisher.send_bytes(encoder.encode(driver_id, START + timedelta(seconds=i), 12.97, 77.59))
+
+            decoder = FrameDecoder()
+            first = watcher.receive_bytes()
+            second = watcher.receive_bytes()
+            assert (len(first), len(second)) == (29, 15)
+            fixes = decoder.decode(first) + decoder.decode(second)
+            assert fixes[-1].timestamp == START + timedelta(seconds=1)
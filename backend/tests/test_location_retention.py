@@ -0,0 +1,73 @@
+"""Tests for location history retention and downsampling."""
+
+from datetime import datetime, timedelta
+
+from safe_route.models.location import DriverLocation
+from safe_route.services.location_retention import LocationRetentionJob
+
+NOW = datetime(2024, 6, 1, 12, 0, 0)
+
+
+def add_fixes(db, driver_id, start, count, step_seconds):
+    for i in range(count):
+        db.add(DriverLocation(
+            driver_id=driver_id, lat=12.9, lng=77.5,
+            timestamp=start + timedelta(seconds=i * step_seconds),
+        ))
+    db.commit()
+
+
+def test_retention_tiers(db):
+    """Test recent rows are kept, middle-aged rows thinned and old rows dropped."""
+    add_fixes(db, 1, NOW - timedelta(days=1), 12, 5)     # full resolution
+    add_fixes(db, 1, NOW - timedelta(days=10), 12, 5)    # 60 s of fixes
+    add_fixes(db, 2, NOW - timedelta(days=10), 12, 5)
+    add_fixes(db, 1, NOW - timedelta(days=100), 7, 5)    # past the last tier
+
+    job = LocationRetentionJob([[7, 0], [90, 30]], chunk_rows=5)
+    report = job.run(db, now=NOW)
+
+    assert report["dropped"] == 7
+    # Two drivers x 60 s of fixes at 5 s intervals -> 2 x 30 s buckets each
+    assert report["downsampled"] == 2 * (12 - 2)
+    assert report["chunks"] > 2
+    assert db.query(DriverLocation).count() == 12 + 2 * 2
+
+
+def test_retention_is_incremental(db):
+    """Test a second run only scans rows that aged into the tier since, plus the bucket cut short."""
+    add_fixes(db, 1, NOW - timedelta(days=10), 12, 5)
+    add_fixes(db, 2, NOW - timedelta(days=7, seconds=30), 12, 5)  # Straddles the first run's boundary
+    job = LocationRetentionJob([[7, 0], [90, 30]], chunk_rows=100)
+    job.run(db, now=NOW + timedelta(seconds=15))  # Stops halfway through a 30 s bucket
+
+    # Rows that were compacted already are not rescanned, except that bucket
+    report = job.run(db, now=NOW + timedelta(hours=1))
+    assert report["downsampled"] == 3
+    assert report["chunks"] == 1
+    # One point per 30 s bucket across both runs
+    assert db.query(DriverLocation).filter(DriverLocation.driver_id == 2).count() == 2
+
+
+def test_retention_watermarks_survive_restart(db):
+    """Test a new job instance, as after a restart, resumes from the stored watermarks."""
+    add_fixes(db, 1, NOW - timedelta(days=10), 12, 5)
+    LocationRetentionJob([[7, 0], [90, 30]], chunk_rows=100).run(db, now=NOW)
+
+    restarted = LocationRetentionJob([[7, 0], [90, 30]], chunk_rows=100)
+    report = restarted.run(db, now=NOW + timedelta(hours=1))
+    assert report["chunks"] == 0
+
+    # A changed tier has no watermark and scans its whole range again
+    changed = LocationRetentionJob([[7, 0], [90, 60]], chunk_rows=100)
+    assert changed.run(db, now=NOW + timedelta(hours=2))["chunks"] == 1
+
+
+def test_retention_endpoint(client, admin_token):
+    """Test admins can trigger a retention run."""
+    response = client.post(
+        "/location/retention/run",
+        headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["dropped"] == 0
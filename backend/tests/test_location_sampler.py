@@ -0,0 +1,132 @@
+"""Tests for adaptive sampling of GPS fixes."""
+
+from datetime import datetime, timedelta
+
+from safe_route.models.location import DriverLocation, DriverLatestLocation
+from safe_route.services.location_sampler import LocationSampler
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def make_row(seconds, lat=12.9, heading=None, trip_id=None, driver_id=1):
+    return {
+        "driver_id": driver_id, "trip_id": trip_id, "lat": lat, "lng": 77.5,
+        "heading": heading, "speed": None, "timestamp": START + timedelta(seconds=seconds),
+    }
+
+
+def make_sampler(min_distance_m=10):
+    return LocationSampler(min_distance_m=min_distance_m, max_distance_m=100, max_interval=60, min_heading_change=20)
+
+
+def test_sampler_suppresses_stationary_fixes():
+    """Test jitter around a parked position is kept out of history."""
+    sampler = make_sampler()
+    rows = [make_row(i * 5, lat=12.9 + (i % 2) * 0.00002) for i in range(10)]
+    assert sampler.select(rows) == rows[:1]
+    assert sampler.stats() == [
+        {"driver_id": 1, "received": 10, "stored": 1, "suppression_ratio": 0.9},
+    ]
+
+
+def test_sampler_thins_straight_runs():
+    """Test a straight drive keeps one fix per max distance."""
+    sampler = make_sampler()
+    rows = [make_row(i, lat=12.9 + i * 0.0001, heading=0) for i in range(30)]  # ~11 m apart
+    kept = sampler.select(rows)
+    assert [rows.index(row) for row in kept] == [0, 9, 18, 27]
+
+
+def test_sampler_keeps_turn_corner():
+    """Test a turn stores the corner fix along with the fix after it."""
+    sampler = make_sampler()
+    north = [make_row(i, lat=12.9 + i * 0.0001) for i in range(5)]
+    east = [{**make_row(5 + i, lat=12.9004), "lng": 77.5 + (i + 1) * 0.0001} for i in range(3)]
+    rows = north + east
+    kept = sampler.select(rows)
+    # The corner (index 4) is stored once the path bends away from it
+    assert [rows.index(row) for row in kept] == [0, 4, 5]
+
+
+def test_sampler_keeps_heading_age_and_trip_changes():
+    """Test heading, interval and trip thresholds each let a fix through."""
+    sampler = make_sampler()
+    anchor = make_row(0, heading=90)
+    turned = make_row(5, lat=12.9001, heading=130)      # ~11 m, 40 degrees
+    aged = make_row(70, lat=12.9001, heading=130)
+    retagged = make_row(75, lat=12.9001, heading=130, trip_id=7)
+    jitter = make_row(80, lat=12.90011, heading=135, trip_id=7)
+    rows = [anchor, turned, aged, retagged, jitter]
+    assert sampler.select(rows) == rows[:4]
+
+
+def test_sampler_stores_held_corner_from_earlier_call():
+    """Test a corner suppressed in one request is stored when a later one turns."""
+    sampler = make_sampler()
+    sampler.select([make_row(0)])
+    corner = make_row(1, lat=12.9002)
+    assert sampler.select([corner]) == []
+    after_turn = {**make_row(2, lat=12.9002), "lng": 77.5002}
+    assert sampler.select([after_turn]) == [corner, after_turn]
+
+
+def test_sampler_decides_in_timestamp_order():
+    """Test a shuffled batch is sampled as if it arrived in order."""
+    sampler = make_sampler()
+    rows = [make_row(10, lat=12.9010), make_row(0), make_row(5, lat=12.9010)]
+    assert sampler.select(rows) == [rows[1], rows[2]]
+
+
+def test_sampler_disabled_keeps_everything():
+    """Test a zero distance threshold turns sampling off."""
+    sampler = make_sampler(min_distance_m=0)
+    rows = [make_row(i) for i in range(5)]
+    assert sampler.select(rows) == rows
+    assert sampler.stats()[0]["suppression_ratio"] == 0.0
+
+
+def test_ingestion_suppresses_duplicates_but_updates_latest(client, db, admin_token, driver_token):
+    """Test stationary fixes skip history while the latest position keeps moving."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+    response = client.post(
+        "/location/batch",
+        json={"points": [
+            {"lat": 12.9, "lng": 77.5, "timestamp": f"2024-01-01T08:00:{i:02d}"} for i in range(0, 50, 5)
+        ]},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    driver_id = client.get("/location/all", headers=headers).json()[0]["driver_id"]
+
+    assert db.query(DriverLocation).count() == 1
+    latest = client.get(f"/location/driver/{driver_id}", headers=headers).json()
+    assert latest["timestamp"] == "2024-01-01T08:00:45"
+    assert latest["id"] is None
+    assert db.query(DriverLatestLocation).one().timestamp == START + timedelta(seconds=45)
+
+    response = client.get("/location/sampling", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.json() == [
+        {"driver_id": driver_id, "received": 10, "stored": 1, "suppression_ratio": 0.9},
+    ]
+
+
+def test_ingestion_latest_includes_fix_after_released_corner(client, db, driver_token):
+    """Test a batch that releases a held corner still moves latest to its suppressed fix."""
+    headers = {"Authorization": f"Bearer {driver_token}"}
+
+    def post(*points):
+        response = client.post("/location/batch", json={"points": [
+            {"lat": lat, "lng": lng, "timestamp": f"2024-01-01T08:00:{second:02d}"} for second, lat, lng in points
+        ]}, headers=headers)
+        assert response.status_code == 200
+
+    post((0, 12.9, 77.5))
+    post((5, 12.9002, 77.5))  # Held as a possible corner
+    # The turn releases the corner, so as many rows are stored as were sent
+    post((10, 12.9002, 77.5002), (12, 12.90021, 77.5002))
+
+    assert db.query(DriverLocation).count() == 3
+    assert db.query(DriverLatestLocation).one().timestamp == START + timedelta(seconds=12)
+    driver_id = db.query(DriverLatestLocation).one().driver_id
+    latest = client.get(f"/location/driver/{driver_id}", headers=headers).json()
+    assert latest["timestamp"] == "2024-01-01T08:00:12"
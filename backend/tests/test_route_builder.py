@@ -0,0 +1,97 @@
+"""Tests for fleet-wide route building."""
+
+import numpy as np
+
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route
+from safe_route.models.vehicle import Vehicle
+from safe_route.services.route_builder import plan_routes
+from safe_route.services.route_optimizer import optimize_stop_order
+
+DEPOT = (12.97, 77.59)
+
+
+def random_stops(rng, count):
+    return rng.uniform(12.85, 13.10, count), rng.uniform(77.45, 77.75, count)
+
+
+def check_plan(plan, count, capacities):
+    placed = [stop for route in plan["routes"] for stop in route["stops"]]
+    assert sorted(placed + plan["unassigned"]) == list(range(count))
+    assert len({route["vehicle"] for route in plan["routes"]}) == len(plan["routes"])
+    for route in plan["routes"]:
+        assert 0 < len(route["stops"]) <= capacities[route["vehicle"]]
+
+
+def test_plan_respects_mixed_capacities():
+    """Test every stop rides once and no vehicle is over capacity."""
+    rng = np.random.default_rng(5)
+    lats, lngs = random_stops(rng, 400)
+    capacities = [4] * 40 + [6] * 20 + [12] * 20
+    plan = plan_routes(lats, lngs, DEPOT, capacities, time_budget=5)
+
+    check_plan(plan, 400, capacities)
+    assert plan["unassigned"] == []
+    assert abs(plan["total_length_km"] - sum(route["length_km"] for route in plan["routes"])) < 0.01
+
+
+def test_plan_beats_sweep_baseline():
+    """Test the routes are shorter than angular sweep plus per-route optimization."""
+    rng = np.random.default_rng(8)
+    lats, lngs = random_stops(rng, 300)
+    capacities = [12] * 15 + [6] * 10 + [4] * 20
+    plan = plan_routes(lats, lngs, DEPOT, capacities, time_budget=5)
+
+    sweep = np.argsort(np.arctan2(lats - DEPOT[0], lngs - DEPOT[1]))
+    baseline, start = 0.0, 0
+    for capacity in capacities:
+        chunk = sweep[start:start + capacity]
+        start += capacity
+        if len(chunk):
+            baseline += optimize_stop_order(lats[chunk], lngs[chunk], depot=DEPOT, time_budget=0.05)["length_after_km"]
+    assert plan["total_length_km"] < baseline
+
+
+def test_plan_reports_stops_without_seats():
+    """Test stops beyond the fleet's total capacity are left unassigned."""
+    lats, lngs = random_stops(np.random.default_rng(1), 30)
+    plan = plan_routes(lats, lngs, DEPOT, [4, 4, 6], ends_at_depot=True, time_budget=1)
+
+    check_plan(plan, 30, [4, 4, 6])
+    assert len(plan["unassigned"]) == 30 - 14
+
+
+def test_build_endpoint_creates_routes(client, db, admin_token):
+    """Test the endpoint stores ordered routes and skips employees already routed."""
+    rng = np.random.default_rng(3)
+    lats, lngs = random_stops(rng, 25)
+    for index, (lat, lng) in enumerate(zip(lats, lngs)):
+        db.add(Employee(user_id=300 + index, drop_lat=float(lat), drop_lng=float(lng)))
+    vehicles = [Vehicle(vehicle_number=f"KA-{n}", capacity=capacity) for n, capacity in enumerate([4, 6, 6, 12])]
+    db.add_all(vehicles)
+    db.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    body = {
+        "route_type": "DROP",
+        "vehicle_ids": [vehicle.id for vehicle in vehicles],
+        "depot_lat": DEPOT[0], "depot_lng": DEPOT[1],
+        "time_budget_seconds": 1,
+    }
+
+    response = client.post("/routes/build", json=body, headers=headers)
+    assert response.status_code == 201
+    result = response.json()
+    assert result["unassigned_employee_ids"] == []
+    capacity = {vehicle.id: vehicle.capacity for vehicle in vehicles}
+    routed = []
+    for route in result["routes"]:
+        assert route["route_type"] == "DROP"
+        assert len(route["stops"]) <= capacity[route["vehicle_id"]]
+        assert [stop["sequence_order"] for stop in route["stops"]] == list(range(1, len(route["stops"]) + 1))
+        routed.extend(stop["employee_id"] for stop in route["stops"])
+    assert len(routed) == len(set(routed)) == 25
+    assert db.query(Route).count() == len(result["routes"])
+
+    response = client.post("/routes/build", json=body, headers=headers)
+    assert response.status_code == 400
+    assert response.json()["detail"] == "No employees to route"
@@ -0,0 +1,101 @@
+"""Tests for route stop sequencing."""
+
+import time
+from itertools import permutations
+
+import numpy as np
+
+from safe_route.models.employee import Employee
+from safe_route.models.route import Route, RouteStop, RouteType
+from safe_route.services.route_optimizer import optimize_stop_order
+from safe_route.utils.geo import haversine_matrix
+
+
+def random_stops(rng, count):
+    return rng.uniform(12.85, 13.10, count), rng.uniform(77.45, 77.75, count)
+
+
+def open_length(lats, lngs, order, depot=None):
+    points = [(lats[i], lngs[i]) for i in order]
+    if depot is not None:
+        points.insert(0, depot)
+    lat, lng = zip(*points)
+    distances = haversine_matrix(lat, lng)
+    return float(sum(distances[i, i + 1] for i in range(len(points) - 1)))
+
+
+def test_local_search_improves_on_greedy():
+    """Test 2-opt and Or-opt shorten the greedy tour and report true lengths."""
+    for seed in range(5):
+        lats, lngs = random_stops(np.random.default_rng(seed), 60)
+        result = optimize_stop_order(lats, lngs, time_budget=1.0)
+
+        assert sorted(result["order"]) == list(range(60))
+        assert result["length_after_km"] < result["greedy_length_km"]
+        assert abs(open_length(lats, lngs, result["order"]) - result["length_after_km"]) < 0.01
+        assert abs(open_length(lats, lngs, range(60)) - result["length_before_km"]) < 0.01
+
+
+def test_small_routes_near_optimum_from_depot():
+    """Test a few stops end up close to the best open path from the depot."""
+    rng = np.random.default_rng(4)
+    depot = (12.97, 77.59)
+    ratios = []
+    for _ in range(20):
+        lats, lngs = random_stops(rng, 7)
+        best = min(open_length(lats, lngs, order, depot) for order in permutations(range(7)))
+        result = optimize_stop_order(lats, lngs, depot=depot, time_budget=1.0)
+        ratios.append(result["length_after_km"] / best)
+
+        # A pickup route is the same path driven towards the depot
+        pickup = optimize_stop_order(lats, lngs, depot=depot, ends_at_depot=True, time_budget=1.0)
+        assert pickup["order"] == result["order"][::-1]
+    # Local search can stop at a local optimum, but rarely far from the best
+    assert max(ratios) < 1.1
+    assert np.mean(ratios) < 1.01
+
+
+def test_time_budget_respected_for_hundreds_of_stops():
+    """Test optimizing 400 stops stays within the requested budget."""
+    lats, lngs = random_stops(np.random.default_rng(2), 400)
+    for budget in (0.0, 0.05, 0.2):
+        start = time.perf_counter()
+        result = optimize_stop_order(lats, lngs, depot=(12.97, 77.59), time_budget=budget)
+        elapsed = time.perf_counter() - start
+        assert elapsed < budget + 0.1
+        assert sorted(result["order"]) == list(range(400))
+        assert result["length_after_km"] <= result["greedy_length_km"]
+
+
+def test_optimize_endpoint_reorders_stops(client, db, admin_token):
+    """Test the endpoint applies the sequence and reports both lengths."""
+    route = Route(name="Evening", route_type=RouteType.DROP)
+    db.add(route)
+    db.flush()
+    # Stops on a line, stored in a zig-zag order
+    for order, offset in enumerate([3, 1, 4, 0, 2], start=1):
+        employee = Employee(user_id=200 + order, drop_lat=12.90 + offset * 0.01, drop_lng=77.50)
+        db.add(employee)
+        db.flush()
+        db.add(RouteStop(route_id=route.id, employee_id=employee.id, sequence_order=order))
+    db.commit()
+    headers = {"Authorization": f"Bearer {admin_token}"}
+
+    response = client.post(
+        f"/routes/{route.id}/optimize",
+        params={"depot_lat": 12.89, "depot_lng": 77.50, "time_budget_ms": 100},
+        headers=headers,
+    )
+    assert response.status_code == 200
+    body = response.json()
+    lats = [
+        db.get(Employee, stop["employee_id"]).drop_lat
+        for stop in sorted(body["stops"], key=lambda stop: stop["sequence_order"])
+    ]
+    assert lats == sorted(lats)
+    assert (body["depot_lat"], body["depot_lng"]) == (12.89, 77.50)
+    assert body["length_after_km"] < body["length_before_km"]
+    assert abs(body["length_after_km"] - 5 * 1.112) < 0.01
+
+    response = client.post(f"/routes/{route.id}/optimize", params={"depot_lat": 12.89}, headers=headers)
+    assert response.status_code == 400
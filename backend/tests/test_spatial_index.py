@@ -0,0 +1,57 @@
+"""Tests for the live driver spatial grid."""
+
+from safe_route.services.spatial_index import DriverGrid
+
+
+def test_grid_radius_query():
+    """Test radius queries return nearby drivers sorted by distance."""
+    grid = DriverGrid(cell_km=1.0)
+    grid.update(1, 12.9716, 77.5946)
+    grid.update(2, 12.9800, 77.5946)   # ~0.9 km north
+    grid.update(3, 13.0716, 77.5946)   # ~11 km north
+    hits = grid.within_radius(12.9716, 77.5946, 2.0)
+    assert [driver_id for driver_id, _ in hits] == [1, 2]
+    assert 0.9 < hits[1][1] < 1.0
+
+
+def test_grid_moves_driver_between_cells():
+    """Test updates move a driver out of its previous cell."""
+    grid = DriverGrid(cell_km=1.0)
+    grid.update(1, 12.97, 77.59)
+    grid.update(1, 13.50, 77.59)
+    assert grid.within_radius(12.97, 77.59, 5.0) == []
+    assert [d for d, _ in grid.within_radius(13.50, 77.59, 5.0)] == [1]
+    assert len(grid) == 1
+
+
+def test_grid_bbox_query():
+    """Test bounding-box queries filter on exact coordinates."""
+    grid = DriverGrid(cell_km=5.0)
+    grid.update(1, 12.95, 77.55)
+    grid.update(2, 12.99, 77.61)
+    assert grid.within_bbox(12.94, 77.54, 12.96, 77.56) == [1]
+    assert sorted(grid.within_bbox(12.0, 77.0, 13.0, 78.0)) == [1, 2]
+
+
+def test_nearby_endpoint(client, admin_token, driver_token):
+    """Test the nearby endpoint uses live positions and status filters."""
+    client.post(
+        "/location/",
+        json={"lat": 12.9716, "lng": 77.5946},
+        headers={"Authorization": f"Bearer {driver_token}"}
+    )
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get("/location/nearby?lat=12.97&lng=77.59&radius_km=2", headers=headers)
+    assert response.status_code == 200
+    assert len(response.json()) == 1
+    assert response.json()[0]["distance_km"] < 1
+
+    response = client.get(
+        "/location/nearby?lat=12.97&lng=77.59&radius_km=2&status=AVAILABLE", headers=headers
+    )
+    assert response.json() == []
+
+    response = client.get(
+        "/location/within?min_lat=12.9&min_lng=77.5&max_lat=13.0&max_lng=77.6", headers=headers
+    )
+    assert len(response.json()) == 1
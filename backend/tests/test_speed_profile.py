@@ -0,0 +1,70 @@
+"""Tests for the historical speed profile."""
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from safe_route.models.location import DriverLocation
+from safe_route.models.speed_profile import SpeedProfileCell
+from safe_route.services.speed_profile import SpeedProfile
+
+MONDAY_8AM = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def add_fixes(db, count, kmh, start=MONDAY_8AM, lat=12.905, trip_id=1):
+    """Add fixes moving at `kmh`, stored in m/s as devices report them."""
+    for i in range(count):
+        db.add(DriverLocation(
+            driver_id=1, trip_id=trip_id, lat=lat, lng=77.505, speed=kmh / 3.6,
+            timestamp=start + timedelta(seconds=i),
+        ))
+    db.commit()
+
+
+def test_refresh_folds_in_only_new_rows(db):
+    """Test repeated refreshes add new rows to the stored totals exactly once."""
+    profile = SpeedProfile(cell_deg=0.01, min_samples=1, default_kmh=30, chunk_rows=4)
+    add_fixes(db, 6, kmh=20.0)
+    add_fixes(db, 3, kmh=99.0, trip_id=None)  # Off-trip fixes do not count
+    add_fixes(db, 2, kmh=400.0)  # Nor do GPS glitches
+
+    report = profile.refresh(db)
+    assert report["rows"] == 8
+    assert profile.speed_kmh(12.905, 77.505, MONDAY_8AM) == pytest.approx(20.0)
+
+    add_fixes(db, 2, kmh=50.0)
+    assert profile.refresh(db)["rows"] == 2
+    assert profile.refresh(db)["rows"] == 0
+    [cell] = db.query(SpeedProfileCell).all()
+    assert (cell.cell_lat, cell.cell_lng, cell.hour_of_week) == (1290, 7750, 8)
+    assert (cell.samples, cell.speed_sum) == (8, pytest.approx(220.0))
+
+    # A fresh process sees the same totals
+    reloaded = SpeedProfile(cell_deg=0.01, min_samples=1, default_kmh=30)
+    reloaded.load(db)
+    assert reloaded.speed_kmh(12.905, 77.505, MONDAY_8AM) == pytest.approx(27.5)
+
+
+def test_speed_falls_back_by_hour_then_default(db):
+    """Test sparse cells fall back to the cell's mean, the hour's mean, then the default."""
+    profile = SpeedProfile(cell_deg=0.01, min_samples=5, default_kmh=30, min_kmh=5)
+    add_fixes(db, 10, kmh=10.0)
+    add_fixes(db, 2, kmh=40.0, lat=12.955)
+    add_fixes(db, 6, kmh=0.0, lat=12.985, start=MONDAY_8AM + timedelta(days=1))
+    profile.refresh(db)
+
+    assert profile.speed_kmh(12.905, 77.505, MONDAY_8AM) == pytest.approx(10.0)
+    assert profile.speed_kmh(12.955, 77.505, MONDAY_8AM) == pytest.approx(15.0)  # (100 + 80) / 12
+    assert profile.speed_kmh(12.905, 77.505, MONDAY_8AM + timedelta(hours=1)) == pytest.approx(10.0)
+    assert profile.speed_kmh(12.935, 77.505, MONDAY_8AM + timedelta(hours=1)) == 30
+    assert profile.speed_kmh(12.985, 77.505, MONDAY_8AM + timedelta(days=1)) == 5  # Floor
+    assert profile.travel_minutes(12.90, 77.50, 12.91, 77.51, 2.0, MONDAY_8AM) == pytest.approx(12.0)
+
+
+def test_refresh_endpoint(client, admin_token):
+    """Test the admin refresh endpoint reports what it aggregated."""
+    response = client.post(
+        "/location/speed-profile/refresh", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    assert response.json()["rows"] == 0
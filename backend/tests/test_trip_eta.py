@@ -0,0 +1,116 @@
+"""Tests for live per-stop trip ETAs."""
+
+from datetime import datetime
+
+from safe_route.models.employee import Employee
+from safe_route.models.location import DriverLocation
+from safe_route.models.route import Route, RouteStop
+from safe_route.models.trip import Trip
+from safe_route.schemas.location import LocationResponse
+from safe_route.services.geofence import TripFences, _fence
+from safe_route.services.speed_profile import SpeedProfile
+from safe_route.services.trip_eta import TripEtaService
+
+START = datetime(2024, 1, 1, 8, 0, 0)
+
+
+def _location(lat):
+    return LocationResponse(
+        id=None, driver_id=1, trip_id=None, lat=lat, lng=77.50, heading=None, speed=None, timestamp=START,
+    )
+
+
+def _start_trip(client, db, admin_token, driver_token):
+    """Create a three-stop route 0.01 degrees (~1.1 km) apart and start its trip."""
+    driver_id = client.get(
+        "/drivers/", headers={"Authorization": f"Bearer {admin_token}"}
+    ).json()[0]["id"]
+    route = Route(name="Morning", driver_id=driver_id)
+    db.add(route)
+    db.flush()
+    for order in range(1, 4):
+        employee = Employee(user_id=100 + order, pickup_lat=12.90 + (order - 1) * 0.01, pickup_lng=77.50)
+        db.add(employee)
+        db.flush()
+        db.add(RouteStop(route_id=route.id, employee_id=employee.id, sequence_order=order))
+    trip = Trip(route_id=route.id, driver_id=driver_id, vehicle_id=1)
+    db.add(trip)
+    db.commit()
+    trip_id = trip.id
+    client.patch(
+        f"/trips/{trip_id}/status", json={"status": "STARTED", "lat": 12.895, "lng": 77.50},
+        headers={"Authorization": f"Bearer {driver_token}"},
+    )
+    return trip_id
+
+
+def test_compute_uses_remaining_legs():
+    """Test ETAs add the precomputed stop-to-stop legs to the distance to the next stop."""
+    stops = [_fence(i, i, i + 1, 12.90 + i * 0.01, 77.50) for i in range(3)]
+    fences = TripFences(1, 1, stops[0], stops)
+    service = TripEtaService(SpeedProfile(default_kmh=30))
+
+    eta = service.compute(fences, _location(12.89))
+    assert [stop.eta_minutes for stop in eta.stops] == [2, 4, 6]
+    assert abs(eta.stops[2].distance_km - 3.336) < 0.01
+
+    fences.next_index, fences.inside = 1, True
+    eta = service.compute(fences, _location(12.91))
+    assert [(stop.stop_id, stop.eta_minutes) for stop in eta.stops] == [(1, 0), (2, 2)]
+
+
+def test_compute_uses_speed_profile(db):
+    """Test each leg is timed at the profiled speed of its cell."""
+    for lat in (12.895, 12.905, 12.915):
+        db.add(DriverLocation(driver_id=1, trip_id=1, lat=lat, lng=77.505, speed=15 / 3.6, timestamp=START))
+    db.commit()
+    profile = SpeedProfile(cell_deg=0.01, min_samples=1, default_kmh=30)
+    profile.refresh(db)
+    stops = [_fence(i, i, i + 1, 12.90 + i * 0.01, 77.50) for i in range(3)]
+
+    eta = TripEtaService(profile).compute(TripFences(1, 1, stops[0], stops), _location(12.89))
+    assert [stop.eta_minutes for stop in eta.stops] == [4, 8, 13]
+
+
+def test_trip_eta_endpoint_follows_progress(client, db, admin_token, driver_token):
+    """Test the ETA endpoint drops stops the vehicle has left behind."""
+    trip_id = _start_trip(client, db, admin_token, driver_token)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+
+    client.post("/location/", json={"lat": 12.89, "lng": 77.50}, headers=headers)
+    eta = client.get(f"/trips/{trip_id}/eta", headers=headers).json()
+    assert [stop["sequence_order"] for stop in eta["stops"]] == [1, 2, 3]
+    assert [stop["eta_minutes"] for stop in eta["stops"]] == [2, 4, 6]
+
+    client.post("/location/batch", json={"points": [
+        {"lat": 12.9000, "lng": 77.50, "timestamp": "2024-01-01T08:00:00"},
+        {"lat": 12.9050, "lng": 77.50, "timestamp": "2024-01-01T08:01:00"},
+    ]}, headers=headers)
+    eta = client.get(f"/trips/{trip_id}/eta", headers=headers).json()
+    assert [stop["sequence_order"] for stop in eta["stops"]] == [2, 3]
+    assert eta["stops"][0]["eta"] == "2024-01-01T08:02:00"
+
+    for status in ("IN_PROGRESS", "COMPLETED"):
+        client.patch(f"/trips/{trip_id}/status", json={"status": status}, headers=headers)
+    assert client.get(f"/trips/{trip_id}/eta", headers=headers).status_code == 404
+
+
+def test_eta_pushed_on_trip_channel(client, db, admin_token, driver_token):
+    """Test trip watchers receive ETA frames after the position frame, only when ETAs change."""
+    trip_id = _start_trip(client, db, admin_token, driver_token)
+    headers = {"Authorization": f"Bearer {driver_token}"}
+
+    with client.websocket_connect(f"/location/ws/trip/{trip_id}?token={admin_token}") as watcher:
+        client.post("/location/", json={"lat": 12.89, "lng": 77.50, "trip_id": trip_id}, headers=headers)
+        assert watcher.receive_json()["lat"] == 12.89
+        frame = watcher.receive_json()
+        assert frame["type"] == "eta"
+        assert frame["trip_id"] == trip_id
+        assert [stop["eta_minutes"] for stop in frame["stops"]] == [2, 4, 6]
+
+        # Moving a few meters changes no ETA, so only the position goes out
+        client.post("/location/", json={"lat": 12.8901, "lng": 77.50, "trip_id": trip_id}, headers=headers)
+        client.post("/location/", json={"lat": 12.8950, "lng": 77.50, "trip_id": trip_id}, headers=headers)
+        assert watcher.receive_json()["lat"] == 12.8901
+        assert watcher.receive_json()["lat"] == 12.8950
+        assert watcher.receive_json()["type"] == "eta"
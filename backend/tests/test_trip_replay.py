@@ -0,0 +1,80 @@
+"""Tests for streaming trip replay."""
+
+import json
+from datetime import date, datetime, timedelta
+
+from safe_route.models.location import DriverLocation
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.services.location_archive import LocationArchive
+from safe_route.services.trip_replay import iter_database_points
+
+START = datetime(2024, 1, 1, 23, 59, 50)
+
+
+def add_trip(db, fixes, step_seconds=1):
+    trip = Trip(route_id=1, driver_id=1, vehicle_id=1, status=TripStatus.IN_PROGRESS)
+    db.add(trip)
+    db.commit()
+    trip_id = trip.id
+    # Inserted newest first so storage order differs from time order
+    for i in reversed(range(fixes)):
+        db.add(DriverLocation(
+            driver_id=1, trip_id=trip_id, lat=12.9 + i * 1e-4, lng=77.5, speed=float(i), heading=90.0,
+            timestamp=START + timedelta(seconds=i * step_seconds),
+        ))
+    db.add(DriverLocation(driver_id=1, trip_id=None, lat=0.0, lng=0.0, timestamp=START))
+    db.commit()
+    return trip_id
+
+
+def test_keyset_pages_stay_in_time_order(db):
+    """Test every fix is yielded once, in order, across many small pages."""
+    trip_id = add_trip(db, fixes=23)
+    # Two fixes sharing a timestamp are split across a page boundary by id
+    db.add(DriverLocation(driver_id=1, trip_id=trip_id, lat=1.0, lng=1.0, timestamp=START + timedelta(seconds=4)))
+    db.commit()
+
+    points = list(iter_database_points(db, trip_id, page_size=5))
+    assert len(points) == 24
+    assert [p.timestamp for p in points] == sorted(p.timestamp for p in points)
+    assert points[0].speed == 0.0 and points[-1].speed == 22.0
+
+    resumed = list(iter_database_points(db, trip_id, page_size=5, after=START + timedelta(seconds=19)))
+    assert [p.speed for p in resumed] == [20.0, 21.0, 22.0]
+
+
+def test_replay_streams_ndjson_with_archive(client, db, admin_token, tmp_path, monkeypatch):
+    """Test replay joins archived and live fixes into one NDJSON stream."""
+    from safe_route.routers import trips
+
+    archive = LocationArchive(str(tmp_path))
+    monkeypatch.setattr(trips, "location_archive", archive)
+    trip_id = add_trip(db, fixes=20)
+    archive.export_day(db, date(2024, 1, 1))
+
+    response = client.get(f"/trips/{trip_id}/replay", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 200
+    assert response.headers["content-type"] == "application/x-ndjson"
+    points = [json.loads(line) for line in response.text.splitlines()]
+    assert [p["speed"] for p in points] == [float(i) for i in range(20)]
+    assert points[9]["timestamp"] == "2024-01-01T23:59:59"
+    assert points[10]["timestamp"] == "2024-01-02T00:00:00"
+
+
+def test_replay_playback_emits_events(client, db, admin_token):
+    """Test timed playback sends SSE point events and an end event."""
+    trip_id = add_trip(db, fixes=3)
+
+    response = client.get(
+        f"/trips/{trip_id}/replay?speed=1000", headers={"Authorization": f"Bearer {admin_token}"}
+    )
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    events = [line for line in response.text.splitlines() if line.startswith("event:")]
+    assert events == ["event: point"] * 3 + ["event: end"]
+
+
+def test_replay_requires_existing_trip(client, admin_token):
+    """Test replaying an unknown trip returns 404."""
+    response = client.get("/trips/999/replay", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 404
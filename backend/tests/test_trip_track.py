@@ -0,0 +1,63 @@
+"""Tests for trip track simplification."""
+
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from safe_route.models.location import DriverLocation
+from safe_route.models.trip import Trip, TripStatus
+from safe_route.utils.track import douglas_peucker, encode_polyline, project_to_meters
+
+
+def test_douglas_peucker_drops_collinear_points():
+    """Test points on a straight line collapse to the endpoints."""
+    lats = np.linspace(12.90, 12.95, 500)
+    lngs = np.linspace(77.50, 77.55, 500)
+    kept = douglas_peucker(project_to_meters(lats, lngs), tolerance=1.0)
+    assert kept.tolist() == [0, 499]
+
+
+def test_douglas_peucker_keeps_corners():
+    """Test a right-angle turn survives simplification."""
+    lats = np.concatenate([np.linspace(12.90, 12.95, 50), np.full(50, 12.95)])
+    lngs = np.concatenate([np.full(50, 77.50), np.linspace(77.50, 77.55, 50)])
+    kept = douglas_peucker(project_to_meters(lats, lngs), tolerance=5.0)
+    assert kept.tolist() == [0, 49, 99]
+
+
+def test_encode_polyline_reference():
+    """Test against the reference example from the polyline format docs."""
+    coords = [(38.5, -120.2), (40.7, -120.95), (43.252, -126.453)]
+    assert encode_polyline(coords) == "_p~iF~ps|U_ulLnnqC_mqNvxq`@"
+
+
+def test_trip_track_endpoint(client, db, admin_token):
+    """Test the track endpoint simplifies a trip's recorded path."""
+    trip = Trip(route_id=1, driver_id=1, vehicle_id=1, status=TripStatus.COMPLETED)
+    db.add(trip)
+    db.commit()
+    start = datetime(2024, 1, 1, 8, 0, 0)
+    for i in range(100):
+        db.add(DriverLocation(
+            driver_id=1, trip_id=trip.id, lat=12.90 + i * 0.0005, lng=77.50,
+            timestamp=start + timedelta(seconds=i),
+        ))
+    db.commit()
+
+    headers = {"Authorization": f"Bearer {admin_token}"}
+    response = client.get(f"/trips/{trip.id}/track?tolerance_m=5", headers=headers)
+    assert response.status_code == 200
+    data = response.json()
+    assert data["original_points"] == 100
+    assert data["simplified_points"] == 2
+    assert data["points"][0]["timestamp"] == "2024-01-01T08:00:00"
+    assert "polyline" not in data
+
+    response = client.get(f"/trips/{trip.id}/track?format=polyline", headers=headers)
+    assert response.json()["polyline"] == encode_polyline([(12.90, 77.50), (12.90 + 99 * 0.0005, 77.50)])
+
+
+def test_trip_track_not_found(client, admin_token):
+    """Test the track endpoint returns 404 for unknown trips."""
+    response = client.get("/trips/999/track", headers={"Authorization": f"Bearer {admin_token}"})
+    assert response.status_code == 404
@@ -160,8 +160,8 @@ function RouteManageContent() {
         if (!confirm("Auto-optimize sequence based on location?")) return;
         setLoading(true);
         try {
-            const optimizedStops = await api.optimizeRoute(routeId);
-            setStops(optimizedStops);
+            const result = await api.optimizeRoute(routeId);
+            setStops(result.stops);
         } catch (err) {
             alert('Optimization failed');
         } finally {
@@ -52,10 +52,10 @@ export default function AdminRoutesPage() {
         if (!confirm('Auto-optimize stop sequence based on distance?')) return;
         try {
             setLoading(true);
-            await api.optimizeRoute(id);
+            const result = await api.optimizeRoute(id);
             await fetchRoutes();
             setLoading(false);
-            alert('Route sequence optimized!');
+            alert(`Route sequence optimized: ${result.length_before_km.toFixed(1)} km -> ${result.length_after_km.toFixed(1)} km`);
         }
         catch (err) {
             setLoading(false);
@@ -70,6 +70,56 @@ interface RouteStop {
     created_at: string;
 }
 
+interface RouteOptimization {
+    stops: RouteStop[];
+    depot_lat: number | null;
+    depot_lng: number | null;
+    length_before_km: number;
+    greedy_length_km: number;
+    length_after_km: number;
+    moves: number;
+    elapsed_ms: number;
+}
+
+interface BulkOptimization {
+    routes: {
+        route_id: number;
+        name: string;
+        stop_count: number;
+        length_before_km: number;
+        greedy_length_km: number;
+        length_after_km: number;
+        improvement_pct: number;
+        moves: number;
+    }[];
+    skipped: { route_id: number; name: string; reason: string }[];
+    total_length_before_km: number;
+    total_length_after_km: number;
+    elapsed_ms: number;
+}
+
+interface EmployeeCluster {
+    employee_ids: number[];
+    centroid_lat: number;
+    centroid_lng: number;
+    radius_km: number;
+    route_id: number | null;
+}
+
+interface Job {
+    id: string;
+    kind: string;
+    subject_id: number | null;
+    status: 'pending' | 'running' | 'succeeded' | 'failed' | 'cancelled' | 'timed_out';
+    submitted_at: string;
+    finished_at: string | null;
+    time_limit_seconds: number;
+    result: unknown;
+    error: string | null;
+}
+
+const JOB_POLL_MS = 1000;
+
 interface Route {
     id: number;
     name: string;
@@ -148,7 +198,21 @@ export const api = {
     createRoute: (data: Record<string, unknown>): Promise<Route> => request('/routes/', { method: 'POST', body: JSON.stringify(data) }),
     updateRoute: (id: number, data: Record<string, unknown>): Promise<Route> => request(`/routes/${id}`, { method: 'PUT', body: JSON.stringify(data) }),
     deleteRoute: (id: number): Promise<void> => request(`/routes/${id}`, { method: 'DELETE' }),
-    optimizeRoute: (id: number): Promise<RouteStop[]> => request(`/routes/${id}/optimize`, { method: 'POST' }),
+    // Large routes are optimized as a background job; wait for its result
+    optimizeRoute: async (id: number): Promise<RouteOptimization> => {
+        const response = await request<RouteOptimization | Job>(`/routes/${id}/optimize`, { method: 'POST' });
+        if (!('status' in response)) return response;
+        let job = response;
+        while (job.status === 'pending' || job.status === 'running') {
+            await new Promise(resolve => setTimeout(resolve, JOB_POLL_MS));
+            job = await request<Job>(`/jobs/${job.id}`);
+        }
+        if (job.status !== 'succeeded') throw new Error(job.error || `Optimization ${job.status}`);
+        return job.result as RouteOptimization;
+    },
+    optimizeAllRoutes: (): Promise<BulkOptimization> => request('/routes/optimize-all', { method: 'POST' }),
+    clusterEmployees: (data: Record<string, unknown>): Promise<{ clusters: EmployeeCluster[]; iterations: number; elapsed_ms: number }> =>
+        request('/routes/cluster', { method: 'POST', body: JSON.stringify(data) }),
     addRouteStop: (routeId: number, data: { employee_id: number; sequence_order: number }): Promise<RouteStop> =>
         request(`/routes/${routeId}/stops`, { method: 'POST', body: JSON.stringify(data) }),
     updateRouteStop: (routeId: number, stopId: number, data: { sequence_order?: number; employee_id?: number }): Promise<RouteStop> =>
@@ -156,6 +220,10 @@ export const api = {
     removeRouteStop: (routeId: number, stopId: number): Promise<void> =>
         request(`/routes/${routeId}/stops/${stopId}`, { method: 'DELETE' }),
 
+    // Jobs
+    getJob: (id: string): Promise<Job> => request(`/jobs/${id}`),
+    cancelJob: (id: string): Promise<Job> => request(`/jobs/${id}/cancel`, { method: 'POST' }),
+
     // Trips
     getTrips: (): Promise<Trip[]> => request('/trips/'),
     getMyTrips: (): Promise<Trip[]> => request('/trips/my'),